@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -48,6 +49,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'comments.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'AiGuardian.urls'
@@ -78,9 +80,31 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Seconds a connection waits for the write lock before "database is locked"
+            'timeout': 20,
+        },
     }
 }
 
+# Applied to every new SQLite connection (comments.db.configure_sqlite).
+# WAL lets dashboard reads run alongside an ingestion write.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+    'mmap_size': 256 * 1024 * 1024,
+}
+
+# Status changes from views and commands are committed by one writer thread,
+# which groups everything submitted within window_ms into a single transaction.
+SQLITE_WRITE_COALESCING = {
+    'enabled': True,
+    'window_ms': 20,
+    'max_batch': 100,
+    'timeout': 30,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -121,6 +145,71 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Video tile thumbnails (comments/tiles.py): built from TILE_SOURCE_DIR/<video_id>.png|jpg|webp into
+# TILE_ROOT under content-hashed names, at each width (CSS px; the first is 1x). Videos without a source
+# image get their YouTube thumbnail downloaded when TILE_FETCH_THUMBNAILS is on.
+TILE_SOURCE_DIR = BASE_DIR / 'static' / 'tiles'
+TILE_ROOT = MEDIA_ROOT / 'tiles'
+TILE_WIDTHS = (160, 320)
+TILE_FETCH_THUMBNAILS = True
+
+# Profiling (opt-in)
+# Set AIGUARDIAN_PROFILE=1 (or =sampling) to profile the dashboard views below.
+# Management commands take --profile instead. Output goes to PROFILE_ROOT/<timestamp>-<label>/.
+PROFILE_REQUESTS = bool(os.environ.get('AIGUARDIAN_PROFILE'))
+PROFILE_MODE = 'sampling' if os.environ.get('AIGUARDIAN_PROFILE') == 'sampling' else 'cprofile'
+PROFILE_VIEW_NAMES = ('home', 'dashboard', 'dashboard_video', 'log_analytics')
+PROFILE_ROOT = BASE_DIR / 'profiles'
+
+# Live dashboard events (server-sent events)
+# Views and management commands append events here; /live/events/ streams them.
+LIVE_EVENTS_PATH = BASE_DIR / 'live_events.jsonl'
+LIVE_EVENTS_MAX_BYTES = 5 * 1024 * 1024
+LIVE_EVENTS_POLL_SECONDS = 0.5
+LIVE_EVENTS_STREAM_SECONDS = 300
+
+# Repeat offenders (comments/authors.py): authors with at least MIN_DELETED deleted comments, at least
+# MIN_RATE of all their comments. Policy None (off) or 'review' (skip the model, send new comments to
+# review).
+REPEAT_OFFENDER_POLICY = None
+REPEAT_OFFENDER_MIN_DELETED = 3
+REPEAT_OFFENDER_MIN_RATE = 0.5
+
+# YouTube API calls from async moderation views (comments/youtube_pool.py): pool threads, and seconds
+# a view waits for one call before answering 504. Up to twice the workers may be running or waiting.
+YOUTUBE_API_WORKERS = 8
+YOUTUBE_API_TIMEOUT = 15
+
+# Caching (comments/caching.py): video lists, per-video stats and dashboard fragments, versioned
+# per video and invalidated on ingest/moderation. File-based by default so invalidations made by
+# management commands reach the web process; AIGUARDIAN_CACHE=locmem keeps it in process memory.
+if os.environ.get('AIGUARDIAN_CACHE') == 'locmem':
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'aiguardian'}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                          'LOCATION': BASE_DIR / 'cache'}}
+VIEW_CACHE_SECONDS = 600
+
+# Toxic lexicon (comments/lexicon.py), compiled from the curated dataset's Toxic_Word_or_Phrase column
+# Comments matching a phrase go to review without a model call; None only tags the match and lets the
+# model decide. A match alone never rejects a comment ('toxic' is treated as 'review'). Phrases that
+# fold to an ordinary word are dropped; add a benign word list (one word per line) to extend that set.
+TOXIC_LEXICON_PATH = BASE_DIR / 'toxicity_models' / 'cleaned_shuffled_dataset.csv'
+LEXICON_MATCH_DECISION = 'review'
+TOXIC_LEXICON_ORDINARY_WORDS_PATH = None
+
+# Per-language scorers (comments/language.py): {'English': 'student', 'Hybrid': 'bert', ...}, with scorers
+# 'bert', 'student' or 'tfidf'. None uses the routes `manage.py language_stats --write` saved to the
+# inference profile; languages without a route are scored by the BERT model.
+LANGUAGE_SCORERS = None
+
+# Sentences (Context_or_Example_Sentence column) the BERT teacher scores for `manage.py distill_student`
+DISTILL_DATASET_PATH = BASE_DIR / 'toxicity_models' / 'cleaned_shuffled_dataset.csv'
+
+# Grid-search workers for retrains the dashboard's fetch buttons start in the background; keep it below
+# the core count so the web server stays responsive
+RETRAIN_N_JOBS = 2
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from . import caching
 from .models import Comment, ChannelVideo
 
 
@@ -6,6 +7,18 @@ class ChannelVideoAdmin(admin.ModelAdmin):
 	list_display = ('video_id', 'name', 'link', 'created_at')
 	search_fields = ('video_id', 'name')
 
+	def save_model(self, request, obj, form, change):
+		super().save_model(request, obj, form, change)
+		caching.touch_videos()
+
+	def delete_model(self, request, obj):
+		super().delete_model(request, obj)
+		caching.touch_videos()
+
+	def delete_queryset(self, request, queryset):
+		super().delete_queryset(request, queryset)
+		caching.touch_videos()
+
 
 admin.site.register(Comment)
 admin.site.register(ChannelVideo, ChannelVideoAdmin)
@@ -0,0 +1,74 @@
+"""Move settled comments from the hot ``Comment`` table to ``ArchivedComment``.
+
+Only comments in a settled status (neutral or deleted by default) and
+published more than N days ago move. Rollups keep counting them, since they
+count decisions and not rows, and search index entries stay in place:
+``comments.search`` joins against both tables. Each batch is copied and
+deleted in one transaction, so a comment is always in exactly one table.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import caching
+from .models import ArchivedComment, Comment
+
+SETTLED_STATUSES = ('neutral', 'deleted')
+COPIED_FIELDS = ('comment_id', 'video_id', 'author', 'text', 'like_count', 'published_at', 'moderation_status',
+                 'reply_count', 'toxicity_score', 'toxicity_category', 'language')
+
+
+def candidates(older_than_days, statuses=SETTLED_STATUSES, video_id=None):
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    qs = Comment.objects.filter(published_at__lt=cutoff, moderation_status__in=list(statuses))
+    if video_id:
+        qs = qs.filter(video_id=video_id)
+    return qs
+
+
+def archive(older_than_days, statuses=SETTLED_STATUSES, video_id=None, batch_size=1000, log=None):
+    """Archive matching comments in batches; returns the number moved."""
+    qs = candidates(older_than_days, statuses, video_id).order_by('published_at')
+    moved = 0
+    while True:
+        with transaction.atomic():
+            batch = list(qs.values(*COPIED_FIELDS, 'parent_id')[:batch_size])
+            if not batch:
+                break
+            now = timezone.now()
+            ArchivedComment.objects.bulk_create(
+                [ArchivedComment(**{**row, 'parent_id': row['parent_id'] or ''}, archived_at=now) for row in batch],
+                ignore_conflicts=True,
+            )
+            Comment.objects.filter(comment_id__in=[row['comment_id'] for row in batch]).delete()
+        # Dashboard lists only show hot comments
+        caching.touch_comments({row['video_id'] for row in batch})
+        moved += len(batch)
+        if log:
+            log(f"Archived {moved} comments")
+    return moved
+
+
+def existing_ids(ids):
+    """Those of ``ids`` stored in either table."""
+    ids = list(ids)
+    found = set(Comment.objects.filter(comment_id__in=ids).values_list('comment_id', flat=True))
+    rest = [i for i in ids if i not in found]
+    if rest:
+        found.update(ArchivedComment.objects.filter(comment_id__in=rest).values_list('comment_id', flat=True))
+    return found
+
+
+def in_bulk(ids, fields=None):
+    """``{comment_id: comment}`` across both tables; hot rows win."""
+    ids = list(ids)
+    hot = Comment.objects.all()
+    cold = ArchivedComment.objects.all()
+    if fields:
+        hot, cold = hot.only(*fields), cold.only(*fields)
+    found = hot.in_bulk(ids)
+    rest = [i for i in ids if i not in found]
+    if rest:
+        found.update(cold.in_bulk(rest))
+    return found
@@ -0,0 +1,116 @@
+"""Incrementally maintained per-author comment history and the repeat-offender policy.
+
+``AuthorStats`` counts each author's comments and how many are currently in
+review or deleted. comments.moderation applies ingest and status-change
+deltas as they happen, so the top-offenders view and the ingest policy read
+one indexed row per author instead of scanning Comment.
+
+Policy (``settings.REPEAT_OFFENDER_POLICY``), applied by ``pipeline.batch_infer``
+to authors with at least ``REPEAT_OFFENDER_MIN_DELETED`` deleted comments
+making up at least ``REPEAT_OFFENDER_MIN_RATE`` of their comments:
+    None        off (default)
+    'review'    their new comments go straight to review without a model call
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min, Q
+from django.db.models.functions import Coalesce, Greatest, Least
+
+from .models import ArchivedComment, AuthorStats, Comment
+
+STATUS_FIELDS = {'review': 'review_count', 'deleted': 'deleted_count'}
+POLICIES = (None, 'review')
+
+
+def _entry(deltas, author):
+    return deltas.setdefault(author, {'comment_count': 0, 'review_count': 0, 'deleted_count': 0,
+                                      'first_seen_at': None, 'last_seen_at': None})
+
+
+def add_comment(deltas, comment):
+    """Count a newly stored comment."""
+    entry = _entry(deltas, comment.author)
+    entry['comment_count'] += 1
+    add_status(deltas, comment.author, comment.moderation_status, 1)
+    seen = comment.published_at
+    if seen:
+        entry['first_seen_at'] = min(entry['first_seen_at'] or seen, seen)
+        entry['last_seen_at'] = max(entry['last_seen_at'] or seen, seen)
+
+
+def add_status(deltas, author, status, amount):
+    field = STATUS_FIELDS.get(status)
+    if field:
+        _entry(deltas, author)[field] += amount
+
+
+def apply(deltas):
+    """Apply ``{author: {field: delta, first_seen_at, last_seen_at}}`` changes."""
+    for author, entry in deltas.items():
+        counts = {f: entry[f] for f in ('comment_count', 'review_count', 'deleted_count') if entry[f]}
+        first, last = entry['first_seen_at'], entry['last_seen_at']
+        if not counts and not last:
+            continue
+        updates = {f: F(f) + n for f, n in counts.items()}
+        if first:
+            # Coalesce: SQLite's MIN/MAX return NULL if either side is NULL
+            updates['first_seen_at'] = Least(Coalesce(F('first_seen_at'), first), first)
+            updates['last_seen_at'] = Greatest(Coalesce(F('last_seen_at'), last), last)
+        rows = AuthorStats.objects.filter(author=author)
+        if rows.update(**updates):
+            continue
+        try:
+            with transaction.atomic():
+                AuthorStats.objects.create(author=author, first_seen_at=first, last_seen_at=last, **counts)
+        except IntegrityError:
+            # Created concurrently between our update and insert
+            rows.update(**updates)
+
+
+def rebuild():
+    """Recompute every author's stats from Comment and ArchivedComment; returns the number of authors."""
+    totals = {}
+    for model in (Comment, ArchivedComment):
+        grouped = (model.objects.values('author').order_by()
+                   .annotate(n=Count('pk'), review=Count('pk', filter=Q(moderation_status='review')),
+                             deleted=Count('pk', filter=Q(moderation_status='deleted')),
+                             first=Min('published_at'), last=Max('published_at')))
+        for g in grouped:
+            t = totals.setdefault(g['author'], {'n': 0, 'review': 0, 'deleted': 0, 'first': g['first'], 'last': g['last']})
+            t['n'] += g['n']
+            t['review'] += g['review']
+            t['deleted'] += g['deleted']
+            t['first'] = min(t['first'], g['first'])
+            t['last'] = max(t['last'], g['last'])
+    rows = [
+        AuthorStats(author=author, comment_count=t['n'], review_count=t['review'], deleted_count=t['deleted'],
+                    first_seen_at=t['first'], last_seen_at=t['last'])
+        for author, t in totals.items()
+    ]
+    with transaction.atomic():
+        AuthorStats.objects.all().delete()
+        AuthorStats.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def top_offenders(limit=50, min_deleted=1):
+    """Authors with the most deleted comments, most recently active first among ties."""
+    return (AuthorStats.objects.filter(deleted_count__gte=min_deleted)
+            .order_by('-deleted_count', '-last_seen_at')[:limit])
+
+
+def policy():
+    value = getattr(settings, 'REPEAT_OFFENDER_POLICY', None)
+    return value if value in POLICIES else None
+
+
+def offenders(authors):
+    """The subset of ``authors`` that the repeat-offender policy applies to."""
+    authors = {a for a in authors if a}
+    if not authors:
+        return set()
+    min_deleted = getattr(settings, 'REPEAT_OFFENDER_MIN_DELETED', 3)
+    min_rate = getattr(settings, 'REPEAT_OFFENDER_MIN_RATE', 0.5)
+    rows = AuthorStats.objects.filter(author__in=list(authors), deleted_count__gte=min_deleted)
+    return {author for author, deleted, total in rows.values_list('author', 'deleted_count', 'comment_count')
+            if total and deleted / total >= min_rate}
@@ -0,0 +1,116 @@
+"""Versioned caching for the video list, per-video stats and dashboard fragments.
+
+Each scope has a version number stored in the cache: ``videos`` (the
+ChannelVideo list), ``video:<id>`` (one video's comments) and ``video:*`` (any
+comment). Cached entries put the version in their key, so invalidating is a
+single write: ``touch_videos`` / ``touch_comments`` bump the versions and
+stale entries are never read again (they expire on their own).
+comments.moderation bumps comment versions when an ingest or status change
+commits; ``add_video`` bumps the video list. Versions are millisecond
+timestamps, so they double as the Last-Modified time of pages built from them.
+
+With the default file-based cache, versions bumped by management commands are
+seen by the web process as well.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import rollups, video_config
+from .models import ChannelVideo
+
+ALL = '*'
+VIDEOS = 'videos'
+
+
+def timeout():
+    return getattr(settings, 'VIEW_CACHE_SECONDS', 600)
+
+
+def _version_key(scope):
+    return f'aig:version:{scope}'
+
+
+def video_scope(video_id=None):
+    return f'video:{video_id or ALL}'
+
+
+def version(scope):
+    key = _version_key(scope)
+    current = cache.get(key)
+    if current is None:
+        current = int(time.time() * 1000)
+        if not cache.add(key, current, timeout=None):
+            current = cache.get(key, current)
+    return current
+
+
+def _bump(scopes):
+    keys = [_version_key(s) for s in scopes]
+    now = int(time.time() * 1000)
+    current = cache.get_many(keys)
+    cache.set_many({k: max(now, current.get(k, 0) + 1) for k in keys}, timeout=None)
+
+
+def touch_videos():
+    _bump([VIDEOS])
+
+
+def touch_comments(video_ids):
+    """Invalidate cached stats and fragments for these videos and the all-videos views."""
+    _bump([video_scope(v) for v in set(video_ids)] + [video_scope(ALL)])
+
+
+def video_list():
+    """``[(video_id, link, name)]`` newest first; falls back to video_config without ChannelVideo rows."""
+    key = f'aig:videos:{version(VIDEOS)}'
+    videos = cache.get(key)
+    if videos is None:
+        try:
+            videos = list(ChannelVideo.objects.order_by('-created_at').values_list('video_id', 'link', 'name'))
+        except Exception:
+            videos = []
+        if not videos:
+            videos = [(vid, link, '') for vid, link in zip(video_config.CHANNEL_VIDEOS, video_config.CHANNEL_VIDEO_LINKS)]
+        cache.set(key, videos, timeout())
+    return videos
+
+
+def _stats_key(video_id):
+    return f'aig:stats:{video_id or ALL}:{version(video_scope(video_id))}'
+
+
+def video_stats(video_id=None):
+    """Cached ``rollups.video_stats``."""
+    key = _stats_key(video_id)
+    stats = cache.get(key)
+    if stats is None:
+        stats = rollups.video_stats(video_id)
+        cache.set(key, stats, timeout())
+    return stats
+
+
+def stats_by_video(video_ids):
+    """Cached ``rollups.stats_by_video``; only videos whose entries are stale are recounted."""
+    keys = {vid: _stats_key(vid) for vid in video_ids}
+    cached = cache.get_many(list(keys.values()))
+    stats = {vid: cached[key] for vid, key in keys.items() if key in cached}
+    missing = [vid for vid in video_ids if vid not in stats]
+    if missing:
+        fresh = rollups.stats_by_video(missing)
+        cache.set_many({keys[vid]: s for vid, s in fresh.items()}, timeout())
+        stats.update(fresh)
+    return stats
+
+
+def page_etag(request, *scopes):
+    """ETag for a page built from ``scopes``: their versions plus the full request path."""
+    parts = [request.get_full_path()] + [f'{s}={version(s)}' for s in scopes]
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def page_last_modified(*scopes):
+    return datetime.fromtimestamp(max(version(s) for s in scopes) / 1000, tz=dt_timezone.utc)
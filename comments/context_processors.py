@@ -1,17 +1,11 @@
-from . import video_config
-from .models import ChannelVideo
+from . import caching
 
 
 def channel_videos(request):
     """Make channel_videos_info available to all templates.
 
     Prefers DB-backed ChannelVideo entries, falls back to video_config constants.
-    Returns list of (video_id, link) pairs as `channel_videos_info`.
+    Returns list of (video_id, link) pairs as `channel_videos_info`. The list is
+    cached until a video is added (comments.caching).
     """
-    try:
-        videos = list(ChannelVideo.objects.order_by('-created_at').values_list('video_id', 'link'))
-        if videos:
-            return {"channel_videos_info": videos}
-    except Exception:
-        pass
-    return {"channel_videos_info": list(zip(video_config.CHANNEL_VIDEOS, video_config.CHANNEL_VIDEO_LINKS))}
+    return {"channel_videos_info": [(vid, link) for vid, link, _name in caching.video_list()]}
@@ -0,0 +1,120 @@
+"""SQLite connection tuning and single-writer batching.
+
+``configure_sqlite`` runs on every new SQLite connection (see ``apps.py``) and
+applies ``settings.SQLITE_PRAGMAS``: WAL lets dashboard reads proceed while an
+ingestion run is writing, and busy_timeout makes writers queue for the lock
+instead of failing with "database is locked".
+
+``WriteCoalescer`` funnels small writes (status changes from views and
+commands) through one thread that commits whatever arrived within a short
+window as a single transaction, so many moderator clicks cost one lock
+acquisition and one fsync instead of one each.
+"""
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+
+
+class WriteCoalescer:
+    """Runs submitted write functions on a single writer thread in grouped transactions."""
+
+    def __init__(self, window_ms=20, max_batch=100):
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn):
+        future = Future()
+        self._ensure_thread()
+        self._queue.put((fn, future))
+        return future
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+                self._thread.start()
+
+    def is_writer_thread(self):
+        return threading.current_thread() is self._thread
+
+    def _run(self):
+        while True:
+            jobs = [self._queue.get()]
+            # Collect whatever else arrives within the window
+            try:
+                while len(jobs) < self.max_batch:
+                    jobs.append(self._queue.get(timeout=self.window))
+            except queue.Empty:
+                pass
+            self._flush(jobs)
+
+    def _flush(self, jobs):
+        results = []
+        try:
+            with transaction.atomic():
+                for fn, _ in jobs:
+                    results.append(fn())
+        except Exception:
+            # One failing job must not sink the others: retry each on its own
+            logger.warning("Coalesced write batch of %d failed; retrying individually", len(jobs))
+            for fn, future in jobs:
+                try:
+                    with transaction.atomic():
+                        future.set_result(fn())
+                except Exception as e:
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(jobs, results):
+            future.set_result(result)
+
+
+_coalescer = None
+_coalescer_lock = threading.Lock()
+
+
+def _get_coalescer():
+    global _coalescer
+    with _coalescer_lock:
+        if _coalescer is None:
+            options = getattr(settings, 'SQLITE_WRITE_COALESCING', {})
+            _coalescer = WriteCoalescer(
+                window_ms=options.get('window_ms', 20),
+                max_batch=options.get('max_batch', 100),
+            )
+        return _coalescer
+
+
+def run_write(fn):
+    """Run ``fn()`` in a transaction, via the writer thread when coalescing applies.
+
+    Calls already inside a transaction (or on the writer thread) run inline so
+    they stay part of the caller's transaction.
+    """
+    options = getattr(settings, 'SQLITE_WRITE_COALESCING', {})
+    if (
+        not options.get('enabled')
+        or connection.vendor != 'sqlite'
+        or connection.in_atomic_block
+        or (_coalescer is not None and _coalescer.is_writer_thread())
+    ):
+        with transaction.atomic():
+            return fn()
+    return _get_coalescer().submit(fn).result(timeout=options.get('timeout', 30))
@@ -0,0 +1,235 @@
+"""Import comments from commentThreads exports without API calls.
+
+Accepted files (optionally gzipped, ``.gz``):
+    .jsonl / .ndjson  one commentThread or comment resource, or one
+                      commentThreads.list response page, per line
+    .json             an array of those, or a single response page; streamed
+                      with ijson when installed, otherwise loaded whole
+    .csv              one comment per row; columns are matched loosely
+                      (``comment_id``/``id``/``Comment ID``, ``textDisplay``/
+                      ``Comment text``, ...), so API-shaped and Takeout
+                      exports both work
+
+Rows are streamed: files are read incrementally and only one batch is held
+in memory. Ids already stored or seen earlier in the import are dropped by a
+Bloom filter of every stored comment_id (``existing_filter``); only ids the
+filter flags as possibly present are checked against the database. New
+comments are stored as 'unclassified' in one transaction per batch, which is
+the queue ``manage.py classify_pending`` works through.
+"""
+import csv
+import gzip
+import json
+import re
+from datetime import datetime
+
+from django.db import IntegrityError, transaction
+
+from . import archive
+from .bloom import BloomFilter
+from .models import ArchivedComment, Comment
+from .pipeline import chunked, normalize_comment, normalize_thread, parse_published_at
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Normalized CSV header -> row field; headers are lowercased with non-alphanumerics removed
+CSV_COLUMNS = {
+    'commentid': 'comment_id', 'id': 'comment_id',
+    'videoid': 'video_id',
+    'author': 'author', 'authordisplayname': 'author', 'authorname': 'author', 'channelid': 'author',
+    'text': 'text', 'textdisplay': 'text', 'textoriginal': 'text', 'commenttext': 'text', 'comment': 'text',
+    'likecount': 'like_count', 'likes': 'like_count',
+    'publishedat': 'published_at', 'commentcreatetimestamp': 'published_at', 'createdat': 'published_at',
+    'timestamp': 'published_at',
+    'parentid': 'parent_id', 'parentcommentid': 'parent_id',
+}
+
+
+def _open(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, 'r', encoding='utf-8', newline='')
+
+
+def _kind(path):
+    name = path[:-3] if path.endswith('.gz') else path
+    return name.rsplit('.', 1)[-1].lower()
+
+
+def _takeout_text(value):
+    # Takeout stores comment text as JSON segments: {"text":"Hello "},{"text":"world"}
+    if value.startswith('{"'):
+        try:
+            return ''.join(part.get('text', '') for part in json.loads(f'[{value}]'))
+        except (ValueError, AttributeError):
+            pass
+    return value
+
+
+def _resource_rows(obj, video_id):
+    """Rows for a commentThreads page, a commentThread or a comment resource."""
+    if not isinstance(obj, dict):
+        return
+    if 'items' in obj:
+        for item in obj['items'] or ():
+            yield from _resource_rows(item, video_id)
+        return
+    snippet = obj.get('snippet') or {}
+    if 'topLevelComment' not in snippet:
+        yield normalize_comment(obj, video_id)
+        return
+    row = normalize_thread(obj, video_id)
+    replies = (obj.get('replies') or {}).get('comments') or []
+    # A thread only counts replies that are actually in the dump; a later fetch expands the rest
+    row['reply_count'] = min(row['reply_count'], len(replies))
+    yield row
+    for reply in replies:
+        yield normalize_comment(reply, row['video_id'], parent_id=row['comment_id'])
+
+
+def _json_objects(path):
+    """Top-level array elements (or the single top-level object) of a .json export."""
+    opener = gzip.open if path.endswith('.gz') else open
+    try:
+        import ijson
+    except ImportError:
+        with opener(path, 'rb') as f:
+            data = json.load(f)
+        yield from (data if isinstance(data, list) else [data])
+        return
+    with opener(path, 'rb') as f:
+        first = b' '
+        while first and first.isspace():
+            first = f.read(1)
+    with opener(path, 'rb') as f:
+        yield from ijson.items(f, 'item' if first == b'[' else '', use_float=True)
+
+
+def _csv_rows(f, video_id):
+    reader = csv.DictReader(f)
+    columns = {}
+    for header in reader.fieldnames or ():
+        field = CSV_COLUMNS.get(re.sub(r'[^a-z0-9]', '', header.lower()))
+        # First matching column wins, e.g. textDisplay over a later textOriginal
+        if field and field not in columns.values():
+            columns[header] = field
+    for record in reader:
+        row = {field: (record.get(header) or '').strip() for header, field in columns.items()}
+        try:
+            like_count = int(float(row.get('like_count') or 0))
+        except ValueError:
+            like_count = 0
+        yield {
+            'comment_id': row.get('comment_id') or None,
+            'video_id': row.get('video_id') or video_id,
+            'author': row.get('author', ''),
+            'text': _takeout_text(row.get('text', '')),
+            'like_count': like_count,
+            'published_at': row.get('published_at'),
+            'parent_id': row.get('parent_id') or None,
+            # Replies in the file are not known to be complete; a later fetch expands them
+            'reply_count': 0,
+        }
+
+
+def iter_rows(path, video_id=None, stats=None):
+    """Comment rows parsed from one export file.
+
+    ``video_id`` fills in rows that do not name their video. Rows without an
+    id, video or parseable publish time are skipped and counted in
+    ``stats['skipped']``.
+    """
+    stats = stats if stats is not None else {}
+    kind = _kind(path)
+    if kind not in ('csv', 'jsonl', 'ndjson', 'json'):
+        raise ValueError(f"Unsupported export file type: {path} (expected .json, .jsonl, .ndjson or .csv)")
+    with _open(path) as f:
+        if kind == 'csv':
+            rows = _csv_rows(f, video_id)
+        elif kind == 'json':
+            rows = (row for obj in _json_objects(path) for row in _resource_rows(obj, video_id))
+        else:
+            rows = (row for line in f if line.strip() for row in _resource_rows(json.loads(line), video_id))
+        for row in rows:
+            if not isinstance(row.get('published_at'), datetime):
+                row['published_at'] = parse_published_at(row.get('published_at'))
+            if not (row.get('comment_id') and row.get('video_id') and row['published_at']):
+                stats['skipped'] = stats.get('skipped', 0) + 1
+                continue
+            row['author'] = row.get('author') or ''
+            row['text'] = row.get('text') or ''
+            row['like_count'] = int(row.get('like_count') or 0)
+            stats['parsed'] = stats.get('parsed', 0) + 1
+            yield row
+
+
+def existing_filter(expected_new=0, error_rate=0.001):
+    """Bloom filter of every stored comment_id, with room for ``expected_new`` more."""
+    counts = [model.objects.count() for model in (Comment, ArchivedComment)]
+    bloom = BloomFilter(sum(counts) + expected_new, error_rate)
+    for model in (Comment, ArchivedComment):
+        for comment_id in model.objects.values_list('comment_id', flat=True).iterator(chunk_size=10000):
+            bloom.add(comment_id)
+    return bloom
+
+
+def dedupe(rows, bloom, batch_size=DEFAULT_BATCH_SIZE, stats=None):
+    """Yield batches of rows whose ids are neither stored nor seen earlier in the import.
+
+    Batches must be stored before the next one is requested, so repeats of an
+    earlier batch's ids are found in the database.
+    """
+    stats = stats if stats is not None else {}
+    for chunk in chunked(rows, batch_size):
+        accepted = {}
+        maybe = []
+        for row in chunk:
+            comment_id = row['comment_id']
+            if comment_id in accepted:
+                continue
+            if bloom.might_contain(comment_id):
+                maybe.append(row)
+                continue
+            bloom.add(comment_id)
+            accepted[comment_id] = row
+        # Only possible repeats (and the filter's false positives) cost a lookup
+        stored = archive.existing_ids({row['comment_id'] for row in maybe}) if maybe else set()
+        for row in maybe:
+            if row['comment_id'] not in stored and row['comment_id'] not in accepted:
+                accepted[row['comment_id']] = row
+        stats['duplicates'] = stats.get('duplicates', 0) + len(chunk) - len(accepted)
+        if accepted:
+            yield list(accepted.values())
+
+
+def store(rows):
+    """Insert rows as 'unclassified' comments in one transaction; returns the Comment instances stored."""
+    from .moderation import record_ingested
+    from .review_queue import priority
+    objs = [
+        Comment(
+            comment_id=row['comment_id'],
+            video_id=row['video_id'],
+            author=row['author'],
+            text=row['text'],
+            like_count=row['like_count'],
+            published_at=row['published_at'],
+            parent_id=row.get('parent_id'),
+            reply_count=row.get('reply_count', 0),
+            moderation_status='unclassified',
+            review_priority=priority(None, row['like_count'], row['published_at']),
+        )
+        for row in rows
+    ]
+    try:
+        with transaction.atomic():
+            Comment.objects.bulk_create(objs, batch_size=1000)
+            record_ingested(objs, row_events=False)
+    except IntegrityError:
+        # Some ids were stored by a concurrent fetch after the filter was built
+        existing = archive.existing_ids(o.comment_id for o in objs)
+        objs = [o for o in objs if o.comment_id not in existing]
+        with transaction.atomic():
+            Comment.objects.bulk_create(objs, batch_size=1000)
+            record_ingested(objs, row_events=False)
+    return objs
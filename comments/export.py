@@ -0,0 +1,189 @@
+"""Streaming export of comments and model scores.
+
+Rows are read with ``QuerySet.iterator()`` one chunk at a time and each chunk
+is written straight out: a Parquet row group, an Arrow IPC record batch or a
+block of CSV lines. Memory stays flat in the chunk size whatever the number
+of comments. Parquet and Arrow need pyarrow; CSV is the fallback. ``write``
+serves ``manage.py export_comments`` (to a file) and ``stream`` the export
+endpoint (an iterator of bytes for StreamingHttpResponse).
+
+Read back with ``pandas.read_parquet(path, memory_map=True)`` or
+``pyarrow.ipc.open_file(pyarrow.memory_map(path)).read_pandas()``.
+"""
+import csv
+import io
+from datetime import datetime, time as dt_time, timedelta
+
+from .models import ArchivedComment, Comment
+from .rollups import IST
+
+FORMATS = ('parquet', 'arrow', 'csv')
+CONTENT_TYPES = {
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.file',
+    'csv': 'text/csv',
+}
+COLUMNS = ('comment_id', 'video_id', 'parent_id', 'author', 'text', 'like_count', 'reply_count', 'published_at',
+           'moderation_status', 'toxicity_score', 'toxicity_category', 'language', 'archived')
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def have_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def default_format():
+    return 'parquet' if have_pyarrow() else 'csv'
+
+
+def schema():
+    import pyarrow as pa
+    return pa.schema([
+        ('comment_id', pa.string()),
+        ('video_id', pa.string()),
+        ('parent_id', pa.string()),
+        ('author', pa.string()),
+        ('text', pa.string()),
+        ('like_count', pa.int32()),
+        ('reply_count', pa.int32()),
+        ('published_at', pa.timestamp('us', tz='UTC')),
+        ('moderation_status', pa.string()),
+        ('toxicity_score', pa.float32()),
+        ('toxicity_category', pa.string()),
+        ('language', pa.string()),
+        ('archived', pa.bool_()),
+    ])
+
+
+def _filtered(model, video_id=None, statuses=None, start=None, end=None):
+    qs = model.objects.all()
+    if video_id:
+        qs = qs.filter(video_id=video_id)
+    if statuses:
+        qs = qs.filter(moderation_status__in=list(statuses))
+    # Dates are IST publish days, inclusive, as on the dashboard
+    if start:
+        qs = qs.filter(published_at__gte=datetime.combine(start, dt_time.min, tzinfo=IST))
+    if end:
+        qs = qs.filter(published_at__lt=datetime.combine(end + timedelta(days=1), dt_time.min, tzinfo=IST))
+    return qs
+
+
+def chunks(video_id=None, statuses=None, start=None, end=None, include_archived=False,
+           chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield ``{column: [values]}`` dicts of at most ``chunk_size`` comments."""
+    models = [Comment, ArchivedComment] if include_archived else [Comment]
+    fields = [c for c in COLUMNS if c not in ('parent_id', 'archived')]
+    for model in models:
+        archived = model is ArchivedComment
+        qs = _filtered(model, video_id, statuses, start, end).order_by('pk').values_list(*fields, 'parent_id')
+        block = []
+        for row in qs.iterator(chunk_size=chunk_size):
+            block.append(row)
+            if len(block) >= chunk_size:
+                yield _columns(block, fields, archived)
+                block = []
+        if block:
+            yield _columns(block, fields, archived)
+
+
+def _columns(block, fields, archived):
+    data = {name: [row[i] for row in block] for i, name in enumerate(fields)}
+    # Comment.parent is a nullable FK; ArchivedComment stores '' for top-level comments
+    data['parent_id'] = [row[-1] or None for row in block]
+    data['archived'] = [archived] * len(block)
+    return {name: data[name] for name in COLUMNS}
+
+
+class _Sink(io.RawIOBase):
+    """Write-only stream that hands back whatever was written since the last ``drain``."""
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _arrow_writer(fmt, sink, compression):
+    import pyarrow as pa
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(sink, schema(), compression=compression or 'none')
+    options = pa.ipc.IpcWriteOptions(compression=compression if compression in ('zstd', 'lz4') else None)
+    return pa.ipc.new_file(sink, schema(), options=options)
+
+
+def _encode(fmt, sink, chunk_iter, compression):
+    """Write chunks to ``sink``, yielding the running row count after each one."""
+    count = 0
+    if fmt == 'csv':
+        text = io.TextIOWrapper(sink, encoding='utf-8', newline='', write_through=True)
+        writer = csv.writer(text)
+        writer.writerow(COLUMNS)
+        for data in chunk_iter:
+            rows = list(zip(*(data[c] for c in COLUMNS)))
+            writer.writerows(rows)
+            count += len(rows)
+            yield count
+        # Leave the underlying sink open for the caller
+        text.detach()
+        return
+    import pyarrow as pa
+    writer = _arrow_writer(fmt, sink, compression)
+    try:
+        for data in chunk_iter:
+            table = pa.Table.from_pydict(data, schema=schema())
+            writer.write_table(table)
+            count += table.num_rows
+            yield count
+    finally:
+        # Writes the Parquet/Arrow footer
+        writer.close()
+
+
+def write(path, fmt, compression='zstd', **filters):
+    """Export to ``path``; returns the number of comments written."""
+    count = 0
+    if fmt == 'csv' and path.endswith('.gz'):
+        import gzip
+        opener = gzip.open
+    else:
+        opener = open
+    with opener(path, 'wb') as f:
+        for count in _encode(fmt, f, chunks(**filters), compression):
+            pass
+    return count
+
+
+def stream(fmt, compression='zstd', **filters):
+    """Iterator of encoded bytes, yielded as each chunk is written."""
+    sink = _Sink()
+    for _count in _encode(fmt, sink, chunks(**filters), compression):
+        data = sink.drain()
+        if data:
+            yield data
+    # Header-only CSV or the Parquet/Arrow footer
+    data = sink.drain()
+    if data:
+        yield data
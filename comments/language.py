@@ -0,0 +1,211 @@
+"""Script and language detection, and per-language routing to scorers.
+
+Comments come in three forms, named after the training dataset's
+``Language_Type`` values: ``Telugu`` (Telugu script), ``Hybrid`` (romanized
+Telugu, usually mixed with English) and ``English``. ``detect`` tells them
+apart in two steps:
+
+1. Script: Telugu-block characters (U+0C00-U+0C7F) and Latin letters are
+   counted with one regex pass each. Text that is mostly Telugu script is
+   Telugu; Latin text with some Telugu script is Hybrid.
+2. Latin-only text is scored by a character n-gram naive Bayes model trained
+   on the dataset's sentences, which separates romanized Telugu words
+   (``vedava``, ``chestunnanu``) from English ones. The dataset has no
+   Telugu-script rows, so its Telugu and Hybrid sentences both train the
+   romanized class.
+
+Text with no letters in either script (emoji, numbers) gets ''.
+
+``pipeline.batch_infer`` scores each language with the scorer named in
+``settings.LANGUAGE_SCORERS``, or else in the ``language_scorers`` that
+``manage.py language_stats --write`` saved to the inference profile. The
+scorers are 'bert' (the pipeline's predictor), 'student' (the distilled CPU
+student) and 'tfidf' (the retrained TF-IDF/logistic-regression model).
+Languages without a route use 'bert'.
+"""
+import csv
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+from django.conf import settings
+
+ENGLISH = 'English'
+HYBRID = 'Hybrid'
+TELUGU = 'Telugu'
+LANGUAGES = (ENGLISH, HYBRID, TELUGU)
+
+SCORERS = ('bert', 'student', 'tfidf')
+
+NGRAM_RANGE = (1, 4)
+SMOOTHING = 0.1
+
+_TELUGU_CHARS = re.compile('[\u0c00-\u0c7f]')
+_LATIN_CHARS = re.compile('[A-Za-z]')
+_LATIN_WORDS = re.compile('[a-z]+')
+
+
+def script_counts(text):
+    """``(telugu, latin)`` letter counts of ``text``."""
+    text = text or ''
+    return len(_TELUGU_CHARS.findall(text)), len(_LATIN_CHARS.findall(text))
+
+
+def features(text, ngrams=NGRAM_RANGE):
+    """Whole words and boundary-marked character n-grams of the Latin words in ``text``."""
+    lo, hi = ngrams
+    grams = []
+    for word in _LATIN_WORDS.findall((text or '').lower()):
+        grams.append(' ' + word)
+        marked = f'<{word}>'
+        for n in range(lo, hi + 1):
+            grams.extend(marked[i:i + n] for i in range(len(marked) - n + 1))
+    return grams
+
+
+class NgramModel:
+    """Two-class multinomial naive Bayes (romanized Telugu vs English) over ``features``.
+
+    Training folds both classes into one table of per-feature log-likelihood
+    ratios, so scoring a comment is one dict lookup per feature.
+    """
+
+    def __init__(self, examples, alpha=SMOOTHING):
+        """``examples``: iterable of ``(text, language)``; Telugu and Hybrid both count as romanized."""
+        counts = {HYBRID: Counter(), ENGLISH: Counter()}
+        docs = Counter()
+        for text, language in examples:
+            label = ENGLISH if language == ENGLISH else HYBRID
+            counts[label].update(features(text))
+            docs[label] += 1
+        vocabulary = len(counts[HYBRID].keys() | counts[ENGLISH].keys()) or 1
+        hybrid_total = sum(counts[HYBRID].values()) + alpha * vocabulary
+        english_total = sum(counts[ENGLISH].values()) + alpha * vocabulary
+        self.prior = math.log((docs[HYBRID] + 1) / (docs[ENGLISH] + 1))
+        # A feature neither class has seen
+        self.unseen = math.log(alpha / hybrid_total) - math.log(alpha / english_total)
+        self.weights = {
+            gram: math.log((counts[HYBRID][gram] + alpha) / hybrid_total)
+            - math.log((counts[ENGLISH][gram] + alpha) / english_total)
+            for gram in counts[HYBRID].keys() | counts[ENGLISH].keys()
+        }
+        self.size = sum(docs.values())
+
+    def log_odds(self, text):
+        """Log odds that Latin ``text`` is romanized Telugu rather than English."""
+        weights, unseen = self.weights, self.unseen
+        return self.prior + sum(weights.get(gram, unseen) for gram in features(text))
+
+
+def detect(text, model=None):
+    """Telugu, Hybrid, English or '' for ``text``."""
+    telugu, latin = script_counts(text)
+    if not telugu and not latin:
+        return ''
+    if telugu >= latin:
+        return TELUGU
+    if telugu:
+        return HYBRID
+    model = model or get_model()
+    return HYBRID if model.log_odds(text) > 0 else ENGLISH
+
+
+def detect_many(texts, model=None):
+    model = model or get_model()
+    return [detect(text, model) for text in texts]
+
+
+def load_examples(path=None):
+    """``(sentence, Language_Type)`` pairs of the curated dataset."""
+    from .lexicon import _lexicon_path
+    with open(path or _lexicon_path(), newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            text = (row.get('Context_or_Example_Sentence') or '').strip()
+            language = (row.get('Language_Type') or '').strip()
+            if text and language in LANGUAGES:
+                yield text, language
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def get_model():
+    """The n-gram model trained on the dataset, rebuilt when the file changes. Untrained if it is missing."""
+    from .lexicon import _lexicon_path
+    path = _lexicon_path()
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        model = NgramModel(load_examples(path) if mtime is not None else [])
+        _cache[path] = (mtime, model)
+        return model
+
+
+# --- Routing ----------------------------------------------------------------
+
+def routes():
+    """``{language: scorer name}`` from settings, else from the tuned inference profile."""
+    configured = getattr(settings, 'LANGUAGE_SCORERS', None)
+    if configured is None:
+        from toxicity_models.transformers.bert_infer import load_profile
+        configured = load_profile().get('language_scorers') or {}
+    return configured
+
+
+def _student_predict(texts):
+    from toxicity_models.transformers import student
+    return student.predict([t or '' for t in texts])
+
+
+_tfidf = {}
+_tfidf_lock = threading.Lock()
+
+
+def _tfidf_model():
+    import joblib
+    models_dir = os.path.join(settings.BASE_DIR, 'toxicity_models', 'models')
+    clf_path = os.path.join(models_dir, 'toxicity_classifier.joblib')
+    mtime = os.path.getmtime(clf_path)
+    with _tfidf_lock:
+        if _tfidf.get('mtime') != mtime:
+            classifier = joblib.load(clf_path)
+            encoder = joblib.load(os.path.join(models_dir, 'label_encoder.joblib'))
+            _tfidf.update(
+                mtime=mtime,
+                vectorizer=joblib.load(os.path.join(models_dir, 'tfidf_vectorizer.joblib')),
+                classifier=classifier,
+                labels=[str(label) for label in encoder.inverse_transform(classifier.classes_)],
+            )
+        return _tfidf['vectorizer'], _tfidf['classifier'], _tfidf['labels']
+
+
+def _tfidf_predict(texts):
+    # The retrained model predicts a category; everything but Neutral counts towards LABEL_1
+    vectorizer, classifier, labels = _tfidf_model()
+    results = []
+    for probs in classifier.predict_proba(vectorizer.transform([t or '' for t in texts])):
+        categories = {label: round(float(p), 4) for label, p in zip(labels, probs)}
+        results.append((1.0 - categories.get('Neutral', 0.0), categories))
+    return results
+
+
+def scorer(name, default=None):
+    """Predictor for scorer ``name``; 'bert' is ``default`` (the pipeline's predictor)."""
+    if name == 'student':
+        return _student_predict
+    if name == 'tfidf':
+        return _tfidf_predict
+    if name == 'bert':
+        if default is not None:
+            return default
+        from .pipeline import _default_predict
+        return _default_predict
+    raise ValueError(f"Unknown scorer {name!r}; expected one of {SCORERS}")
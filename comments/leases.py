@@ -0,0 +1,129 @@
+"""Lease-based distribution of ChannelVideo fetches across worker processes.
+
+A worker claims a video by writing its id and an expiry into
+``lease_owner``/``lease_expires_at``, renews the expiry while it works
+(``LeaseKeeper``) and releases the lease when done, stamping
+``last_fetched_at``. A claim succeeds only for videos that are unleased or
+whose lease has expired, so a crashed worker's videos become claimable again
+after one TTL. On Postgres candidates are locked with ``SELECT ... FOR UPDATE
+SKIP LOCKED``; elsewhere each claim is a compare-and-set UPDATE that only one
+worker can win.
+"""
+import os
+import socket
+import threading
+import uuid
+from datetime import timedelta
+
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import ChannelVideo
+
+DEFAULT_TTL = 600
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def _claimable(fetched_before, now):
+    """Videos not fetched since ``fetched_before`` and not held by a live lease."""
+    qs = ChannelVideo.objects.filter(Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lt=now))
+    if fetched_before is not None:
+        qs = qs.filter(Q(last_fetched_at__isnull=True) | Q(last_fetched_at__lt=fetched_before))
+    return qs
+
+
+def claim(owner, ttl=DEFAULT_TTL, limit=1, fetched_before=None, exclude=()):
+    """Lease up to ``limit`` videos for ``owner``; returns their video ids.
+
+    Least recently fetched videos come first. ``fetched_before`` skips videos
+    another worker has fetched since then (e.g. since this run started).
+    """
+    now = timezone.now()
+    expires = now + timedelta(seconds=ttl)
+    candidates = (_claimable(fetched_before, now).exclude(video_id__in=list(exclude))
+                  .order_by(F('last_fetched_at').asc(nulls_first=True), 'created_at'))
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(candidates.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit])
+            ChannelVideo.objects.filter(pk__in=ids).update(lease_owner=owner, lease_expires_at=expires)
+        return list(ChannelVideo.objects.filter(pk__in=ids).values_list('video_id', flat=True))
+    claimed = []
+    # Over-fetch candidates since concurrent workers race for the same rows
+    for pk, video_id in candidates.values_list('pk', 'video_id')[:limit * 4]:
+        won = _claimable(fetched_before, now).filter(pk=pk).update(lease_owner=owner, lease_expires_at=expires)
+        if won:
+            claimed.append(video_id)
+            if len(claimed) >= limit:
+                break
+    return claimed
+
+
+def renew(owner, video_ids, ttl=DEFAULT_TTL):
+    """Extend ``owner``'s leases; returns how many are still held."""
+    return ChannelVideo.objects.filter(video_id__in=list(video_ids), lease_owner=owner).update(
+        lease_expires_at=timezone.now() + timedelta(seconds=ttl))
+
+
+def release(owner, video_id, fetched=True):
+    """Give up a lease, recording the fetch time when the video was processed."""
+    fields = {'lease_owner': '', 'lease_expires_at': None}
+    if fetched:
+        fields['last_fetched_at'] = timezone.now()
+    return ChannelVideo.objects.filter(video_id=video_id, lease_owner=owner).update(**fields)
+
+
+def pending(fetched_before, exclude=()):
+    """Videos still to fetch in this pass that another worker holds a live lease on."""
+    now = timezone.now()
+    qs = ChannelVideo.objects.filter(lease_expires_at__gte=now).exclude(video_id__in=list(exclude))
+    if fetched_before is not None:
+        qs = qs.filter(Q(last_fetched_at__isnull=True) | Q(last_fetched_at__lt=fetched_before))
+    return qs.count()
+
+
+class LeaseKeeper:
+    """Renew a worker's leases from a background thread every ``ttl / 3`` seconds."""
+
+    def __init__(self, owner, ttl=DEFAULT_TTL):
+        self.owner = owner
+        self.ttl = ttl
+        self.held = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add(self, video_id):
+        with self._lock:
+            self.held.add(video_id)
+
+    def discard(self, video_id):
+        with self._lock:
+            self.held.discard(video_id)
+
+    def _run(self):
+        close_old_connections()
+        try:
+            while not self._stop.wait(max(1.0, self.ttl / 3)):
+                with self._lock:
+                    held = list(self.held)
+                if held:
+                    try:
+                        renew(self.owner, held, self.ttl)
+                    except Exception:
+                        # A missed renewal only shortens the lease; retry on the next tick
+                        pass
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name='lease-keeper', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join(timeout=5)
@@ -0,0 +1,229 @@
+"""Toxic-lexicon matcher built from the curated training dataset.
+
+The ``Toxic_Word_or_Phrase`` column of ``cleaned_shuffled_dataset.csv`` is
+compiled into an Aho-Corasick automaton, so a comment is scanned once in time
+linear in its length regardless of how many phrases the lexicon holds.
+
+Text and phrases go through the same normalization before matching:
+lowercase, common leetspeak digits/symbols, Telugu transliteration variants
+(``dh``/``d``, ``sh``/``s``, ``w``/``v``...), punctuation as word breaks and
+repeated letters collapsed (``veedhavaaa`` matches ``vedava``). Matches must
+start and end on word boundaries and are reported as spans of the original
+text, for highlighting.
+
+Folding makes short keys collide with everyday words (``shit`` folds to
+``sit``, ``threat`` to ``treat``), so keys shorter than ``MIN_PHRASE_LENGTH``
+and keys equal to an ordinary word are dropped. Ordinary words are the words
+of the dataset's Neutral sentences, ``ORDINARY_WORDS`` and, if set, the word
+list at ``settings.TOXIC_LEXICON_ORDINARY_WORDS_PATH`` (one word per line).
+A match alone never removes a comment: see ``match_decision``.
+"""
+import csv
+import os
+import threading
+from collections import deque, namedtuple
+
+from django.conf import settings
+
+Match = namedtuple('Match', 'start end phrase category language')
+
+# Normalized phrases shorter than this are dropped (``ass`` folds to ``as``, ``die`` is everyday English)
+MIN_PHRASE_LENGTH = 5
+
+# Common words whose folded form a lexicon key could take; matched after normalization
+ORDINARY_WORDS = (
+    'treat', 'karen', 'watch', 'think', 'thing', 'there', 'these', 'those', 'three', 'thanks', 'shall',
+    'share', 'sheet', 'shoot', 'short', 'shirt', 'sister', 'other', 'whole', 'where', 'which', 'white',
+    'water', 'wheat',
+)
+
+_LEET = {'0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '@': 'a', '$': 's'}
+# Applied left to right before repeated letters are collapsed
+_DIGRAPHS = {
+    'bh': 'b', 'ch': 'c', 'dh': 'd', 'gh': 'g', 'jh': 'j', 'kh': 'k', 'ph': 'f', 'sh': 's', 'th': 't',
+    'ck': 'k',
+}
+_LETTERS = {'w': 'v', 'z': 'j', 'q': 'k'}
+
+
+def normalize(text):
+    """Return ``(normalized, starts, ends)``; character ``i`` of ``normalized``
+    comes from ``text[starts[i]:ends[i]]``."""
+    folded = []
+    for i, ch in enumerate(text or ''):
+        c = ch.lower()
+        c = _LEET.get(c, c)
+        if c.isalnum():
+            folded.append((c, i, i + 1))
+        elif folded and folded[-1][0] != ' ':
+            folded.append((' ', i, i + 1))
+
+    chars, starts, ends = [], [], []
+    i = 0
+    while i < len(folded):
+        c, start, end = folded[i]
+        if i + 1 < len(folded) and c + folded[i + 1][0] in _DIGRAPHS:
+            c, end = _DIGRAPHS[c + folded[i + 1][0]], folded[i + 1][2]
+            i += 2
+        else:
+            c = _LETTERS.get(c, c)
+            i += 1
+        if chars and chars[-1] == c:
+            ends[-1] = end  # collapse repeats into one character spanning them all
+            continue
+        chars.append(c)
+        starts.append(start)
+        ends.append(end)
+    if chars and chars[-1] == ' ':
+        chars.pop(), starts.pop(), ends.pop()
+    return ''.join(chars), starts, ends
+
+
+class Automaton:
+    """Aho-Corasick automaton over normalized phrases."""
+
+    def __init__(self, phrases):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]  # per state: (pattern index, pattern length)
+        for index, phrase in enumerate(phrases):
+            state = 0
+            for c in phrase:
+                nxt = self.goto[state].get(c)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][c] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = nxt
+            self.out[state].append((index, len(phrase)))
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for c, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and c not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(c, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def iter(self, text):
+        """Yield ``(start, end, pattern index)`` for every occurrence, ``end`` exclusive."""
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for pos, c in enumerate(text):
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            for index, length in out[state]:
+                yield pos + 1 - length, pos + 1, index
+
+
+class Lexicon:
+    def __init__(self, entries, ordinary=()):
+        """``entries``: iterable of ``(phrase, category, language)``; ``ordinary``: words never matched."""
+        self.entries = []
+        seen = {normalize(word)[0] for word in ordinary}
+        for phrase, category, language in entries:
+            key = normalize(phrase)[0]
+            if len(key) < MIN_PHRASE_LENGTH or key in seen:
+                continue
+            seen.add(key)
+            self.entries.append((key, phrase.strip(), category, language))
+        self.automaton = Automaton([e[0] for e in self.entries])
+
+    def __len__(self):
+        return len(self.entries)
+
+    def scan(self, text):
+        """Leftmost-longest, non-overlapping whole-word matches in ``text``."""
+        norm, starts, ends = normalize(text)
+        found = []
+        for start, end, index in self.automaton.iter(norm):
+            if (start == 0 or norm[start - 1] == ' ') and (end == len(norm) or norm[end] == ' '):
+                found.append((start, end, index))
+        found.sort(key=lambda m: (m[0], m[0] - m[1]))
+        matches = []
+        last_end = 0
+        for start, end, index in found:
+            if start < last_end:
+                continue
+            _key, phrase, category, language = self.entries[index]
+            matches.append(Match(starts[start], ends[end - 1], phrase, category, language))
+            last_end = end
+        return matches
+
+    def scan_many(self, texts):
+        return [self.scan(t) for t in texts]
+
+
+def load_entries(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            phrase = (row.get('Toxic_Word_or_Phrase') or '').strip()
+            category = (row.get('Category_of_Toxicity') or '').strip()
+            if phrase and phrase.upper() != 'NULL' and category != 'Neutral':
+                yield phrase, category, (row.get('Language_Type') or '').strip()
+
+
+def load_ordinary_words(path):
+    """Words of the dataset's Neutral sentences, ``ORDINARY_WORDS`` and the configured word list."""
+    words = set(ORDINARY_WORDS)
+    try:
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                if (row.get('Category_of_Toxicity') or '').strip() == 'Neutral':
+                    words.update((row.get('Context_or_Example_Sentence') or '').split())
+    except OSError:
+        pass
+    extra = getattr(settings, 'TOXIC_LEXICON_ORDINARY_WORDS_PATH', None)
+    if extra:
+        try:
+            with open(extra, encoding='utf-8') as f:
+                words.update(line.strip() for line in f if line.strip())
+        except OSError:
+            pass
+    return words
+
+
+def match_decision():
+    """Decision for comments with a lexicon match and no model call: 'review' or None (tag only).
+
+    A lexicon hit alone never rejects a comment, so a configured 'toxic' is treated as 'review'.
+    """
+    decision = getattr(settings, 'LEXICON_MATCH_DECISION', 'review')
+    return 'review' if decision == 'toxic' else (decision or None)
+
+
+def _lexicon_path():
+    return str(getattr(settings, 'TOXIC_LEXICON_PATH',
+                       os.path.join(settings.BASE_DIR, 'toxicity_models', 'cleaned_shuffled_dataset.csv')))
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def get_lexicon():
+    """The compiled lexicon, rebuilt when the dataset file changes. Empty if it is missing."""
+    path = _lexicon_path()
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        lexicon = Lexicon(load_entries(path), load_ordinary_words(path)) if mtime is not None else Lexicon([])
+        _cache[path] = (mtime, lexicon)
+        return lexicon
+
+
+def first_phrase(text):
+    """Original-text span of the first lexicon match, or ''."""
+    matches = get_lexicon().scan(text)
+    return text[matches[0].start:matches[0].end] if matches else ''
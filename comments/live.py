@@ -0,0 +1,81 @@
+"""Cross-process live event feed for the dashboard (server-sent events).
+
+Views and management commands append one JSON line per event to
+``settings.LIVE_EVENTS_PATH``; the SSE endpoint tails that file, so events from
+``moderate_live`` or ``fetch_all_comments`` reach open dashboards just like
+events from moderator clicks. The byte offset just past an event is its SSE id,
+which lets a reconnecting EventSource resume from ``Last-Event-ID``.
+
+Event types:
+    classified  a new comment was stored (``status``, ``html`` row fragment)
+    status      a comment moved from ``old_status`` to ``new_status``
+    counts      per-video stat deltas, e.g. {"review": -1, "deleted": 1}
+"""
+import json
+import os
+import threading
+
+from django.conf import settings
+
+_write_lock = threading.Lock()
+
+
+def _path():
+    return str(getattr(settings, 'LIVE_EVENTS_PATH', settings.BASE_DIR / 'live_events.jsonl'))
+
+
+def publish_many(events):
+    """Append events (dicts with at least a ``type``) in a single write."""
+    if not events:
+        return
+    path = _path()
+    payload = ''.join(json.dumps(e, default=str, separators=(',', ':')) + '\n' for e in events)
+    with _write_lock:
+        try:
+            if os.path.getsize(path) > getattr(settings, 'LIVE_EVENTS_MAX_BYTES', 5 * 1024 * 1024):
+                # Readers whose offset is past the new end start again from 0
+                os.replace(path, path + '.1')
+        except OSError:
+            pass
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(payload)
+
+
+def publish(event_type, video_id=None, **data):
+    publish_many([dict(data, type=event_type, video_id=video_id)])
+
+
+def current_offset():
+    try:
+        return os.path.getsize(_path())
+    except OSError:
+        return 0
+
+
+def read_events(offset):
+    """Return ``([(next_offset, event), ...], new_offset)`` for complete lines after ``offset``."""
+    path = _path()
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return [], 0
+    if offset > size:
+        offset = 0
+    if offset == size:
+        return [], offset
+    events = []
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(size - offset)
+    pos = 0
+    while True:
+        end = data.find(b'\n', pos)
+        if end < 0:
+            break  # partial line still being written
+        line = data[pos:end]
+        pos = end + 1
+        try:
+            events.append((offset + pos, json.loads(line)))
+        except ValueError:
+            continue
+    return events, offset + pos
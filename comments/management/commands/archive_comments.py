@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from comments import archive
+
+
+class Command(BaseCommand):
+    help = "Move settled comments older than N days from the Comment table to ArchivedComment"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than-days", type=int, default=90,
+                            help="Only archive comments published more than this many days ago")
+        parser.add_argument("--statuses", default=",".join(archive.SETTLED_STATUSES),
+                            help="Comma-separated moderation statuses treated as settled")
+        parser.add_argument("--video", default=None, help="Only archive this video's comments")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many comments would move")
+
+    def handle(self, *args, **options):
+        statuses = [s.strip() for s in options["statuses"].split(",") if s.strip()]
+        if {"review", "unclassified"} & set(statuses):
+            raise CommandError("Comments awaiting review or classification cannot be archived")
+        if options["dry_run"]:
+            count = archive.candidates(options["older_than_days"], statuses, options["video"]).count()
+            self.stdout.write(self.style.NOTICE(f"{count} comments would be archived."))
+            return
+        moved = archive.archive(options["older_than_days"], statuses, options["video"],
+                                batch_size=options["batch_size"], log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {moved} {'/'.join(statuses)} comments older than {options['older_than_days']} days."
+        ))
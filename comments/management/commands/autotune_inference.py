@@ -0,0 +1,118 @@
+from django.core.management.base import BaseCommand, CommandError
+from comments.models import Comment
+from datetime import datetime
+import json
+import os
+
+
+def _int_list(value):
+    try:
+        return sorted({int(v) for v in value.split(",") if v.strip()})
+    except ValueError:
+        raise CommandError(f"Expected a comma-separated list of integers, got {value!r}")
+
+
+class Command(BaseCommand):
+    help = "Sweep inference batch size, torch threads and replica processes; write the tuned profile bert_infer loads"
+
+    def add_arguments(self, parser):
+        cpus = os.cpu_count() or 1
+        parser.add_argument("--sample-size", type=int, default=512, help="Stored comments to score per configuration")
+        parser.add_argument("--batch-sizes", type=_int_list, default=[1, 4, 8, 16, 32, 64])
+        parser.add_argument("--threads", type=_int_list, default=sorted({1, 2, 4, cpus}),
+                            help="Intra-op thread counts to try")
+        parser.add_argument("--replicas", type=_int_list, default=sorted({1, 2, 4}),
+                            help="Model replica (process) counts to try")
+        parser.add_argument("--max-p95-ms", type=float, default=None,
+                            help="Prefer the fastest configuration whose p95 batch latency stays under this")
+        parser.add_argument("--backend", choices=["bert", "student"], default="bert")
+        parser.add_argument("--dry-run", action="store_true", help="Print results without writing the profile")
+
+    def handle(self, *args, **options):
+        try:
+            import torch  # noqa: F401
+            from toxicity_models.transformers import autotune
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Autotuning needs torch and transformers: {e}"))
+            return
+
+        texts = self._sample(options["sample_size"])
+        if not texts:
+            self.stdout.write(self.style.WARNING("No comments to benchmark with."))
+            return
+        cpus = os.cpu_count() or 1
+        configs = [(t, r) for t in options["threads"] for r in options["replicas"] if t * r <= cpus]
+        if not configs:
+            raise CommandError(f"Every threads x replicas combination exceeds the {cpus} available CPUs")
+        self.stdout.write(self.style.NOTICE(
+            f"Benchmarking {len(texts)} comments over {len(configs)} thread/replica settings "
+            f"x {len(options['batch_sizes'])} batch sizes ({options['backend']} backend)"
+        ))
+
+        rows = []
+        self.stdout.write(f"{'threads':>7} {'replicas':>8} {'batch':>5} {'comments/s':>11} {'p50 ms':>8} {'p95 ms':>8}")
+        for threads, replicas in configs:
+            try:
+                results = autotune.measure(texts, options["batch_sizes"], threads, replicas, backend=options["backend"])
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(f"threads={threads} replicas={replicas} failed: {e}"))
+                continue
+            for row in sorted(results, key=lambda r: r["batch_size"]):
+                rows.append(row)
+                self.stdout.write(
+                    f"{threads:>7} {replicas:>8} {row['batch_size']:>5} {row['throughput_per_second'] or 0:>11.1f} "
+                    f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f}"
+                )
+
+        best = autotune.choose(rows, options["max_p95_ms"])
+        if best is None:
+            self.stdout.write(self.style.ERROR("No configuration completed."))
+            return
+        if options["max_p95_ms"] is not None and best["p95_ms"] > options["max_p95_ms"]:
+            self.stdout.write(self.style.WARNING(
+                f"No configuration met p95 <= {options['max_p95_ms']} ms; using the fastest overall"
+            ))
+        profile = {
+            "backend": options["backend"],
+            "batch_size": best["batch_size"],
+            "intra_op_threads": best["intra_op_threads"],
+            "replicas": best["replicas"],
+            "throughput_per_second": best["throughput_per_second"],
+            "p95_ms": best["p95_ms"],
+            "cpu_count": cpus,
+            "sample_size": len(texts),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "results": rows,
+        }
+        self.stdout.write(self.style.SUCCESS(
+            f"Best: batch_size={best['batch_size']} threads={best['intra_op_threads']} replicas={best['replicas']} "
+            f"-> {best['throughput_per_second']:.1f} comments/s, p95 {best['p95_ms']:.1f} ms"
+        ))
+        if options["dry_run"]:
+            return
+        try:
+            with open(autotune.PROFILE_PATH) as f:
+                # Routes saved by language_stats outlive a re-tune
+                previous = json.load(f)
+            if previous.get("language_scorers"):
+                profile["language_scorers"] = previous["language_scorers"]
+        except (OSError, ValueError):
+            pass
+        os.makedirs(os.path.dirname(autotune.PROFILE_PATH), exist_ok=True)
+        with open(autotune.PROFILE_PATH, "w") as f:
+            json.dump(profile, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Profile written to {autotune.PROFILE_PATH}"))
+
+    def _sample(self, size):
+        # Random sample of stored comments keeps the real length mix; the dataset fills in on a fresh install
+        texts = list(Comment.objects.exclude(text="").order_by("?").values_list("text", flat=True)[:size])
+        if len(texts) < size:
+            from comments.lexicon import _lexicon_path
+            import csv
+            try:
+                with open(_lexicon_path(), newline="", encoding="utf-8") as f:
+                    texts.extend(row["Context_or_Example_Sentence"] for row in csv.DictReader(f)
+                                 if row.get("Context_or_Example_Sentence"))
+            except OSError:
+                pass
+        return texts[:size]
@@ -0,0 +1,95 @@
+from django.core.management.base import BaseCommand
+from comments.models import ChannelVideo
+from comments import video_config
+import time
+
+
+class Command(BaseCommand):
+    help = "Backfill the full comment history of videos through the streaming pipeline with bounded memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument("video_ids", nargs="*", help="Videos to backfill (default: all monitored videos)")
+        parser.add_argument("--batch-size", type=int, default=32, help="Comments per inference batch")
+        parser.add_argument("--page-size", type=int, default=100, help="commentThreads page size (max 100)")
+        parser.add_argument("--queue-size", type=int, default=8, help="Max items waiting between two stages")
+        parser.add_argument("--max-comments", type=int, default=None, help="Stop each video after this many comments")
+        parser.add_argument("--mode", choices=["thread", "inline"], default="thread",
+                            help="Run fetch/dedupe/infer stages on their own threads or inline")
+        parser.add_argument("--infer-in-process", action="store_true",
+                            help="Run the inference stage in a separate process")
+        parser.add_argument("--infer-replicas", type=int, default=None,
+                            help="Inference processes (implies --infer-in-process when > 1; "
+                                 "default: replicas from the autotune_inference profile)")
+        parser.add_argument("--skip-replies", action="store_true", help="Only ingest top-level comments")
+        parser.add_argument("--backend", choices=["bert", "student"], default=None,
+                            help="Inference backend (default: AIGUARDIAN_INFERENCE_BACKEND or bert); "
+                                 "student is the distilled CPU model from distill_student")
+        parser.add_argument("--verbose-scores", action="store_true", help="Log every comment score")
+
+    def handle(self, *args, **options):
+        video_list = options["video_ids"]
+        if not video_list:
+            try:
+                video_list = list(ChannelVideo.objects.order_by('-created_at').values_list('video_id', flat=True))
+            except Exception:
+                video_list = []
+            video_list = video_list or getattr(video_config, 'CHANNEL_VIDEOS', [])
+        if not video_list:
+            self.stdout.write(self.style.WARNING("No videos configured to backfill."))
+            return
+
+        try:
+            from comments.youtube_service import get_youtube_service
+            youtube = get_youtube_service()
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"YouTube service unavailable: {e}"))
+            return
+
+        if options["backend"]:
+            from toxicity_models.transformers.bert_infer import set_backend
+            set_backend(options["backend"])
+
+        from toxicity_models.transformers.bert_infer import load_profile
+        replicas = options["infer_replicas"] or load_profile().get("replicas") or 1
+        infer_in_process = options["infer_in_process"] or replicas > 1
+        if infer_in_process:
+            self.stdout.write(self.style.NOTICE(f"Running inference in {replicas} process(es)"))
+
+        from comments.pipeline import ingest_video
+
+        def log(message, level='NOTICE'):
+            if level != 'NOTICE' or options["verbose_scores"]:
+                self.stdout.write(getattr(self.style, level)(message))
+
+        total = 0
+        for video_id in video_list:
+            self.stdout.write(self.style.NOTICE(f"Backfilling video: {video_id}"))
+            started = time.monotonic()
+            count = 0
+            try:
+                for batch in ingest_video(
+                    video_id, youtube,
+                    batch_size=options["batch_size"],
+                    page_size=options["page_size"],
+                    max_items=options["max_comments"],
+                    mode=options["mode"],
+                    infer_mode="process" if infer_in_process else None,
+                    infer_replicas=replicas,
+                    queue_size=options["queue_size"],
+                    include_replies=not options["skip_replies"],
+                    # The fetch and dedupe threads each need their own client
+                    youtube_factory=get_youtube_service,
+                    # Open dashboards get count deltas, not millions of row events
+                    row_events=False,
+                    log=log,
+                ):
+                    count += len(batch)
+                    if count % 1000 < len(batch):
+                        rate = count / max(time.monotonic() - started, 1e-6)
+                        self.stdout.write(f"  {video_id}: {count} new comments stored ({rate:.1f}/s)")
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"Failed backfilling {video_id} after {count} comments: {e}"))
+            total += count
+            self.stdout.write(self.style.SUCCESS(f"  → {count} new comments added for {video_id}"))
+
+        self.stdout.write(self.style.SUCCESS(f"Finished. Total new comments added: {total}"))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from comments import caching, tiles
+import time
+
+
+class Command(BaseCommand):
+    help = ("Build content-hashed WebP/PNG tile thumbnails for channel videos from their source images "
+            "and prune tiles that are no longer used")
+
+    def add_arguments(self, parser):
+        parser.add_argument("video_ids", nargs="*", help="Videos to build (default: every channel video)")
+        parser.add_argument("--force", action="store_true", help="Rebuild even if the source image is unchanged")
+        parser.add_argument("--no-fetch", action="store_true",
+                            help="Skip videos without a local source image instead of downloading the YouTube thumbnail")
+        parser.add_argument("--no-prune", action="store_true", help="Keep tile files the manifest no longer names")
+
+    def handle(self, *args, **options):
+        if not tiles.have_pillow():
+            self.stdout.write(self.style.ERROR("Building tiles needs Pillow (pip install Pillow)."))
+            return
+        video_ids = options["video_ids"] or [vid for vid, _link, _name in caching.video_list()]
+        started = time.monotonic()
+        built, missing, failed = 0, [], []
+        for video_id in video_ids:
+            try:
+                entry = tiles.build(video_id, force=options["force"], fetch=False if options["no_fetch"] else None)
+            except Exception as e:
+                failed.append(video_id)
+                self.stdout.write(self.style.WARNING(f"{video_id}: {e}"))
+                continue
+            if entry is None:
+                missing.append(video_id)
+                continue
+            built += 1
+            sizes = ", ".join(f"{fmt} {'/'.join(entry[fmt])}px" for fmt in tiles.CONTENT_TYPES if fmt in entry)
+            self.stdout.write(f"  {video_id}: {sizes}")
+        if built:
+            # Home page ETags follow the video list version
+            caching.touch_videos()
+        removed = 0 if options["no_prune"] else tiles.prune()
+        self.stdout.write(self.style.SUCCESS(
+            f"{built} tile(s) current in {time.monotonic() - started:.1f}s; {removed} stale file(s) removed."
+        ))
+        if missing:
+            self.stdout.write(self.style.WARNING(f"No source image for: {', '.join(missing)}"))
+        if failed:
+            self.stdout.write(self.style.WARNING(f"Failed: {', '.join(failed)}"))
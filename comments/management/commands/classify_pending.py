@@ -0,0 +1,116 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from comments.models import Comment
+import time
+
+
+def pending_rows(video_id=None, page_size=2000):
+    """Unclassified comments as pipeline rows, oldest id first, one page in memory at a time."""
+    qs = Comment.objects.filter(moderation_status='unclassified').order_by('comment_id')
+    if video_id:
+        qs = qs.filter(video_id=video_id)
+    fields = ('comment_id', 'video_id', 'author', 'text', 'like_count', 'published_at')
+    last = None
+    while True:
+        page = qs.filter(comment_id__gt=last) if last is not None else qs
+        rows = list(page.values(*fields)[:page_size])
+        if not rows:
+            return
+        yield from rows
+        last = rows[-1]['comment_id']
+
+
+class Command(BaseCommand):
+    help = ("Classify comments stored as unclassified (imports from import_comments, or batches whose "
+            "inference failed) in batches through the ingest pipeline's inference stage")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--video", default=None, help="Only this video")
+        parser.add_argument("--batch-size", type=int, default=32, help="Comments per inference batch")
+        parser.add_argument("--infer-replicas", type=int, default=None,
+                            help="Inference processes (default: replicas from the autotune_inference profile)")
+        parser.add_argument("--backend", choices=["bert", "student"], default=None,
+                            help="Inference backend (default: AIGUARDIAN_INFERENCE_BACKEND or bert)")
+        parser.add_argument("--apply-youtube", action="store_true",
+                            help="Reject toxic comments on YouTube and mark them deleted (default: send them to review)")
+        parser.add_argument("--verbose-scores", action="store_true", help="Log every comment score")
+
+    def handle(self, *args, **options):
+        from comments.moderation import ACTOR_MODEL, change_status
+        from comments.pipeline import Stage, _status_for, batch_infer, detect_language, run_pipeline
+        from comments.review_queue import priority
+
+        if options["backend"]:
+            from toxicity_models.transformers.bert_infer import set_backend
+            set_backend(options["backend"])
+        from toxicity_models.transformers.bert_infer import load_profile
+        replicas = options["infer_replicas"] or load_profile().get("replicas") or 1
+
+        youtube = None
+        if options["apply_youtube"]:
+            try:
+                from comments.youtube_service import get_youtube_service
+                youtube = get_youtube_service()
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(f"YouTube service unavailable, toxic comments go to review: {e}"))
+
+        def log(message, level='NOTICE'):
+            if level != 'NOTICE' or options["verbose_scores"]:
+                self.stdout.write(getattr(self.style, level)(message))
+
+        infer_kwargs = {'batch_size': options["batch_size"]}
+        if replicas > 1:
+            self.stdout.write(self.style.NOTICE(f"Running inference in {replicas} processes"))
+        else:
+            infer_kwargs['log'] = log
+        stages = [
+            Stage(detect_language, mode='inline'),
+            Stage(batch_infer, mode='process' if replicas > 1 else 'inline', replicas=replicas, **infer_kwargs),
+        ]
+
+        started = time.monotonic()
+        classified = 0
+        failed = 0
+        moved = {}
+        for batch in run_pipeline(pending_rows(options["video"]), stages):
+            updates = []
+            moves = {}
+            scores = {}
+            for row in batch:
+                status = _status_for(row, youtube, log)
+                if status == 'unclassified':
+                    # Inference failed; the comment stays queued for the next run
+                    failed += 1
+                    continue
+                updates.append((
+                    row.get('score'),
+                    row.get('category') or row.get('toxic_category') or '',
+                    priority(row.get('score'), row['like_count'], row['published_at']),
+                    row.get('language') or '',
+                    row['comment_id'],
+                ))
+                moves.setdefault(status, []).append(row['comment_id'])
+                scores[row['comment_id']] = row.get('score')
+            with transaction.atomic():
+                # One prepared statement per row; bulk_update's CASE expressions cost more than the writes
+                with connection.cursor() as cursor:
+                    cursor.executemany(
+                        f"UPDATE {Comment._meta.db_table} SET toxicity_score = %s, toxicity_category = %s, "
+                        "review_priority = %s, language = %s WHERE comment_id = %s",
+                        updates,
+                    )
+                for status, ids in moves.items():
+                    # Open dashboards get count deltas, not a row event per comment
+                    change_status(ids, status, actor=ACTOR_MODEL, scores=scores, row_events=False)
+            classified += len(updates)
+            for status, ids in moves.items():
+                moved[status] = moved.get(status, 0) + len(ids)
+            if classified and classified % 1000 < len(updates):
+                rate = classified / max(time.monotonic() - started, 1e-6)
+                self.stdout.write(f"  {classified} comments classified ({rate:.1f}/s)")
+
+        summary = ", ".join(f"{n} {status}" for status, n in sorted(moved.items())) or "none"
+        self.stdout.write(self.style.SUCCESS(
+            f"Classified {classified} comments in {time.monotonic() - started:.1f}s ({summary}); "
+            f"{failed} left unclassified after inference errors."
+        ))
@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 from comments.youtube_service import get_youtube_service
-from comments.models import Comment
+from comments.moderation import change_status
 
 class Command(BaseCommand):
     help = "Delete a comment from YouTube by comment ID"
@@ -18,6 +18,6 @@ class Command(BaseCommand):
         ).execute()
 
         # Update in DB
-        Comment.objects.filter(comment_id=comment_id).update(moderation_status="deleted")
+        change_status([comment_id], "deleted")
 
         self.stdout.write(self.style.SUCCESS(f"Comment {comment_id} deleted."))
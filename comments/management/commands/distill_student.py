@@ -0,0 +1,153 @@
+from django.core.management.base import BaseCommand
+from comments.models import Comment
+import json
+import os
+import random
+import time
+
+
+class Command(BaseCommand):
+    help = "Distill the BERT toxicity classifier into a small CPU student model and report agreement and throughput"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-comments", type=int, default=50000, help="Stored comments to use for distillation")
+        parser.add_argument("--reuse-scores", action="store_true",
+                            help="Reuse stored toxicity_score instead of asking the teacher; only valid if every stored "
+                                 "score came from BERT (not the student, tfidf or a language route)")
+        parser.add_argument("--holdout", type=float, default=0.2, help="Fraction held out for the agreement report")
+        parser.add_argument("--epochs", type=int, default=10)
+        parser.add_argument("--dim", type=int, default=64, help="Student embedding size")
+        parser.add_argument("--buckets", type=int, default=2 ** 18, help="Hashed n-gram buckets")
+        parser.add_argument("--teacher-batch-size", type=int, default=32)
+        parser.add_argument("--bench-size", type=int, default=512, help="Comments used for the throughput benchmark")
+        parser.add_argument("--seed", type=int, default=13)
+
+    def handle(self, *args, **options):
+        try:
+            from toxicity_models.transformers import bert_infer, student
+            import torch  # noqa: F401
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Distillation needs torch and transformers: {e}"))
+            return
+        # The teacher is always the full model, whatever backend the environment selects
+        bert_infer.set_backend("bert")
+        from comments.pipeline import chunked, decide
+
+        texts, targets = self._stored_comments(options)
+        dataset_texts = self._dataset_texts()
+        self.stdout.write(self.style.NOTICE(
+            f"{len(texts)} stored comments, {sum(s is not None for s in targets)} with reused scores; "
+            f"{len(dataset_texts)} dataset sentences to score"
+        ))
+        pending = [t for t in dataset_texts if t] + [t for t, s in zip(texts, targets) if s is None]
+        scored = dict(zip(texts, targets))
+        for batch in chunked(pending, options["teacher_batch_size"]):
+            for text, prob in zip(batch, bert_infer.predict_label1_prob(batch, batch_size=options["teacher_batch_size"])):
+                scored[text] = prob
+        examples = [(t, s) for t, s in scored.items() if s is not None and t.strip()]
+        if len(examples) < 10:
+            self.stdout.write(self.style.WARNING("Not enough scored text to train a student."))
+            return
+
+        rng = random.Random(options["seed"])
+        rng.shuffle(examples)
+        n_holdout = max(1, int(len(examples) * options["holdout"]))
+        test, train = examples[:n_holdout], examples[n_holdout:]
+        self.stdout.write(self.style.NOTICE(f"Training student on {len(train)} examples, {len(test)} held out"))
+
+        model = student.train(
+            [t for t, _s in train], [s for _t, s in train],
+            epochs=options["epochs"], buckets=options["buckets"], dim=options["dim"], seed=options["seed"],
+            log=self.stdout.write,
+        )
+        student.save(model, buckets=options["buckets"], dim=options["dim"])
+
+        test_texts = [t for t, _s in test]
+        teacher_probs = [s for _t, s in test]
+        student_probs = student.predict(test_texts, model=model, buckets=options["buckets"],
+                                        char_ngrams=student.DEFAULT_CHAR_NGRAMS)
+        report = {
+            "train_size": len(train),
+            "holdout_size": len(test),
+            "agreement": self._agreement(teacher_probs, student_probs, decide),
+            "throughput": self._benchmark(test_texts, options, bert_infer, student, model),
+            "model": {"path": student.STUDENT_PATH, "dim": options["dim"], "buckets": options["buckets"],
+                      "size_mb": round(os.path.getsize(student.STUDENT_PATH) / 1e6, 2)},
+        }
+        report_path = os.path.join(os.path.dirname(student.STUDENT_PATH), "student_report.json")
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+        agreement = report["agreement"]
+        throughput = report["throughput"]
+        self.stdout.write(self.style.SUCCESS(
+            f"Decision agreement {agreement['decision_agreement']:.1%}, MAE {agreement['mae']:.3f}, "
+            f"toxic recall {agreement['toxic_recall']:.1%}; "
+            f"student {throughput['student_per_second']:.0f}/s vs teacher {throughput['teacher_per_second']:.1f}/s "
+            f"({throughput['speedup']:.0f}x)"
+        ))
+        self.stdout.write(self.style.SUCCESS(f"Student saved to {student.STUDENT_PATH}; report at {report_path}"))
+
+    def _stored_comments(self, options):
+        qs = Comment.objects.exclude(text="").values_list("text", "toxicity_score")
+        texts, targets = [], []
+        for text, score in qs.iterator(chunk_size=2000):
+            texts.append(text)
+            # Stored scores may come from the student itself or tfidf, so by default the teacher rescores
+            targets.append(score if options["reuse_scores"] else None)
+            if len(texts) >= options["max_comments"]:
+                break
+        return texts, targets
+
+    def _dataset_texts(self):
+        import csv
+        from django.conf import settings
+        # Its own setting, so re-pointing the lexicon doesn't change the distillation corpus
+        path = str(getattr(settings, "DISTILL_DATASET_PATH",
+                           os.path.join(settings.BASE_DIR, "toxicity_models", "cleaned_shuffled_dataset.csv")))
+        try:
+            with open(path, newline="", encoding="utf-8") as f:
+                return [(row.get("Context_or_Example_Sentence") or "").strip() for row in csv.DictReader(f)]
+        except OSError:
+            return []
+
+    def _agreement(self, teacher, student_probs, decide):
+        teacher_decisions = [decide(p) for p in teacher]
+        student_decisions = [decide(p) for p in student_probs]
+        n = len(teacher)
+        labels = ("neutral", "review", "toxic")
+        confusion = {t: {s: 0 for s in labels} for t in labels}
+        for t, s in zip(teacher_decisions, student_decisions):
+            confusion[t][s] += 1
+        toxic_teacher = sum(1 for t in teacher_decisions if t == "toxic")
+        toxic_student = sum(1 for s in student_decisions if s == "toxic")
+        toxic_both = confusion["toxic"]["toxic"]
+        mean_t = sum(teacher) / n
+        mean_s = sum(student_probs) / n
+        cov = sum((a - mean_t) * (b - mean_s) for a, b in zip(teacher, student_probs))
+        var_t = sum((a - mean_t) ** 2 for a in teacher)
+        var_s = sum((b - mean_s) ** 2 for b in student_probs)
+        return {
+            "decision_agreement": sum(1 for t, s in zip(teacher_decisions, student_decisions) if t == s) / n,
+            "mae": sum(abs(a - b) for a, b in zip(teacher, student_probs)) / n,
+            "pearson": cov / (var_t * var_s) ** 0.5 if var_t and var_s else None,
+            "toxic_recall": toxic_both / toxic_teacher if toxic_teacher else 1.0,
+            "toxic_precision": toxic_both / toxic_student if toxic_student else 1.0,
+            "confusion_teacher_rows_student_cols": confusion,
+        }
+
+    def _benchmark(self, texts, options, bert_infer, student, model):
+        sample = (texts * (options["bench_size"] // max(len(texts), 1) + 1))[:options["bench_size"]]
+        bert_infer.predict_label1_prob(sample[:8])  # load weights outside the timed region
+        started = time.perf_counter()
+        bert_infer.predict_label1_prob(sample, batch_size=options["teacher_batch_size"])
+        teacher_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        student.predict(sample, model=model, buckets=options["buckets"], char_ngrams=student.DEFAULT_CHAR_NGRAMS)
+        student_seconds = time.perf_counter() - started
+        return {
+            "comments": len(sample),
+            "teacher_per_second": len(sample) / teacher_seconds,
+            "student_per_second": len(sample) / student_seconds,
+            "speedup": teacher_seconds / student_seconds if student_seconds else None,
+        }
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+from comments import export
+from datetime import date
+import os
+
+
+def _day(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Dates must be YYYY-MM-DD, got {value!r}")
+
+
+class Command(BaseCommand):
+    help = "Stream comments and model scores to a Parquet, Arrow IPC or CSV file in constant memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Output path (.parquet, .arrow, .csv or .csv.gz)")
+        parser.add_argument("--format", choices=export.FORMATS, default=None,
+                            help="Defaults to the output extension, else Parquet (CSV without pyarrow)")
+        parser.add_argument("--video", default=None, help="Only this video's comments")
+        parser.add_argument("--status", action="append", default=None,
+                            help="Only comments in this moderation status (repeatable)")
+        parser.add_argument("--start", type=_day, default=None, help="First IST publish day, YYYY-MM-DD")
+        parser.add_argument("--end", type=_day, default=None, help="Last IST publish day, YYYY-MM-DD")
+        parser.add_argument("--include-archived", action="store_true", help="Also export ArchivedComment rows")
+        parser.add_argument("--compression", default="zstd", choices=["zstd", "lz4", "snappy", "gzip", "none"],
+                            help="Parquet codec; Arrow IPC supports zstd and lz4")
+        parser.add_argument("--chunk-size", type=int, default=export.DEFAULT_CHUNK_SIZE,
+                            help="Comments read and written per batch")
+
+    def handle(self, *args, **options):
+        output = options["output"]
+        fmt = options["format"] or self._format_for(output)
+        if fmt != "csv" and not export.have_pyarrow():
+            if options["format"]:
+                raise CommandError(f"{fmt} export needs pyarrow; install it or use --format csv")
+            fmt = "csv"
+            if not output.lower().endswith((".csv", ".csv.gz")):
+                output = os.path.splitext(output)[0] + ".csv"
+            self.stdout.write(self.style.WARNING(f"pyarrow is not installed; writing CSV to {output} instead"))
+        if os.path.dirname(output):
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+        count = export.write(
+            output, fmt, compression=None if options["compression"] == "none" else options["compression"],
+            video_id=options["video"], statuses=options["status"], start=options["start"], end=options["end"],
+            include_archived=options["include_archived"], chunk_size=options["chunk_size"],
+        )
+        size_mb = os.path.getsize(output) / 1e6
+        self.stdout.write(self.style.SUCCESS(f"Exported {count} comments to {output} ({fmt}, {size_mb:.2f} MB)."))
+
+    def _format_for(self, path):
+        name = path.lower()
+        if name.endswith(".parquet"):
+            return "parquet"
+        if name.endswith((".arrow", ".feather", ".ipc")):
+            return "arrow"
+        if name.endswith((".csv", ".csv.gz")):
+            return "csv"
+        return export.default_format()
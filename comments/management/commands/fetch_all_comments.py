@@ -1,7 +1,9 @@
 from django.core.management.base import BaseCommand
-from comments.models import Comment, ChannelVideo
+from comments.models import ChannelVideo
 from comments import video_config
+from django.utils import timezone
 import os
+import time
 
 
 class Command(BaseCommand):
@@ -9,18 +11,38 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("--limit", type=int, default=100, help="Max comments per video to fetch")
+        parser.add_argument("--skip-replies", action="store_true", help="Only fetch top-level comments")
+        parser.add_argument("--worker-id", default=None,
+                            help="Name for this worker's video leases (default: host:pid:random)")
+        parser.add_argument("--lease-ttl", type=int, default=600,
+                            help="Seconds a claimed video stays leased without a heartbeat before other workers may take it")
+        parser.add_argument("--no-wait", action="store_true",
+                            help="Exit when nothing is claimable instead of waiting for other workers' leases to finish or expire")
+        parser.add_argument("--profile", nargs="?", const="cprofile", choices=["cprofile", "sampling"],
+                            help="Profile this run (cProfile by default) and record SQL query counts/timings")
 
     def handle(self, *args, **kwargs):
+        if kwargs.get("profile"):
+            from comments.profiling import profiled
+            with profiled("fetch_all_comments", mode=kwargs["profile"]) as run:
+                self._handle(*args, **kwargs)
+            self.stdout.write(self.style.NOTICE(f"Profile written to {run.output_dir}"))
+            return
+        self._handle(*args, **kwargs)
+
+    def _handle(self, *args, **kwargs):
         limit = kwargs.get("limit", 100)
+        started = timezone.now()
 
-        # Determine videos to process (DB first, fallback to config)
+        # Determine videos to process (DB first, fallback to config). DB videos are
+        # claimed one at a time through leases so several workers can share the list.
         try:
-            db_vids = list(ChannelVideo.objects.order_by('-created_at').values_list('video_id', flat=True))
-            video_list = db_vids if db_vids else getattr(video_config, 'CHANNEL_VIDEOS', [])
+            use_leases = ChannelVideo.objects.exists()
         except Exception:
-            video_list = getattr(video_config, 'CHANNEL_VIDEOS', [])
+            use_leases = False
+        video_list = [] if use_leases else getattr(video_config, 'CHANNEL_VIDEOS', [])
 
-        if not video_list:
+        if not use_leases and not video_list:
             self.stdout.write(self.style.WARNING("No videos configured to fetch."))
             return
 
@@ -33,7 +55,7 @@ class Command(BaseCommand):
 
         # Use transformer-based model exclusively
         try:
-            from toxicity_models.transformers.bert_infer import predict_label1_prob as bert_predict
+            from toxicity_models.transformers.bert_infer import predict_with_category as bert_predict
             self.stdout.write(self.style.NOTICE("Using transformer-based toxicity model (textdetox/bert-multilingual-toxicity-classifier)"))
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"Transformer model unavailable: {e}. Please install transformers/torch and the model."))
@@ -47,97 +69,66 @@ class Command(BaseCommand):
             youtube = None
             self.stdout.write(self.style.WARNING(f"YouTube service unavailable, will only store comments locally: {e}"))
 
-        total_new = 0
-        for video_id in video_list:
+        from comments.pipeline import ingest_video
+
+        def log(message, level='NOTICE'):
+            self.stdout.write(getattr(self.style, level)(message))
+
+        def process(video_id):
             self.stdout.write(self.style.NOTICE(f"Processing video: {video_id}"))
             try:
-                if youtube:
-                    request = youtube.commentThreads().list(
-                        part="snippet",
-                        videoId=video_id,
-                        textFormat="plainText",
-                        maxResults=limit,
-                    )
-                    response = request.execute()
-                else:
-                    response = {"items": []}
-
                 new_count = 0
-                for item in response.get("items", []):
-                    # item is a commentThread resource — the actual top-level comment id is under snippet.topLevelComment.id
-                    tlc = item.get("snippet", {}).get("topLevelComment", {})
-                    snippet = tlc.get("snippet", {})
-                    comment_id = tlc.get("id") or item.get("id")
-                    text = snippet.get("textDisplay", "")
-                    author = snippet.get("authorDisplayName", "")
-                    like_count = snippet.get("likeCount", 0)
-                    published_at_str = snippet.get("publishedAt")
-                    published_at = None
-                    if published_at_str:
-                        try:
-                            import datetime as _dt
-                            published_at = _dt.datetime.strptime(published_at_str, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=_dt.timezone.utc)
-                        except Exception:
-                            published_at = None
-
-                    obj, created = Comment.objects.get_or_create(
-                        comment_id=comment_id,
-                        defaults={
-                            "video_id": video_id,
-                            "author": author,
-                            "text": text,
-                            "like_count": like_count,
-                            "published_at": published_at,
-                        },
-                    )
-
-                    if created:
-                        try:
-                            # Predict LABEL_1 probability using transformer
-                            prob_label1 = float(bert_predict([text])[0])
-                            # Apply thresholds
-                            if prob_label1 > 0.45:
-                                decision = 'toxic'
-                            elif 0.30 <= prob_label1 <= 0.45:
-                                decision = 'review'
-                            else:
-                                decision = 'neutral'
-
-                            self.stdout.write(self.style.NOTICE(f"Transformer LABEL_1 score for {comment_id}: {prob_label1} -> {decision}"))
-
-                            if decision == 'toxic':
-                                if youtube:
-                                    try:
-                                        youtube.comments().setModerationStatus(id=comment_id, moderationStatus='rejected').execute()
-                                        obj.moderation_status = 'deleted'
-                                    except Exception as e:
-                                        obj.moderation_status = 'review'
-                                        self.stdout.write(self.style.WARNING(f"YouTube API delete failed for {comment_id}: {e}"))
-                                else:
-                                    obj.moderation_status = 'review'
-                            elif decision == 'review':
-                                obj.moderation_status = 'review'
-                            else:
-                                obj.moderation_status = 'neutral'
-
-                            obj.save()
-                            # If we set to review, add to retrain queue so it can be labeled by a human
-                            if obj.moderation_status == 'review':
-                                try:
-                                    import csv as _csv
-                                    queue_path = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'retrain_queue.csv'))
-                                    with open(queue_path, 'a', newline='', encoding='utf-8') as csvfile:
-                                        writer = _csv.writer(csvfile)
-                                        # Write minimal retrain row: comment_id, language_type (NULL), toxic_word (NULL), context (text), category (Neutral)
-                                        writer.writerow([comment_id, 'NULL', 'NULL', text, 'Neutral'])
-                                except Exception as e:
-                                    self.stdout.write(self.style.WARNING(f"Failed to append to retrain queue for {comment_id}: {e}"))
-                            new_count += 1
-                        except Exception as e:
-                            self.stdout.write(self.style.WARNING(f"Failed to classify comment {comment_id}: {e}"))
-                total_new += new_count
+                # Same stages as backfill_comments, run inline and capped at --limit threads
+                for batch in ingest_video(video_id, youtube, predict=bert_predict, max_items=limit,
+                                          include_replies=not kwargs.get("skip_replies"), log=log):
+                    new_count += len(batch)
                 self.stdout.write(self.style.SUCCESS(f"  → {new_count} new comments added for {video_id}"))
+                return new_count
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f"Failed processing {video_id}: {e}"))
+                return None
+
+        total_new = 0
+        if not use_leases:
+            for video_id in video_list:
+                total_new += process(video_id) or 0
+        else:
+            total_new = self._process_leased(process, started, kwargs)
 
         self.stdout.write(self.style.SUCCESS(f"Finished. Total new comments added: {total_new}"))
+
+    def _process_leased(self, process, started, kwargs):
+        from comments import leases
+        owner = kwargs.get("worker_id") or leases.worker_id()
+        ttl = kwargs["lease_ttl"]
+        self.stdout.write(self.style.NOTICE(f"Worker {owner} claiming videos (lease TTL {ttl}s)"))
+        total_new, done, failed = 0, 0, set()
+        with leases.LeaseKeeper(owner, ttl) as keeper:
+            while True:
+                claimed = leases.claim(owner, ttl, fetched_before=started, exclude=failed)
+                if not claimed:
+                    # Others may still hold videos from this pass; if one of them dies its
+                    # lease expires and we pick the video up here
+                    waiting = 0 if kwargs.get("no_wait") else leases.pending(started, exclude=failed)
+                    if not waiting:
+                        break
+                    time.sleep(min(30, max(1, ttl / 10)))
+                    continue
+                video_id = claimed[0]
+                keeper.add(video_id)
+                new_count = None
+                try:
+                    new_count = process(video_id)
+                finally:
+                    keeper.discard(video_id)
+                    fetched = new_count is not None
+                    if not leases.release(owner, video_id, fetched=fetched):
+                        self.stdout.write(self.style.WARNING(
+                            f"Lease on {video_id} expired while fetching; another worker may repeat it"))
+                if fetched:
+                    total_new += new_count
+                    done += 1
+                else:
+                    failed.add(video_id)
+        self.stdout.write(self.style.NOTICE(f"Worker {owner} fetched {done} video(s), {len(failed)} failed"))
+        return total_new
@@ -0,0 +1,57 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from comments import dumps
+import itertools
+import os
+import time
+
+
+class Command(BaseCommand):
+    help = ("Import comments from commentThreads exports (.json, .jsonl, .csv, optionally .gz) without API calls; "
+            "new comments are stored as unclassified for classify_pending")
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="Export files")
+        parser.add_argument("--video", default=None, help="Video id for rows that do not name one (e.g. per-video CSVs)")
+        parser.add_argument("--batch-size", type=int, default=dumps.DEFAULT_BATCH_SIZE,
+                            help="Comments per insert transaction")
+        parser.add_argument("--expected-rows", type=int, default=1000000,
+                            help="Rough number of comments being imported, to size the duplicate filter")
+        parser.add_argument("--classify", action="store_true", help="Run classify_pending once the import finishes")
+
+    def handle(self, *args, **options):
+        missing = [p for p in options["paths"] if not os.path.exists(p)]
+        if missing:
+            raise CommandError(f"File(s) not found: {', '.join(missing)}")
+
+        started = time.monotonic()
+        bloom = dumps.existing_filter(expected_new=options["expected_rows"])
+        self.stdout.write(self.style.NOTICE(
+            f"Loaded {bloom.count} stored comment ids into the duplicate filter "
+            f"({bloom.nbytes / 1e6:.1f} MB) in {time.monotonic() - started:.1f}s"
+        ))
+
+        stats = {}
+        rows = itertools.chain.from_iterable(
+            dumps.iter_rows(path, video_id=options["video"], stats=stats) for path in options["paths"]
+        )
+        stored = 0
+        videos = set()
+        try:
+            for batch in dumps.dedupe(rows, bloom, batch_size=options["batch_size"], stats=stats):
+                objs = dumps.store(batch)
+                stored += len(objs)
+                videos.update(o.video_id for o in objs)
+                rate = stats.get("parsed", 0) / max(time.monotonic() - started, 1e-6)
+                self.stdout.write(f"  {stats.get('parsed', 0)} rows read, {stored} new comments stored ({rate:.0f} rows/s)")
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stored} new comments for {len(videos)} video(s) in {time.monotonic() - started:.1f}s; "
+            f"{stats.get('duplicates', 0)} duplicates and {stats.get('skipped', 0)} unusable rows skipped."
+        ))
+        if stored and options["classify"]:
+            call_command("classify_pending", stdout=self.stdout, stderr=self.stderr)
+        elif stored:
+            self.stdout.write(self.style.NOTICE("Run `manage.py classify_pending` to score the imported comments."))
@@ -0,0 +1,194 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from comments.models import Comment, ModerationEvent
+import json
+import os
+import random
+import time
+
+
+class Command(BaseCommand):
+    help = ("Report language detection accuracy, per-language accuracy and latency of each scorer, and stored "
+            "comments per language; --write saves the cheapest adequate scorer per language for batch_infer")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scorers", default="bert,student,tfidf", help="Comma-separated scorers to compare")
+        parser.add_argument("--batch-size", type=int, default=32, help="Comments per scorer call")
+        parser.add_argument("--holdout", type=float, default=0.2,
+                            help="Fraction of the dataset held out to measure the language detector")
+        parser.add_argument("--max-examples", type=int, default=2000,
+                            help="Most evaluation comments per language")
+        parser.add_argument("--no-dataset", action="store_true",
+                            help="Evaluate scorers on moderator-decided comments only, not the curated dataset")
+        parser.add_argument("--max-drop", type=float, default=0.02,
+                            help="Accuracy a cheaper scorer may give up against the best one for its language")
+        parser.add_argument("--write", action="store_true",
+                            help="Save the chosen scorer per language to the inference profile")
+        parser.add_argument("--seed", type=int, default=13)
+
+    def handle(self, *args, **options):
+        from comments import language
+        from comments.pipeline import decide, split_prediction
+        from toxicity_models.transformers.autotune import percentile
+
+        names = [n.strip() for n in options["scorers"].split(",") if n.strip()]
+        unknown = [n for n in names if n not in language.SCORERS]
+        if unknown:
+            raise CommandError(f"Unknown scorer(s) {', '.join(unknown)}; expected {', '.join(language.SCORERS)}")
+        rng = random.Random(options["seed"])
+
+        self._detector_report(language, rng, options["holdout"])
+        self._stored_report()
+
+        examples = self._examples(language, rng, options)
+        if not examples:
+            self.stdout.write(self.style.WARNING("No labelled comments to evaluate scorers on."))
+            return
+        if "tfidf" in names and not options["no_dataset"]:
+            self.stdout.write(self.style.WARNING(
+                "tfidf is fitted on the curated dataset, so its accuracy on dataset sentences is optimistic; "
+                "compare with --no-dataset once moderators have decided enough comments."
+            ))
+
+        self.stdout.write(self.style.NOTICE("Scorer accuracy and latency per language"))
+        self.stdout.write(f"{'language':<9} {'scorer':<8} {'comments':>8} {'accuracy':>8} {'comments/s':>10} {'p95 ms':>8}")
+        results = []
+        for name in names:
+            predict = language.scorer(name)
+            for lang, rows in sorted(examples.items()):
+                texts = [text for text, _toxic in rows]
+                scores, batch_ms = [], []
+                started = time.perf_counter()
+                try:
+                    for start in range(0, len(texts), options["batch_size"]):
+                        batch_started = time.perf_counter()
+                        scores.extend(predict(texts[start:start + options["batch_size"]]))
+                        batch_ms.append((time.perf_counter() - batch_started) * 1000.0)
+                except Exception as e:
+                    self.stdout.write(self.style.WARNING(f"{name} unavailable: {e}"))
+                    break
+                elapsed = time.perf_counter() - started
+                correct = sum(
+                    (decide(split_prediction(output)[0]) != 'neutral') == toxic
+                    for output, (_text, toxic) in zip(scores, rows)
+                )
+                result = {
+                    "language": lang,
+                    "scorer": name,
+                    "comments": len(rows),
+                    "accuracy": correct / len(rows),
+                    "throughput_per_second": len(rows) / max(elapsed, 1e-9),
+                    "p95_ms": percentile(batch_ms, 95),
+                }
+                results.append(result)
+                self.stdout.write(
+                    f"{lang or 'unknown':<9} {name:<8} {len(rows):>8} {result['accuracy']:>8.3f} "
+                    f"{result['throughput_per_second']:>10.1f} {result['p95_ms']:>8.1f}"
+                )
+
+        routes = self._choose(results, options["max_drop"])
+        if not routes:
+            self.stdout.write(self.style.WARNING("No scorer completed; nothing to route."))
+            return
+        summary = ", ".join(f"{lang or 'unknown'} -> {name}" for lang, name in sorted(routes.items()))
+        self.stdout.write(self.style.SUCCESS(f"Cheapest scorer within {options['max_drop']:.3f} of the best: {summary}"))
+        if not options["write"]:
+            return
+        from toxicity_models.transformers import bert_infer
+        try:
+            with open(bert_infer.PROFILE_PATH) as f:
+                profile = json.load(f)
+        except (OSError, ValueError):
+            profile = {}
+        # '' (no letters) is never routed; batch_infer sends it to the default model
+        profile["language_scorers"] = {lang: name for lang, name in routes.items() if lang}
+        os.makedirs(os.path.dirname(bert_infer.PROFILE_PATH), exist_ok=True)
+        with open(bert_infer.PROFILE_PATH, "w") as f:
+            json.dump(profile, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Routes written to {bert_infer.PROFILE_PATH}"))
+        if getattr(settings, "LANGUAGE_SCORERS", None) is not None:
+            self.stdout.write(self.style.WARNING("settings.LANGUAGE_SCORERS is set and takes precedence over the profile."))
+
+    def _detector_report(self, language, rng, holdout):
+        examples = list(language.load_examples())
+        if not examples:
+            self.stdout.write(self.style.WARNING("Curated dataset not found; skipping the detector report."))
+            return
+        rng.shuffle(examples)
+        n_test = max(1, int(len(examples) * holdout))
+        model = language.NgramModel(examples[n_test:])
+        # The dataset's Telugu sentences are romanized, which the detector calls Hybrid
+        expected = [language.ENGLISH if lang == language.ENGLISH else language.HYBRID for _t, lang in examples[:n_test]]
+        started = time.perf_counter()
+        detected = language.detect_many([text for text, _lang in examples[:n_test]], model)
+        elapsed = time.perf_counter() - started
+        correct = sum(d == e for d, e in zip(detected, expected))
+        per_class = []
+        for lang in (language.ENGLISH, language.HYBRID):
+            total = expected.count(lang)
+            hits = sum(d == e == lang for d, e in zip(detected, expected))
+            per_class.append(f"{lang} recall {hits / total:.3f} ({total})" if total else f"{lang}: none held out")
+        self.stdout.write(self.style.NOTICE(
+            f"Language detector: {correct / n_test:.3f} accuracy on {n_test} held-out dataset sentences "
+            f"({'; '.join(per_class)}), {n_test / max(elapsed, 1e-9):.0f} comments/s"
+        ))
+
+    def _stored_report(self):
+        counts = {}
+        for row in Comment.objects.values("language", "moderation_status").annotate(n=Count("comment_id")):
+            counts.setdefault(row["language"], {})[row["moderation_status"]] = row["n"]
+        if not counts:
+            return
+        human = dict(
+            Comment.objects.filter(comment_id__in=ModerationEvent.objects.filter(actor="human").values("comment_id"))
+            .values_list("language").annotate(n=Count("comment_id"))
+        )
+        statuses = ("neutral", "review", "deleted", "unclassified")
+        self.stdout.write(self.style.NOTICE("Stored comments per language"))
+        self.stdout.write(f"{'language':<9} {'total':>8} " + " ".join(f"{s:>12}" for s in statuses) + f" {'moderated':>9}")
+        for lang, by_status in sorted(counts.items()):
+            self.stdout.write(
+                f"{lang or 'unknown':<9} {sum(by_status.values()):>8} "
+                + " ".join(f"{by_status.get(s, 0):>12}" for s in statuses)
+                + f" {human.get(lang, 0):>9}"
+            )
+
+    def _examples(self, language, rng, options):
+        """``{language: [(text, is_toxic)]}``: moderator decisions first, then dataset sentences."""
+        examples = {}
+        decided = (
+            Comment.objects.filter(
+                moderation_status__in=["neutral", "deleted"],
+                comment_id__in=ModerationEvent.objects.filter(actor="human").values("comment_id"),
+            )
+            .exclude(text="")
+            .values_list("text", "language", "moderation_status")
+        )
+        for text, lang, status in decided.iterator(chunk_size=2000):
+            examples.setdefault(lang or language.detect(text), []).append((text, status == "deleted"))
+        if not options["no_dataset"]:
+            from comments.lexicon import _lexicon_path
+            import csv
+            try:
+                with open(_lexicon_path(), newline="", encoding="utf-8") as f:
+                    for row in csv.DictReader(f):
+                        text = (row.get("Context_or_Example_Sentence") or "").strip()
+                        if text:
+                            toxic = (row.get("Category_of_Toxicity") or "").strip() != "Neutral"
+                            examples.setdefault(language.detect(text), []).append((text, toxic))
+            except OSError:
+                pass
+        for lang, rows in examples.items():
+            rng.shuffle(rows)
+            del rows[options["max_examples"]:]
+        return examples
+
+    def _choose(self, results, max_drop):
+        routes = {}
+        for lang in {r["language"] for r in results}:
+            rows = [r for r in results if r["language"] == lang]
+            best = max(r["accuracy"] for r in rows)
+            adequate = [r for r in rows if r["accuracy"] >= best - max_drop]
+            routes[lang] = max(adequate, key=lambda r: r["throughput_per_second"])["scorer"]
+        return routes
@@ -0,0 +1,175 @@
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import Max
+from comments.models import ChannelVideo, Comment
+from comments import video_config
+from datetime import timedelta
+import heapq
+import time
+
+
+class VideoSchedule:
+    """Polling state for one video: new-comment watermark and adaptive interval."""
+
+    def __init__(self, video_id, watermark, min_interval, max_interval, target_per_poll):
+        self.video_id = video_id
+        self.watermark = watermark
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_per_poll = target_per_poll
+        self.velocity = 0.0  # EWMA of new comments per second
+        self.interval = min_interval
+        self.last_poll = None
+
+    def record_poll(self, new_count, now):
+        if self.last_poll is not None:
+            elapsed = max(now - self.last_poll, 1e-3)
+            self.velocity = 0.5 * self.velocity + 0.5 * (new_count / elapsed)
+        self.last_poll = now
+        # Poll often enough that roughly target_per_poll comments arrive between polls
+        if self.velocity > 0:
+            wanted = self.target_per_poll / self.velocity
+        else:
+            wanted = self.interval * 2
+        self.interval = max(self.min_interval, min(self.max_interval, wanted))
+        return self.interval
+
+
+class Command(BaseCommand):
+    help = "Continuously poll monitored videos for new comments and moderate them within seconds"
+
+    def add_arguments(self, parser):
+        parser.add_argument("video_ids", nargs="*", help="Videos to monitor (default: all ChannelVideo rows)")
+        parser.add_argument("--min-interval", type=float, default=5.0, help="Fastest poll interval per video (seconds)")
+        parser.add_argument("--max-interval", type=float, default=300.0, help="Slowest poll interval per video (seconds)")
+        parser.add_argument("--target-per-poll", type=float, default=20.0,
+                            help="Aim for about this many new comments per poll when choosing intervals")
+        parser.add_argument("--max-per-poll", type=int, default=500, help="Stop paging a video after this many threads")
+        parser.add_argument("--reply-window-hours", type=float, default=24.0,
+                            help="Also recheck stored threads this recent for new replies (0: new threads only; "
+                                 "replies on older threads wait for fetch_all_comments)")
+        parser.add_argument("--latency-budget-ms", type=float, default=500.0, help="Inference time budget per micro-batch")
+        parser.add_argument("--max-batch-size", type=int, default=16, help="Largest inference micro-batch")
+        parser.add_argument("--once", action="store_true", help="Poll every video once and exit")
+
+    def handle(self, *args, **options):
+        try:
+            from toxicity_models.transformers.bert_infer import predict_with_category as bert_predict
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Transformer model unavailable: {e}"))
+            return
+        try:
+            from comments.youtube_service import get_youtube_service
+            youtube = get_youtube_service()
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"YouTube service unavailable: {e}"))
+            return
+
+        # Load the model before the first poll so the first comments aren't delayed by it
+        bert_predict(["warm up"])
+        self.predict = bert_predict
+        self.youtube = youtube
+        self.options = options
+
+        schedules = {}
+        heap = []
+        now = time.monotonic()
+        for video_id in self._video_ids(options["video_ids"]):
+            schedules[video_id] = self._new_schedule(video_id)
+            heapq.heappush(heap, (now, video_id))
+        if not heap:
+            self.stdout.write(self.style.WARNING("No videos to monitor."))
+            return
+
+        self.stdout.write(self.style.NOTICE(f"Monitoring {len(heap)} videos"))
+        try:
+            while heap:
+                due, video_id = heapq.heappop(heap)
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                close_old_connections()
+                schedule = schedules[video_id]
+                try:
+                    new_count = self._poll(schedule)
+                except Exception as e:
+                    new_count = 0
+                    self.stdout.write(self.style.ERROR(f"Poll failed for {video_id}: {e}"))
+                interval = schedule.record_poll(new_count, time.monotonic())
+                if new_count:
+                    self.stdout.write(
+                        f"{video_id}: {new_count} new, {schedule.velocity * 60:.1f}/min, next poll in {interval:.0f}s"
+                    )
+                if not options["once"]:
+                    heapq.heappush(heap, (time.monotonic() + interval, video_id))
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Stopping live moderation."))
+
+    def _video_ids(self, requested):
+        if requested:
+            return requested
+        try:
+            vids = list(ChannelVideo.objects.order_by('-created_at').values_list('video_id', flat=True))
+        except Exception:
+            vids = []
+        return vids or getattr(video_config, 'CHANNEL_VIDEOS', [])
+
+    def _new_schedule(self, video_id):
+        watermark = Comment.objects.filter(video_id=video_id, parent__isnull=True).aggregate(m=Max('published_at'))['m']
+        return VideoSchedule(
+            video_id, watermark,
+            self.options["min_interval"], self.options["max_interval"], self.options["target_per_poll"],
+        )
+
+    def _poll(self, schedule):
+        from comments.pipeline import (
+            budgeted_batch_infer, dedupe, detect_language, iter_comment_threads, normalize, parse_published_at,
+            persist_batch,
+        )
+
+        # New replies don't move a thread up the order=time listing, so stored threads published
+        # within the reply window of the watermark are listed again; normalize compares their
+        # totalReplyCount with the stored one and fetches only threads with new replies
+        window = timedelta(hours=self.options["reply_window_hours"])
+
+        def recent_threads(items):
+            # order=time returns newest first; stop at the first thread older than the window
+            for item in items:
+                snippet = item.get('snippet', {}).get('topLevelComment', {}).get('snippet', {})
+                published = parse_published_at(snippet.get('publishedAt'))
+                if schedule.watermark and published and published < schedule.watermark - window:
+                    return
+                yield item
+
+        def log(message, level='NOTICE'):
+            if level != 'NOTICE':
+                self.stdout.write(getattr(self.style, level)(message))
+
+        items = iter_comment_threads(
+            self.youtube, schedule.video_id, max_items=self.options["max_per_poll"], order='time',
+        )
+        rows = normalize(recent_threads(items), schedule.video_id, youtube=self.youtube, log=log)
+        # One page per dedupe chunk so the first comments reach inference without waiting on later pages
+        rows = dedupe(rows, chunk_size=100)
+        batches = budgeted_batch_infer(
+            detect_language(rows),
+            latency_budget_ms=self.options["latency_budget_ms"],
+            max_batch_size=self.options["max_batch_size"],
+            predict=self.predict,
+            log=log,
+        )
+        new_count = 0
+        for batch in batches:
+            stored = persist_batch(batch, youtube=self.youtube, log=log)
+            new_count += len(stored)
+            for obj in stored:
+                if obj.parent_id is None and obj.published_at and (
+                    schedule.watermark is None or obj.published_at > schedule.watermark
+                ):
+                    schedule.watermark = obj.published_at
+                if obj.moderation_status == 'deleted' and obj.published_at:
+                    lag = (time.time() - obj.published_at.timestamp())
+                    self.stdout.write(self.style.SUCCESS(
+                        f"Removed {obj.comment_id} on {schedule.video_id} {timedelta(seconds=int(lag))} after posting"
+                    ))
+        return new_count
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from comments import authors, rollups
+
+
+class Command(BaseCommand):
+    help = ("Recompute the per-video, per-day moderation rollups (and, for all videos, the per-author stats) "
+            "from the Comment and ArchivedComment tables")
+
+    def add_arguments(self, parser):
+        parser.add_argument("video_ids", nargs="*", help="Only rebuild these videos (default: all)")
+
+    def handle(self, *args, **options):
+        written = rollups.rebuild(options["video_ids"] or None)
+        scope = ", ".join(options["video_ids"]) or "all videos"
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups for {scope}: {written} rows."))
+        if not options["video_ids"]:
+            count = authors.rebuild()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt author stats: {count} authors."))
@@ -9,8 +9,19 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('video_id', type=str, help='YouTube video id to reclassify')
         parser.add_argument('--apply-youtube', action='store_true', help='If set, attempt to apply deletions via YouTube API when non-neutral')
+        parser.add_argument('--profile', nargs='?', const='cprofile', choices=['cprofile', 'sampling'],
+                            help='Profile this run (cProfile by default) and record SQL query counts/timings')
 
     def handle(self, *args, **options):
+        if options.get('profile'):
+            from comments.profiling import profiled
+            with profiled('reclassify_video', mode=options['profile']) as run:
+                self._handle(*args, **options)
+            self.stdout.write(self.style.NOTICE(f'Profile written to {run.output_dir}'))
+            return
+        self._handle(*args, **options)
+
+    def _handle(self, *args, **options):
         video_id = options['video_id']
         apply_youtube = options['apply_youtube']
 
@@ -22,7 +33,7 @@ class Command(BaseCommand):
 
         # Use transformer model exclusively
         try:
-            from toxicity_models.transformers.bert_infer import predict_label1_prob as bert_predict
+            from toxicity_models.transformers.bert_infer import predict_with_category as bert_predict
             self.stdout.write(self.style.NOTICE('Using transformer-based toxicity model (textdetox/bert-multilingual-toxicity-classifier)'))
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Transformer model unavailable: {e}'))
@@ -42,24 +53,49 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING(f'No comments found for video {video_id}'))
             return
 
+        from comments.moderation import ACTOR_MODEL, change_status
+        from comments.lexicon import get_lexicon, match_decision
+        from comments.pipeline import chunked, decide, split_prediction
+        from comments.review_queue import priority_for
+        lexicon = get_lexicon()
+        lexicon_decision = match_decision()
+
         updated = 0
-        for c in qs:
-            try:
-                prob_label1 = float(bert_predict([c.text or ''])[0])
-                if prob_label1 > 0.45:
-                    new_status = 'deleted' if (youtube and apply_youtube) else 'review'
-                elif 0.30 <= prob_label1 <= 0.45:
-                    new_status = 'review'
+        fields = ('comment_id', 'video_id', 'text', 'moderation_status', 'toxicity_score', 'toxicity_category',
+                  'like_count', 'published_at')
+        for batch in chunked(qs.only(*fields).iterator(chunk_size=500), 32):
+            decisions = []
+            to_score = []
+            for c in batch:
+                # Lexicon matches are decided without the model
+                if lexicon_decision and lexicon.scan(c.text or ''):
+                    decisions.append((c, lexicon_decision))
                 else:
-                    new_status = 'neutral'
-
-                old_status = c.moderation_status
-                if new_status != old_status:
-                    c.moderation_status = new_status
-                    c.save()
-                    updated += 1
-                    self.stdout.write(self.style.NOTICE(f'Updated {c.comment_id}: {old_status} -> {new_status}'))
+                    to_score.append(c)
+            try:
+                probs = bert_predict([c.text or '' for c in to_score]) if to_score else []
             except Exception as e:
-                self.stdout.write(self.style.WARNING(f'Failed to reclassify {c.comment_id}: {e}'))
+                self.stdout.write(self.style.WARNING(f'Failed to reclassify {len(to_score)} comments: {e}'))
+                probs = []
+                to_score = []
+            scores = {}
+            for c, output in zip(to_score, probs):
+                c.toxicity_score, category = split_prediction(output)
+                c.toxicity_category = category or ''
+                # The review queue is ordered by a priority derived from the score
+                c.review_priority = priority_for(c)
+                scores[c.comment_id] = c.toxicity_score
+            if to_score:
+                Comment.objects.bulk_update(to_score, ['toxicity_score', 'toxicity_category', 'review_priority'])
+            decisions.extend((c, decide(scores[c.comment_id])) for c in to_score)
+            moves = {}
+            for c, new_status in decisions:
+                if new_status == 'toxic':
+                    new_status = 'deleted' if (youtube and apply_youtube) else 'review'
+                if new_status != c.moderation_status:
+                    moves.setdefault(new_status, []).append(c.comment_id)
+                    self.stdout.write(self.style.NOTICE(f'Updated {c.comment_id}: {c.moderation_status} -> {new_status}'))
+            for new_status, ids in moves.items():
+                updated += len(change_status(ids, new_status, actor=ACTOR_MODEL, scores=scores))
 
         self.stdout.write(self.style.SUCCESS(f'Finished reclassification for {video_id}. Updated {updated} comments.'))
@@ -0,0 +1,67 @@
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+
+class ProfilingMiddleware:
+    """Profile dashboard requests when ``settings.PROFILE_REQUESTS`` is enabled.
+
+    Only views named in ``settings.PROFILE_VIEW_NAMES`` are profiled. With DEBUG on,
+    a single request can also opt in with ``?profile=1`` (or ``?profile=sampling``).
+    Supports async requests too, so it does not force async views (the YouTube
+    moderation actions) through Django's single sync thread under ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _mode_for(self, request):
+        requested = request.GET.get('profile')
+        if requested and settings.DEBUG:
+            return 'sampling' if requested == 'sampling' else 'cprofile'
+        if getattr(settings, 'PROFILE_REQUESTS', False):
+            return getattr(settings, 'PROFILE_MODE', 'cprofile')
+        return None
+
+    def _target(self, request):
+        """``(mode, url_name)`` if this request should be profiled, else None."""
+        mode = self._mode_for(request)
+        if not mode:
+            return None
+        try:
+            url_name = resolve(request.path_info).url_name
+        except Resolver404:
+            return None
+        if url_name not in getattr(settings, 'PROFILE_VIEW_NAMES', ()):
+            return None
+        return mode, url_name
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        target = self._target(request)
+        if not target:
+            return self.get_response(request)
+        return self._profile(request, self.get_response, *target)
+
+    async def __acall__(self, request):
+        target = self._target(request)
+        if not target:
+            return await self.get_response(request)
+        # The profiled views are synchronous; profile them on a worker thread
+        return await sync_to_async(self._profile)(request, async_to_sync(self.get_response), *target)
+
+    def _profile(self, request, get_response, mode, url_name):
+        from .profiling import profiled
+        with profiled(f'{request.method}-{url_name}', mode=mode) as run:
+            response = get_response(request)
+            # Render lazily-evaluated template responses inside the profiled block
+            if hasattr(response, 'render') and callable(response.render):
+                response = response.render()
+        response['X-Profile-Dir'] = run.output_dir.name
+        response['X-Query-Count'] = str(len(run.queries.queries))
+        return response
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:12
+
+from datetime import timedelta, timezone
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def seed_rollups(apps, schema_editor):
+    Comment = apps.get_model('comments', 'Comment')
+    VideoDailyStats = apps.get_model('comments', 'VideoDailyStats')
+    ist = timezone(timedelta(hours=5, minutes=30))
+    grouped = (Comment.objects.annotate(day=TruncDate('published_at', tzinfo=ist))
+               .values('video_id', 'day', 'moderation_status').annotate(n=Count('pk')).order_by())
+    VideoDailyStats.objects.bulk_create([
+        VideoDailyStats(video_id=g['video_id'], day=g['day'], status=g['moderation_status'], count=g['n'])
+        for g in grouped
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0003_comment_replies'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('video_id', models.CharField(max_length=64)),
+                ('day', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('video_id', 'day', 'status'), name='uniq_video_day_status')],
+            },
+        ),
+        migrations.RunPython(seed_rollups, migrations.RunPython.noop),
+    ]
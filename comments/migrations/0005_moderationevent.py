@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:15
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def seed_events(apps, schema_editor):
+    # Existing comments have no recorded history; log their current status at publish time
+    Comment = apps.get_model('comments', 'Comment')
+    ModerationEvent = apps.get_model('comments', 'ModerationEvent')
+    batch = []
+    for video_id, comment_id, status, published_at in (
+        Comment.objects.values_list('video_id', 'comment_id', 'moderation_status', 'published_at').iterator(chunk_size=2000)
+    ):
+        batch.append(ModerationEvent(
+            comment_id=comment_id, video_id=video_id, new_status=status, actor='model', created_at=published_at,
+        ))
+        if len(batch) >= 2000:
+            ModerationEvent.objects.bulk_create(batch)
+            batch = []
+    ModerationEvent.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0004_videodailystats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModerationEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('comment_id', models.CharField(max_length=100)),
+                ('video_id', models.CharField(max_length=64)),
+                ('old_status', models.CharField(blank=True, default='', max_length=20)),
+                ('new_status', models.CharField(max_length=20)),
+                ('actor', models.CharField(choices=[('model', 'Model'), ('human', 'Human')], max_length=10)),
+                ('score', models.FloatField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='modevent_created'), models.Index(fields=['video_id', 'created_at'], name='modevent_video_created'), models.Index(fields=['comment_id'], name='modevent_comment')],
+            },
+        ),
+        migrations.RunPython(seed_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+from django.db import migrations
+
+FTS_TABLE = 'comments_comment_fts'
+PG_TABLE = 'comments_comment_search'
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            # M* keeps Telugu vowel signs inside words
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                "comment_id UNINDEXED, video_id UNINDEXED, text, author, "
+                "tokenize = \"unicode61 remove_diacritics 2 categories 'L* N* Co M*'\")"
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (comment_id, video_id, text, author) "
+                "SELECT comment_id, video_id, text, author FROM comments_comment"
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                f"CREATE TABLE {PG_TABLE} ("
+                "comment_id varchar(100) PRIMARY KEY, video_id varchar(64) NOT NULL, "
+                "text_vector tsvector NOT NULL, author_vector tsvector NOT NULL)"
+            )
+            cursor.execute(f"CREATE INDEX {PG_TABLE}_text ON {PG_TABLE} USING GIN (text_vector)")
+            cursor.execute(f"CREATE INDEX {PG_TABLE}_author ON {PG_TABLE} USING GIN (author_vector)")
+            cursor.execute(
+                f"INSERT INTO {PG_TABLE} (comment_id, video_id, text_vector, author_vector) "
+                "SELECT comment_id, video_id, to_tsvector('simple', text), to_tsvector('simple', author) "
+                "FROM comments_comment"
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        elif connection.vendor == 'postgresql':
+            cursor.execute(f"DROP TABLE IF EXISTS {PG_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0005_moderationevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
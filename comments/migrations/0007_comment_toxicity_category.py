@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0006_comment_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='toxicity_category',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='toxicity_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
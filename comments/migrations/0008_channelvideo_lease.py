@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0007_comment_toxicity_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='channelvideo',
+            name='last_fetched_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='channelvideo',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='channelvideo',
+            name='lease_owner',
+            field=models.CharField(blank=True, default='', max_length=128),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0008_channelvideo_lease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedComment',
+            fields=[
+                ('comment_id', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('video_id', models.CharField(max_length=50)),
+                ('author', models.CharField(max_length=255)),
+                ('text', models.TextField()),
+                ('like_count', models.IntegerField(default=0)),
+                ('published_at', models.DateTimeField()),
+                ('moderation_status', models.CharField(max_length=20)),
+                ('parent_id', models.CharField(blank=True, default='', max_length=100)),
+                ('reply_count', models.IntegerField(default=0)),
+                ('toxicity_score', models.FloatField(blank=True, null=True)),
+                ('toxicity_category', models.CharField(blank=True, default='', max_length=50)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['video_id', 'published_at'], name='archived_video_published')],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:38
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q
+
+
+def seed_author_stats(apps, schema_editor):
+    AuthorStats = apps.get_model('comments', 'AuthorStats')
+    totals = {}
+    for name in ('Comment', 'ArchivedComment'):
+        grouped = (apps.get_model('comments', name).objects.values('author').order_by()
+                   .annotate(n=Count('pk'), review=Count('pk', filter=Q(moderation_status='review')),
+                             deleted=Count('pk', filter=Q(moderation_status='deleted')),
+                             first=Min('published_at'), last=Max('published_at')))
+        for g in grouped:
+            t = totals.setdefault(g['author'], {'n': 0, 'review': 0, 'deleted': 0, 'first': g['first'], 'last': g['last']})
+            t['n'] += g['n']
+            t['review'] += g['review']
+            t['deleted'] += g['deleted']
+            t['first'] = min(t['first'], g['first'])
+            t['last'] = max(t['last'], g['last'])
+    AuthorStats.objects.bulk_create([
+        AuthorStats(author=author, comment_count=t['n'], review_count=t['review'], deleted_count=t['deleted'],
+                    first_seen_at=t['first'], last_seen_at=t['last'])
+        for author, t in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0009_archivedcomment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.CharField(max_length=255, unique=True)),
+                ('comment_count', models.IntegerField(default=0)),
+                ('review_count', models.IntegerField(default=0)),
+                ('deleted_count', models.IntegerField(default=0)),
+                ('first_seen_at', models.DateTimeField(blank=True, null=True)),
+                ('last_seen_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-deleted_count', '-last_seen_at'], name='authorstats_offenders')],
+            },
+        ),
+        migrations.RunPython(seed_author_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:42
+
+from django.db import migrations, models
+
+
+def set_review_priority(apps, schema_editor):
+    from comments.review_queue import priority
+    Comment = apps.get_model('comments', 'Comment')
+    batch = []
+    for c in Comment.objects.only('comment_id', 'toxicity_score', 'like_count', 'published_at').iterator(chunk_size=2000):
+        c.review_priority = priority(c.toxicity_score, c.like_count, c.published_at)
+        batch.append(c)
+        if len(batch) >= 2000:
+            Comment.objects.bulk_update(batch, ['review_priority'])
+            batch = []
+    if batch:
+        Comment.objects.bulk_update(batch, ['review_priority'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0010_authorstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='review_priority',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.RunPython(set_review_priority, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['moderation_status', '-review_priority', 'comment_id'], name='comment_review_queue'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['video_id', 'moderation_status', '-review_priority', 'comment_id'], name='comment_video_review_queue'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:04
+
+from django.db import migrations, models
+
+
+def detect_languages(apps, schema_editor):
+    from comments.language import detect, get_model
+    model = get_model()
+    for name in ('Comment', 'ArchivedComment'):
+        Model = apps.get_model('comments', name)
+        batch = []
+        for c in Model.objects.only('comment_id', 'text').iterator(chunk_size=2000):
+            c.language = detect(c.text, model)
+            batch.append(c)
+            if len(batch) >= 2000:
+                Model.objects.bulk_update(batch, ['language'])
+                batch = []
+        if batch:
+            Model.objects.bulk_update(batch, ['language'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0011_comment_review_priority'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='language',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='language',
+            field=models.CharField(blank=True, choices=[('English', 'English'), ('Hybrid', 'Hybrid'), ('Telugu', 'Telugu')], default='', max_length=10),
+        ),
+        migrations.RunPython(detect_languages, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def set_review_priority(apps, schema_editor):
+    from comments.review_queue import priority
+    Comment = apps.get_model('comments', 'Comment')
+    batch = []
+    for c in Comment.objects.only('comment_id', 'toxicity_score', 'like_count', 'published_at').iterator(chunk_size=2000):
+        c.review_priority = priority(c.toxicity_score, c.like_count, c.published_at)
+        batch.append(c)
+        if len(batch) >= 2000:
+            Comment.objects.bulk_update(batch, ['review_priority'])
+            batch = []
+    if batch:
+        Comment.objects.bulk_update(batch, ['review_priority'])
+
+
+class Migration(migrations.Migration):
+    # review_queue.priority now weights toxicity and likes explicitly against a longer half-life
+
+    dependencies = [
+        ('comments', '0012_comment_language'),
+    ]
+
+    operations = [
+        migrations.RunPython(set_review_priority, migrations.RunPython.noop),
+    ]
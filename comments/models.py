@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 class Comment(models.Model):
     comment_id = models.CharField(max_length=100, primary_key=True)
@@ -16,6 +17,30 @@ class Comment(models.Model):
                  ("deleted", "Deleted")],
         default="unclassified"
     )
+    # Replies link to their top-level comment; no DB constraint so threads survive partial fetches
+    parent = models.ForeignKey(
+        'self', null=True, blank=True, related_name='replies',
+        on_delete=models.DO_NOTHING, db_constraint=False,
+    )
+    # Last seen commentThread totalReplyCount (top-level comments only)
+    reply_count = models.IntegerField(default=0)
+    # Model LABEL_1 probability and most likely toxicity category from the same pass
+    toxicity_score = models.FloatField(null=True, blank=True)
+    toxicity_category = models.CharField(max_length=50, blank=True, default='')
+    # Review queue order (comments.review_queue), set at ingest from score, likes and publish time
+    review_priority = models.FloatField(default=0.0)
+    # Detected by comments.language at ingest ('' when the text has no letters); picks the scorer
+    language = models.CharField(
+        max_length=10, blank=True, default='',
+        choices=[("English", "English"), ("Hybrid", "Hybrid"), ("Telugu", "Telugu")],
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['moderation_status', '-review_priority', 'comment_id'], name='comment_review_queue'),
+            models.Index(fields=['video_id', 'moderation_status', '-review_priority', 'comment_id'],
+                         name='comment_video_review_queue'),
+        ]
 
     def __str__(self):
         return f"{self.comment_id} - {self.text[:30]}"
@@ -27,6 +52,116 @@ class ChannelVideo(models.Model):
     link = models.URLField(max_length=500, blank=True)
     name = models.CharField(max_length=255, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Fetch lease (comments.leases): the worker currently fetching this video and until when
+    lease_owner = models.CharField(max_length=128, blank=True, default='')
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    last_fetched_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"{self.name or self.video_id}"
+
+
+class VideoDailyStats(models.Model):
+    """Comment counts per video, IST publish date and moderation status.
+
+    Kept current by comments.moderation on every ingest and status change;
+    `manage.py rebuild_rollups` recomputes it from the Comment table.
+    """
+    video_id = models.CharField(max_length=64)
+    day = models.DateField()
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['video_id', 'day', 'status'], name='uniq_video_day_status'),
+        ]
+
+    def __str__(self):
+        return f"{self.video_id} {self.day} {self.status}: {self.count}"
+
+
+class ModerationEvent(models.Model):
+    """Append-only record of one moderation decision (ingest or status change).
+
+    Written in bulk by comments.moderation; never updated. Analytics query it by
+    ``created_at`` range, optionally scoped to a video.
+    """
+    comment_id = models.CharField(max_length=100)
+    video_id = models.CharField(max_length=64)
+    # Empty for the initial classification at ingest
+    old_status = models.CharField(max_length=20, blank=True, default='')
+    new_status = models.CharField(max_length=20)
+    actor = models.CharField(max_length=10, choices=[("model", "Model"), ("human", "Human")])
+    score = models.FloatField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='modevent_created'),
+            models.Index(fields=['video_id', 'created_at'], name='modevent_video_created'),
+            models.Index(fields=['comment_id'], name='modevent_comment'),
+        ]
+
+    def __str__(self):
+        return f"{self.comment_id} {self.old_status or '-'} -> {self.new_status} ({self.actor})"
+
+
+class ArchivedComment(models.Model):
+    """Cold storage for settled comments moved out of ``Comment``.
+
+    Filled by ``manage.py archive_comments`` (comments.archive). Search, rollup
+    rebuilds and ingest de-duplication read both tables; dashboard queries only
+    hit the hot ``Comment`` table.
+    """
+    comment_id = models.CharField(max_length=100, primary_key=True)
+    video_id = models.CharField(max_length=50)
+    author = models.CharField(max_length=255)
+    text = models.TextField()
+    like_count = models.IntegerField(default=0)
+    published_at = models.DateTimeField()
+    moderation_status = models.CharField(max_length=20)
+    parent_id = models.CharField(max_length=100, blank=True, default='')
+    reply_count = models.IntegerField(default=0)
+    toxicity_score = models.FloatField(null=True, blank=True)
+    toxicity_category = models.CharField(max_length=50, blank=True, default='')
+    language = models.CharField(max_length=10, blank=True, default='')
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    # Lets templates and JSON tell cold rows apart from Comment instances
+    archived = True
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['video_id', 'published_at'], name='archived_video_published'),
+        ]
+
+    def __str__(self):
+        return f"{self.comment_id} - {self.text[:30]} (archived)"
+
+
+class AuthorStats(models.Model):
+    """Per-author comment history across all videos.
+
+    Kept current by comments.moderation on every ingest and status change
+    (comments.authors); ``manage.py rebuild_rollups`` recomputes it. Authors
+    are keyed by display name, which is what the YouTube fetch stores.
+    """
+    author = models.CharField(max_length=255, unique=True)
+    comment_count = models.IntegerField(default=0)
+    review_count = models.IntegerField(default=0)
+    deleted_count = models.IntegerField(default=0)
+    first_seen_at = models.DateTimeField(null=True, blank=True)
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-deleted_count', '-last_seen_at'], name='authorstats_offenders'),
+        ]
+
+    @property
+    def deleted_rate(self):
+        return self.deleted_count / self.comment_count if self.comment_count else 0.0
+
+    def __str__(self):
+        return f"{self.author}: {self.deleted_count}/{self.comment_count} deleted"
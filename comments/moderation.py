@@ -0,0 +1,179 @@
+"""Single entry point for comment status changes.
+
+Ingestion (``pipeline.persist_batch``), dashboard actions and management
+commands all record status changes here, so everything that reacts to a
+transition (event log, daily rollups, author stats, search index, live
+dashboard events, cached dashboard data) sees every one of them.
+Callers run these inside the transaction that made the change.
+"""
+import logging
+
+from django.db import transaction
+from django.template.loader import render_to_string
+
+from . import authors, caching, live, rollups, search
+from .db import run_write
+from .models import Comment, ModerationEvent
+from .pipeline import chunked
+
+logger = logging.getLogger(__name__)
+
+ACTOR_MODEL = 'model'
+ACTOR_HUMAN = 'human'
+
+
+def render_row(comment):
+    """Dashboard table row for a comment in its current status."""
+    return render_to_string('comments/_comment_row.html', {'comment': comment})
+
+
+def _add_delta(deltas, video_id, key, amount):
+    video = deltas.setdefault(video_id, {})
+    video[key] = video.get(key, 0) + amount
+
+
+def _log_events(rows, actor, scores):
+    """Append ``(comment, old_status)`` decisions to the ModerationEvent log in one insert."""
+    scores = scores or {}
+    ModerationEvent.objects.bulk_create([
+        ModerationEvent(
+            comment_id=c.comment_id,
+            video_id=c.video_id,
+            old_status=old_status,
+            new_status=c.moderation_status,
+            actor=actor,
+            score=scores.get(c.comment_id),
+        )
+        for c, old_status in rows
+    ], batch_size=500)
+
+
+def events_between(start, end, video_id=None):
+    """ModerationEvents with ``start <= created_at < end``, newest first.
+
+    Both bounds are required so the query stays on the created_at indexes.
+    """
+    qs = ModerationEvent.objects.filter(created_at__gte=start, created_at__lt=end)
+    if video_id:
+        qs = qs.filter(video_id=video_id)
+    return qs.order_by('-created_at')
+
+
+def _publish(events):
+    def send():
+        try:
+            live.publish_many(events)
+        except Exception:
+            # Live updates are best-effort; never fail the write that triggered them
+            logger.exception("Failed to publish %d live events", len(events))
+    # Only announce changes that actually committed
+    transaction.on_commit(send)
+
+
+def _invalidate_cache(video_ids):
+    video_ids = set(video_ids)
+    # After commit, so a concurrent request cannot cache pre-commit data under the new version
+    transaction.on_commit(lambda: caching.touch_comments(video_ids))
+
+
+def record_ingested(comments, actor=ACTOR_MODEL, row_events=True, scores=None):
+    """Notify listeners about newly stored comments.
+
+    ``scores`` maps comment_id to the model score logged with the decision.
+    ``row_events=False`` skips per-comment events (large backfills) and only
+    publishes the per-video count deltas.
+    """
+    if not comments:
+        return
+    _log_events([(c, '') for c in comments], actor, scores)
+    search.index(comments)
+    rollup_deltas = {}
+    author_deltas = {}
+    for c in comments:
+        rollups.add(rollup_deltas, c, c.moderation_status, 1)
+        authors.add_comment(author_deltas, c)
+    rollups.apply(rollup_deltas)
+    authors.apply(author_deltas)
+    _invalidate_cache(c.video_id for c in comments)
+
+    events = []
+    deltas = {}
+    for c in comments:
+        _add_delta(deltas, c.video_id, 'total', 1)
+        _add_delta(deltas, c.video_id, c.moderation_status, 1)
+        if row_events:
+            events.append({
+                'type': 'classified',
+                'video_id': c.video_id,
+                'comment_id': c.comment_id,
+                'status': c.moderation_status,
+                'actor': actor,
+                'html': render_row(c),
+            })
+    events.extend({'type': 'counts', 'video_id': v, 'delta': d} for v, d in deltas.items())
+    _publish(events)
+
+
+def change_status(comment_ids, new_status, actor=ACTOR_HUMAN, scores=None, row_events=True):
+    """Move comments to ``new_status`` and notify listeners.
+
+    Comments already in ``new_status`` are left alone. Returns the Comment
+    instances that changed, with ``moderation_status`` updated. The write goes
+    through the SQLite write coalescer, batched with concurrent status changes.
+    ``scores`` optionally maps comment_id to the model score behind the change.
+    ``row_events=False`` publishes only count deltas (bulk classification).
+    """
+    comment_ids = list(comment_ids)
+    return run_write(lambda: _change_status(comment_ids, new_status, actor, scores, row_events))
+
+
+def _change_status(comment_ids, new_status, actor, scores=None, row_events=True):
+    changed = []
+    for ids in chunked(comment_ids, 500):
+        batch = list(Comment.objects.filter(comment_id__in=ids).exclude(moderation_status=new_status))
+        if not batch:
+            continue
+        Comment.objects.filter(comment_id__in=[c.comment_id for c in batch]).update(moderation_status=new_status)
+        changed.extend(batch)
+    if not changed:
+        return []
+    transitions = []
+    for c in changed:
+        transitions.append((c, c.moderation_status))
+        c.moderation_status = new_status
+    _after_transitions(transitions, actor, scores, row_events)
+    return changed
+
+
+def _after_transitions(transitions, actor, scores=None, row_events=True):
+    """``transitions`` is a list of ``(comment, old_status)`` with the new status already set."""
+    _log_events(transitions, actor, scores)
+    rollup_deltas = {}
+    author_deltas = {}
+    for c, old_status in transitions:
+        rollups.add(rollup_deltas, c, old_status, -1)
+        rollups.add(rollup_deltas, c, c.moderation_status, 1)
+        authors.add_status(author_deltas, c.author, old_status, -1)
+        authors.add_status(author_deltas, c.author, c.moderation_status, 1)
+    rollups.apply(rollup_deltas)
+    authors.apply(author_deltas)
+    _invalidate_cache(c.video_id for c, _old in transitions)
+
+    events = []
+    deltas = {}
+    for c, old_status in transitions:
+        _add_delta(deltas, c.video_id, old_status, -1)
+        _add_delta(deltas, c.video_id, c.moderation_status, 1)
+        if not row_events:
+            continue
+        events.append({
+            'type': 'status',
+            'video_id': c.video_id,
+            'comment_id': c.comment_id,
+            'old_status': old_status,
+            'new_status': c.moderation_status,
+            'actor': actor,
+            'html': render_row(c),
+        })
+    events.extend({'type': 'counts', 'video_id': v, 'delta': d} for v, d in deltas.items())
+    _publish(events)
@@ -0,0 +1,716 @@
+"""Streaming comment ingestion: fetch -> normalize -> dedupe -> detect-language -> batch-infer -> bulk-persist.
+
+Threads are fetched with ``part=snippet,replies``. Replies are expanded during
+normalize, but only for threads whose ``totalReplyCount`` differs from the
+stored ``Comment.reply_count``; threads with more replies than the inline
+preview are paged through ``comments.list(parentId=...)``.
+
+Every stage is a generator that consumes an iterator and yields downstream, so
+only the items currently in flight are held in memory. ``run_pipeline`` can put
+each stage on its own thread (or process) connected by bounded queues; a full
+queue blocks the producer, which gives backpressure all the way back to the
+YouTube API pager.
+
+``fetch_comments`` and ``fetch_all_comments`` run the same stages inline.
+"""
+import csv
+import datetime as _dt
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from . import archive, youtube_pool
+from .models import ArchivedComment, Comment
+from .stage_worker import End as _End, Failed as _Failed, run_stage as _run_stage
+
+# Model decision thresholds on the LABEL_1 probability
+TOXIC_THRESHOLD = 0.45
+REVIEW_THRESHOLD = 0.30
+
+# Row kind emitted for an already-stored thread whose reply count changed
+THREAD_UPDATE = 'thread_update'
+
+# Rows the model sends to review are queued here for human labelling; the
+# retrainer reads the human-labelled queue in comments/retrain_queue.csv.
+PENDING_REVIEW_QUEUE_PATH = os.path.join(os.path.dirname(__file__), 'management', 'retrain_queue.csv')
+
+
+def decide(prob_label1):
+    """Map a LABEL_1 probability to 'toxic', 'review' or 'neutral'."""
+    if prob_label1 > TOXIC_THRESHOLD:
+        return 'toxic'
+    if REVIEW_THRESHOLD <= prob_label1 <= TOXIC_THRESHOLD:
+        return 'review'
+    return 'neutral'
+
+
+def chunked(iterable, size):
+    """Yield lists of up to ``size`` items from ``iterable``."""
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_published_at(value):
+    if not value:
+        return None
+    try:
+        return _dt.datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=_dt.timezone.utc)
+    except Exception:
+        pass
+    # Exported data may carry fractional seconds or an explicit offset
+    try:
+        parsed = _dt.datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=_dt.timezone.utc)
+
+
+# --- Stage 1: fetch ---------------------------------------------------------
+
+def iter_comment_threads(youtube, video_id, page_size=100, max_items=None, order=None):
+    """Page through commentThreads for a video, one API page in memory at a time.
+
+    ``order='time'`` returns newest threads first, so callers can stop paging as
+    soon as they reach comments they have already seen.
+    """
+    page_token = None
+    fetched = 0
+    while True:
+        params = {
+            'part': 'snippet,replies',
+            'videoId': video_id,
+            'textFormat': 'plainText',
+            'maxResults': min(page_size, 100, max_items - fetched) if max_items else min(page_size, 100),
+        }
+        if order:
+            params['order'] = order
+        if page_token:
+            params['pageToken'] = page_token
+        response = youtube.commentThreads().list(**params).execute()
+        for item in response.get('items', []):
+            yield item
+            fetched += 1
+            if max_items and fetched >= max_items:
+                return
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return
+
+
+# --- Stage 2: normalize -----------------------------------------------------
+
+def normalize_thread(item, video_id):
+    """Flatten a commentThread resource into a Comment field dict."""
+    # The actual top-level comment id is under snippet.topLevelComment.id
+    tlc = item.get('snippet', {}).get('topLevelComment', {})
+    row = normalize_comment(tlc, video_id)
+    row['comment_id'] = row['comment_id'] or item.get('id')
+    row['reply_count'] = item.get('snippet', {}).get('totalReplyCount', 0) or 0
+    return row
+
+
+def normalize_comment(resource, video_id, parent_id=None):
+    """Flatten a comment resource (top-level or reply) into a Comment field dict."""
+    snippet = resource.get('snippet', {})
+    return {
+        'comment_id': resource.get('id'),
+        'video_id': snippet.get('videoId') or video_id,
+        'author': snippet.get('authorDisplayName', ''),
+        'text': snippet.get('textDisplay', ''),
+        'like_count': snippet.get('likeCount', 0) or 0,
+        'published_at': parse_published_at(snippet.get('publishedAt')),
+        'parent_id': parent_id or snippet.get('parentId'),
+    }
+
+
+def iter_replies(youtube, parent_id, page_size=100):
+    """Page through every reply of a thread with comments.list(parentId=...)."""
+    page_token = None
+    while True:
+        params = {'part': 'snippet', 'parentId': parent_id, 'textFormat': 'plainText', 'maxResults': page_size}
+        if page_token:
+            params['pageToken'] = page_token
+        response = youtube.comments().list(**params).execute()
+        yield from response.get('items', [])
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return
+
+
+def normalize(items, video_id, youtube=None, replies=True, chunk_size=100, log=None):
+    """Yield top-level rows, then reply rows for threads with new replies.
+
+    Stored reply counts are looked up one chunk of threads at a time. For a stored
+    thread whose count changed, a THREAD_UPDATE row follows its replies so the new
+    count is only persisted after the replies themselves. Without an API client
+    only the inline reply preview is available, and only that many are recorded.
+    """
+    for page in chunked(items, chunk_size):
+        rows = [(normalize_thread(item, video_id), item) for item in page]
+        ids = [row['comment_id'] for row, _ in rows if row['comment_id']]
+        stored = dict(Comment.objects.filter(comment_id__in=ids).values_list('comment_id', 'reply_count'))
+        stored.update(ArchivedComment.objects.filter(comment_id__in=[i for i in ids if i not in stored])
+                      .values_list('comment_id', 'reply_count'))
+        for row, item in rows:
+            if not row['comment_id']:
+                continue
+            total = row['reply_count']
+            known = stored.get(row['comment_id'], 0)
+            if not replies or total == known:
+                # Unfetched replies must not look fetched to a later run
+                row['reply_count'] = known
+                yield row
+                continue
+            inline = item.get('replies', {}).get('comments', [])
+            if len(inline) < total and youtube is None:
+                total = len(inline)
+            row['reply_count'] = total
+            if row['comment_id'] not in stored:
+                # New thread: its reply count is stored with it, after the replies below
+                row['reply_count'] = known
+            yield row
+            try:
+                if len(inline) >= total:
+                    reply_resources = inline
+                else:
+                    reply_resources = iter_replies(youtube, row['comment_id'])
+                for reply in reply_resources:
+                    reply_row = normalize_comment(reply, row['video_id'], parent_id=row['comment_id'])
+                    if reply_row['comment_id']:
+                        yield reply_row
+            except Exception as e:
+                # Leave the stored count alone so the thread is retried next run
+                if log:
+                    log(f"Failed to fetch replies for {row['comment_id']}: {e}", 'WARNING')
+                continue
+            yield {'kind': THREAD_UPDATE, 'comment_id': row['comment_id'], 'reply_count': total}
+
+
+# --- Stage 3: dedupe --------------------------------------------------------
+
+def dedupe(rows, chunk_size=500, recent_window=50000):
+    """Drop rows already stored, checking the DB one chunk of ids at a time.
+
+    A bounded window of recently seen ids also catches duplicates that are still
+    in flight downstream (not yet persisted) without growing with channel size.
+    """
+    recent = OrderedDict()
+    for chunk in chunked(rows, chunk_size):
+        ids = [r['comment_id'] for r in chunk]
+        existing = archive.existing_ids(ids)
+        for row in chunk:
+            if row.get('kind') == THREAD_UPDATE:
+                yield row
+                continue
+            cid = row['comment_id']
+            if cid in existing or cid in recent:
+                continue
+            recent[cid] = None
+            if len(recent) > recent_window:
+                recent.popitem(last=False)
+            yield row
+
+
+# --- Stage 4: detect-language ----------------------------------------------
+
+def detect_language(rows):
+    """Tag each comment row with its ``language`` (see comments.language) for scorer routing."""
+    from .language import detect, get_model
+    model = get_model()
+    for row in rows:
+        if row.get('kind') != THREAD_UPDATE:
+            row['language'] = detect(row['text'], model)
+        yield row
+
+
+# --- Stage 5: batch-infer ---------------------------------------------------
+
+def _default_predict(texts):
+    from toxicity_models.transformers.bert_infer import predict_with_category
+    return predict_with_category(texts)
+
+
+def split_prediction(output):
+    """Normalize a predictor output to ``(score, category or None)``.
+
+    Predictors return either a LABEL_1 probability or, like
+    ``bert_infer.predict_with_category``, ``(probability, {category: p})``.
+    """
+    if isinstance(output, (tuple, list)):
+        score, categories = output
+    else:
+        score, categories = output, None
+    category = max(categories, key=categories.get) if categories else None
+    return (float(score) if score is not None else None), category
+
+
+def lexicon_screen(rows, log=None):
+    """Tag rows containing a toxic-lexicon phrase with ``toxic_word``/``toxic_category``.
+
+    With ``settings.LEXICON_MATCH_DECISION`` 'review' (the default), tagged rows
+    go to review without a model call; never straight to YouTube rejection (see
+    ``lexicon.match_decision``). Returns the rows still needing the model.
+    """
+    from .lexicon import get_lexicon, match_decision
+    lexicon = get_lexicon()
+    decision = match_decision()
+    remaining = []
+    for row in rows:
+        text = row['text'] or ''
+        matches = lexicon.scan(text)
+        if not matches:
+            remaining.append(row)
+            continue
+        row['toxic_word'] = text[matches[0].start:matches[0].end]
+        row['toxic_category'] = matches[0].category
+        if not decision:
+            remaining.append(row)
+            continue
+        row['score'] = None
+        row['decision'] = decision
+        if log:
+            log(f"Lexicon match '{row['toxic_word']}' for {row['comment_id']} -> {decision}")
+    return remaining
+
+
+def offender_screen(rows, log=None):
+    """Apply ``settings.REPEAT_OFFENDER_POLICY`` to rows by known repeat offenders.
+
+    Under 'review' offenders' rows are decided here. Returns the rows still
+    needing the model.
+    """
+    from . import authors
+    if not authors.policy() or not rows:
+        return rows
+    offenders = authors.offenders(r.get('author') for r in rows)
+    if not offenders:
+        return rows
+    remaining = []
+    for row in rows:
+        if row.get('author') not in offenders:
+            remaining.append(row)
+            continue
+        row['offender'] = True
+        row['score'] = None
+        row['decision'] = 'review'
+        if log:
+            log(f"Repeat offender {row['author']!r}: {row['comment_id']} -> review")
+    return remaining
+
+
+def _score(rows, predict, log=None, fallback=None):
+    try:
+        scores = predict([r['text'] or '' for r in rows]) if rows else []
+    except Exception as e:
+        if fallback is not None:
+            if log:
+                log(f"Routed scorer failed for {len(rows)} comments, using the default model: {e}", 'WARNING')
+            return _score(rows, fallback, log)
+        if log:
+            log(f"Failed to classify batch of {len(rows)} comments: {e}", 'WARNING')
+        scores = [None] * len(rows)
+    for row, output in zip(rows, scores):
+        score, category = split_prediction(output)
+        row['score'] = score
+        row['category'] = category
+        row['decision'] = decide(score) if score is not None else None
+        if log and score is not None:
+            log(f"Transformer LABEL_1 score for {row['comment_id']}: {row['score']} -> {row['decision']}"
+                + (f" ({category})" if category else ''))
+
+
+def _score_routed(rows, predict, log=None):
+    """Score rows with their language's scorer (``language.routes()``), one call per scorer.
+
+    Rows without a routed language go to ``predict``, which is also the
+    fallback when a routed scorer fails (e.g. its model was never trained).
+    """
+    from . import language
+    table = language.routes()
+    groups = {}
+    for row in rows:
+        groups.setdefault(table.get(row.get('language')) or 'bert', []).append(row)
+    for name, group in groups.items():
+        started = time.perf_counter()
+        if name == 'bert':
+            _score(group, predict, log)
+        else:
+            _score(group, language.scorer(name), log, fallback=predict)
+        if log and len(groups) > 1:
+            languages = ', '.join(sorted({r.get('language') or 'unknown' for r in group}))
+            log(f"Scored {len(group)} comments ({languages}) with {name} in "
+                f"{(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+def batch_infer(rows, batch_size=32, predict=None, log=None):
+    """Score rows in batches; yields lists of rows with ``score``/``decision`` set.
+
+    Rows matching the toxic lexicon are decided before the model (see
+    ``lexicon_screen``), then the repeat-offender policy applies (see
+    ``offender_screen``). Within a batch, rows tagged by
+    ``detect_language`` are grouped by their language's scorer. A failed batch
+    is passed through unscored so it is stored as 'unclassified' rather than lost.
+    """
+    predict = predict or _default_predict
+    for batch in chunked(rows, batch_size):
+        to_score = lexicon_screen([r for r in batch if r.get('kind') != THREAD_UPDATE], log)
+        to_score = offender_screen(to_score, log)
+        _score_routed(to_score, predict, log)
+        if batch:
+            yield batch
+
+
+def budgeted_batch_infer(rows, latency_budget_ms=500, max_batch_size=16, predict=None, log=None):
+    """Low-latency variant of ``batch_infer`` for live moderation.
+
+    Starts with single-comment micro-batches and sizes each next batch so its
+    expected inference time stays within ``latency_budget_ms``, using the
+    per-comment cost measured on the previous batch.
+    """
+    predict = predict or _default_predict
+    rows = iter(rows)
+    size = 1
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        started = time.perf_counter()
+        # Collected before yielding so the consumer's work (persist, API calls) isn't timed
+        scored = list(batch_infer(batch, batch_size=len(batch), predict=predict, log=log))
+        per_item_ms = (time.perf_counter() - started) * 1000.0 / len(batch)
+        size = max(1, min(max_batch_size, int(latency_budget_ms // max(per_item_ms, 1e-3))))
+        yield from scored
+
+
+# --- Stage 6: bulk-persist --------------------------------------------------
+
+def _status_for(row, youtube, log):
+    decision = row.get('decision')
+    if decision is None:
+        return 'unclassified'
+    if decision == 'toxic':
+        if not youtube:
+            return 'review'
+        try:
+            youtube.comments().setModerationStatus(id=row['comment_id'], moderationStatus='rejected').execute()
+            return 'deleted'
+        except Exception as e:
+            if log:
+                log(f"YouTube API delete failed for {row['comment_id']}: {e}", 'WARNING')
+            return 'review'
+    return decision
+
+
+def _queue_for_review(rows, log):
+    if not rows:
+        return
+    try:
+        with open(PENDING_REVIEW_QUEUE_PATH, 'a', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            # Minimal retrain row: comment_id, language_type (detected or NULL), toxic_word (lexicon match or NULL), context (text), category (Neutral)
+            writer.writerows(
+                [r['comment_id'], r.get('language') or 'NULL', r.get('toxic_word') or 'NULL', r['text'], 'Neutral']
+                for r in rows
+            )
+    except Exception as e:
+        if log:
+            log(f"Failed to append {len(rows)} comments to retrain queue: {e}", 'WARNING')
+
+
+def persist_batch(batch, youtube=None, log=None, row_events=True):
+    """Apply model decisions and insert a batch of new comments in one transaction.
+
+    THREAD_UPDATE rows refresh the stored reply count of existing threads.
+    Rows a concurrent run stored since dedupe are dropped before any toxic one
+    is rejected on YouTube, so it is not rejected a second time.
+    ``row_events=False`` publishes only count deltas to the live dashboard.
+    Returns the list of Comment instances written.
+    """
+    from .review_queue import priority
+    objs = []
+    scores = {}
+    toxic_words = {}
+    rows = [row for row in batch if row.get('kind') != THREAD_UPDATE]
+    thread_updates = {row['comment_id']: row['reply_count'] for row in batch if row.get('kind') == THREAD_UPDATE}
+    stored = archive.existing_ids(row['comment_id'] for row in rows)
+    for row in rows:
+        if row['comment_id'] in stored:
+            continue
+        scores[row['comment_id']] = row.get('score')
+        toxic_words[row['comment_id']] = row.get('toxic_word')
+        objs.append(Comment(
+            comment_id=row['comment_id'],
+            video_id=row['video_id'],
+            author=row['author'],
+            text=row['text'],
+            like_count=row['like_count'],
+            published_at=row['published_at'],
+            parent_id=row.get('parent_id'),
+            reply_count=row.get('reply_count', 0),
+            moderation_status=_status_for(row, youtube, log),
+            toxicity_score=row.get('score'),
+            toxicity_category=row.get('category') or row.get('toxic_category') or '',
+            review_priority=priority(row.get('score'), row['like_count'], row['published_at']),
+            language=row.get('language') or '',
+        ))
+    from .moderation import record_ingested
+    with transaction.atomic():
+        # Rows stored by a concurrent run during the YouTube calls above must not be counted twice
+        existing = archive.existing_ids(o.comment_id for o in objs)
+        objs = [o for o in objs if o.comment_id not in existing]
+        Comment.objects.bulk_create(objs, ignore_conflicts=True)
+        for comment_id, reply_count in thread_updates.items():
+            if not Comment.objects.filter(comment_id=comment_id).update(reply_count=reply_count):
+                ArchivedComment.objects.filter(comment_id=comment_id).update(reply_count=reply_count)
+        record_ingested(objs, row_events=row_events, scores=scores)
+    _queue_for_review([
+        {'comment_id': o.comment_id, 'text': o.text, 'toxic_word': toxic_words.get(o.comment_id), 'language': o.language}
+        for o in objs if o.moderation_status == 'review'
+    ], log)
+    return objs
+
+
+def persist(batches, youtube=None, log=None, row_events=True):
+    for batch in batches:
+        yield persist_batch(batch, youtube=youtube, log=log, row_events=row_events)
+
+
+class ThreadUpdateGate:
+    """Carry THREAD_UPDATE rows around a stage that reorders rows.
+
+    Inference replicas return batches in any order, so a thread's new reply
+    count could be stored before its replies, and a failure in between would
+    leave the replies unfetched for good. ``hold`` (upstream of the stage)
+    takes THREAD_UPDATE rows out of the stream and notes which rows of each
+    thread are still in flight; ``release`` (downstream) appends an update to
+    the batch holding the last of them, which ``persist_batch`` writes in the
+    same transaction. Updates that become ready without such a batch (all of
+    the thread's rows were already out) go in the next batch, or a final one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._held = {}
+
+    def hold(self, rows):
+        for row in rows:
+            thread_id = row.get('parent_id') or row['comment_id']
+            with self._lock:
+                if row.get('kind') == THREAD_UPDATE:
+                    self._held[thread_id] = row
+                    continue
+                self._in_flight.setdefault(thread_id, set()).add(row['comment_id'])
+            yield row
+
+    def _ready(self, batch=()):
+        with self._lock:
+            for row in batch:
+                thread_id = row.get('parent_id') or row['comment_id']
+                pending = self._in_flight.get(thread_id)
+                if pending is not None:
+                    pending.discard(row['comment_id'])
+                    if not pending:
+                        del self._in_flight[thread_id]
+            ready = [thread_id for thread_id in self._held if thread_id not in self._in_flight]
+            return [self._held.pop(thread_id) for thread_id in ready]
+
+    def release(self, batches):
+        for batch in batches:
+            yield batch + self._ready(batch)
+        # Updates whose rows never came out stay held, so their threads are refetched next run
+        rest = self._ready()
+        if rest:
+            yield rest
+
+
+# --- Stage runners ----------------------------------------------------------
+
+class Stage:
+    """A pipeline stage: ``func(iterator, **kwargs)`` returning an iterator.
+
+    ``mode`` is 'inline' (chained generator in the caller's thread), 'thread' or
+    'process'. Process stages must be module-level functions with picklable
+    kwargs (e.g. ``batch_infer`` with the default predictor); ``replicas``
+    process workers share the stage's input and output queues, so output order
+    across replicas is not preserved.
+    """
+
+    def __init__(self, func, mode='thread', replicas=1, **kwargs):
+        self.func = func
+        self.mode = mode
+        self.replicas = max(1, replicas)
+        self.kwargs = kwargs
+
+    @property
+    def name(self):
+        return getattr(self.func, '__name__', 'stage')
+
+
+class StageError(RuntimeError):
+    pass
+
+
+def _drain(q, producers=1):
+    """Iterate a stage queue until every producer's end marker, re-raising upstream failures."""
+    remaining = producers
+    while True:
+        item = q.get()
+        if isinstance(item, _End):
+            remaining -= 1
+            if not remaining:
+                return
+            continue
+        if isinstance(item, _Failed):
+            raise StageError(f"stage {item.stage} failed: {item.error}")
+        yield item
+
+
+def _thread_stage(stage, upstream, queue_size, stop):
+    out = queue.Queue(maxsize=queue_size)
+
+    def put(item):
+        # Block for backpressure, but give up if the consumer went away
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def work():
+        close_old_connections()
+        try:
+            for item in stage.func(upstream, **stage.kwargs):
+                if not put(item):
+                    return
+            put(_End())
+        except BaseException as e:
+            put(_Failed(stage.name, repr(e)))
+        finally:
+            connection.close()
+
+    threading.Thread(target=work, name=f'pipeline-{stage.name}', daemon=True).start()
+    return _drain(out)
+
+
+def _process_stage(stage, upstream, queue_size, stop):
+    import multiprocessing
+    ctx = multiprocessing.get_context('spawn')
+    inq = ctx.Queue(maxsize=queue_size)
+    outq = ctx.Queue(maxsize=queue_size)
+    procs = [
+        ctx.Process(target=_run_stage, args=(stage.func.__module__, stage.func.__name__, stage.kwargs, inq, outq),
+                    name=f'pipeline-{stage.name}-{i}', daemon=True)
+        for i in range(stage.replicas)
+    ]
+    for proc in procs:
+        proc.start()
+
+    def feed():
+        try:
+            for item in upstream:
+                if stop.is_set():
+                    break
+                inq.put(item)
+        finally:
+            # One end marker per replica; each stops after taking one
+            for _ in procs:
+                inq.put(_End())
+
+    threading.Thread(target=feed, name=f'pipeline-{stage.name}-feed', daemon=True).start()
+
+    def results():
+        try:
+            yield from _drain(outq, producers=len(procs))
+        finally:
+            for proc in procs:
+                proc.join(timeout=5)
+    return results()
+
+
+def run_pipeline(source, stages, queue_size=8):
+    """Chain ``stages`` onto ``source`` and return an iterator over the last stage.
+
+    Non-inline stages run concurrently; at most ``queue_size`` items wait between
+    any two stages.
+    """
+    stop = threading.Event()
+    it = iter(source)
+    for stage in stages:
+        if stage.mode == 'inline':
+            it = stage.func(it, **stage.kwargs)
+        elif stage.mode == 'process':
+            it = _process_stage(stage, it, queue_size, stop)
+        else:
+            it = _thread_stage(stage, it, queue_size, stop)
+
+    def consume():
+        try:
+            yield from it
+        finally:
+            stop.set()
+    return consume()
+
+
+def ingest_video(video_id, youtube, predict=None, batch_size=32, max_items=None, page_size=100,
+                 mode='inline', infer_mode=None, infer_replicas=1, queue_size=8, include_replies=True,
+                 row_events=True, log=None, youtube_factory=None):
+    """Fetch, classify and store new comments for one video.
+
+    ``infer_replicas`` runs that many inference processes when the infer stage
+    is in 'process' mode. Yields each persisted batch (a list of Comment instances).
+
+    API clients are not thread-safe, so ``youtube`` is only used on the caller's
+    thread (by persist). In 'thread' mode the fetch stage and the reply lookups
+    in normalize, which runs on the dedupe thread, each build their own client
+    with ``youtube_factory()``.
+    """
+    threaded = mode != 'inline'
+    if threaded and youtube is not None and youtube_factory is None:
+        raise ValueError("mode='thread' needs youtube_factory to build a client per stage thread")
+
+    def client():
+        if youtube is None or not threaded:
+            return youtube
+        return youtube_pool.thread_client(youtube_factory)
+
+    def fetch(_):
+        if youtube is None:
+            return iter(())
+        return iter_comment_threads(client(), video_id, page_size=page_size, max_items=max_items)
+
+    def normalize_rows(items):
+        # A generator, so client() runs on the thread that consumes it
+        yield from normalize(items, video_id, youtube=client(), replies=include_replies, log=log)
+
+    infer_kwargs = {'batch_size': batch_size}
+    if predict is not None:
+        infer_kwargs['predict'] = predict
+    if (infer_mode or mode) != 'process':
+        infer_kwargs['log'] = log
+    infer = [Stage(batch_infer, mode=infer_mode or mode, replicas=infer_replicas, **infer_kwargs)]
+    if (infer_mode or mode) == 'process' and infer_replicas > 1:
+        # Replicas reorder batches; reply counts must still land after their replies
+        gate = ThreadUpdateGate()
+        infer = [Stage(gate.hold, mode='inline'), *infer, Stage(gate.release, mode='inline')]
+    stages = [
+        Stage(fetch, mode=mode),
+        Stage(normalize_rows, mode='inline'),
+        Stage(dedupe, mode=mode),
+        Stage(detect_language, mode='inline'),
+        *infer,
+        Stage(persist, mode='inline', youtube=youtube, log=log, row_events=row_events),
+    ]
+    return run_pipeline([None], stages, queue_size=queue_size)
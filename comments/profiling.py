@@ -0,0 +1,131 @@
+"""Opt-in profiling for management commands and dashboard requests.
+
+Each profiled run writes a timestamped directory under ``settings.PROFILE_ROOT``:
+
+    profile.prof   raw cProfile stats (load with pstats or snakeviz)
+    profile.txt    top functions by cumulative time (or pyinstrument output)
+    queries.json   SQL query count, total time and the most repeated statements
+
+Repeated statements are grouped with their parameters stripped, so an N+1
+pattern (e.g. one COUNT per video on the home page) shows up as a single SQL
+string with a high count.
+"""
+import cProfile
+import io
+import json
+import pstats
+import re
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connections
+
+PROFILE_MODES = ('cprofile', 'sampling')
+
+
+def _profile_root():
+    return getattr(settings, 'PROFILE_ROOT', settings.BASE_DIR / 'profiles')
+
+
+class QueryRecorder:
+    """``execute_wrapper`` that records every SQL statement and its duration."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'many': many,
+                'duration_ms': (time.perf_counter() - start) * 1000.0,
+            })
+
+    def summary(self, top=25):
+        grouped = {}
+        for q in self.queries:
+            # Collapse literals so the same statement with different params groups together
+            key = re.sub(r"'[^']*'|\b\d+\b", '?', q['sql'])
+            entry = grouped.setdefault(key, {'sql': key, 'count': 0, 'total_ms': 0.0})
+            entry['count'] += 1
+            entry['total_ms'] += q['duration_ms']
+        repeated = sorted(grouped.values(), key=lambda e: (e['count'], e['total_ms']), reverse=True)
+        return {
+            'query_count': len(self.queries),
+            'total_ms': round(sum(q['duration_ms'] for q in self.queries), 3),
+            'distinct_statements': len(grouped),
+            'top_statements': [dict(e, total_ms=round(e['total_ms'], 3)) for e in repeated[:top]],
+            'slowest': sorted(self.queries, key=lambda q: q['duration_ms'], reverse=True)[:top],
+        }
+
+
+class ProfileRun:
+    """Holds the output location and results of a single profiled run."""
+
+    def __init__(self, label, mode):
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        safe_label = re.sub(r'[^A-Za-z0-9_.-]+', '_', label).strip('_') or 'run'
+        self.label = label
+        self.mode = mode
+        self.output_dir = _profile_root() / f'{stamp}-{safe_label}'
+        self.queries = QueryRecorder()
+        self.wall_seconds = None
+
+    def write(self, profiler):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        if self.mode == 'sampling':
+            (self.output_dir / 'profile.txt').write_text(profiler.output_text(unicode=True), encoding='utf-8')
+            (self.output_dir / 'profile.html').write_text(profiler.output_html(), encoding='utf-8')
+        else:
+            profiler.dump_stats(str(self.output_dir / 'profile.prof'))
+            buf = io.StringIO()
+            pstats.Stats(profiler, stream=buf).sort_stats('cumulative').print_stats(60)
+            (self.output_dir / 'profile.txt').write_text(buf.getvalue(), encoding='utf-8')
+        summary = self.queries.summary()
+        summary.update({'label': self.label, 'mode': self.mode, 'wall_seconds': round(self.wall_seconds, 4)})
+        with open(self.output_dir / 'queries.json', 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+
+
+def _make_profiler(mode):
+    if mode == 'sampling':
+        try:
+            from pyinstrument import Profiler
+            return Profiler(), 'sampling'
+        except Exception:
+            # Sampling profiler not installed; deterministic profiling still works
+            pass
+    return cProfile.Profile(), 'cprofile'
+
+
+@contextmanager
+def profiled(label, mode='cprofile'):
+    """Profile the enclosed block and record SQL on every configured DB alias.
+
+    Yields a :class:`ProfileRun`; its ``output_dir`` is populated on exit.
+    """
+    profiler, mode = _make_profiler(mode)
+    run = ProfileRun(label, mode)
+    start = time.perf_counter()
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(run.queries))
+        if mode == 'sampling':
+            profiler.start()
+        else:
+            profiler.enable()
+        try:
+            yield run
+        finally:
+            if mode == 'sampling':
+                profiler.stop()
+            else:
+                profiler.disable()
+            run.wall_seconds = time.perf_counter() - start
+            run.write(profiler)
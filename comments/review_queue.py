@@ -0,0 +1,90 @@
+"""Priority order for the human review queue.
+
+Every comment stores a ``review_priority`` computed once at ingest from its
+model score, likes and publish time. Ordering by it (on the
+``comment_review_queue`` indexes) puts likely-toxic, widely seen, recent
+comments first. The priority is a log-scale weight plus a recency term:
+
+- toxicity (0 at REVIEW_THRESHOLD, 1 at TOXIC_THRESHOLD) adds up to
+  ``TOXICITY_WEIGHT``, and likes add ``LIKES_WEIGHT * log10(1 + likes)``;
+- the publish time adds ``log10(2)`` per ``HALF_LIFE_HOURS``, so a comment
+  published one half-life later ties with one of twice the weight.
+
+Because recency is a linear function of the publish time, not of the
+comment's age, the relative order never changes as time passes and stored
+priorities never need refreshing. The trade-off is that newer comments
+always win eventually: the weights only decide how long an important comment
+holds its place. With the defaults, a comment scored at the toxic threshold
+stays ahead of a borderline comment with no likes for about 20 days
+(``TOXICITY_WEIGHT / log10(2)`` half-lives), and 1,000 likes buy about
+15 more days. Moderators who fall further behind than that should filter
+the queue by video, or work through the oldest comments in search.
+
+Pages are read with keyset pagination: the cursor is the last row's
+``(review_priority, comment_id)``, so fetching the next page is an index seek
+however deep into the queue the moderator is.
+"""
+import math
+
+from django.db.models import Q
+
+from .models import Comment
+from .pipeline import REVIEW_THRESHOLD, TOXIC_THRESHOLD
+
+HALF_LIFE_HOURS = 72
+TOXICITY_WEIGHT = 2.0
+LIKES_WEIGHT = 0.5
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Rows decided without a model score (lexicon matches, repeat offenders)
+UNSCORED_WEIGHT = 0.5
+
+
+def priority(score, like_count, published_at):
+    # How far into the review band the score sits: 0 at REVIEW_THRESHOLD, 1 at TOXIC_THRESHOLD and above
+    if score is None:
+        toxicity = UNSCORED_WEIGHT
+    else:
+        toxicity = min(max((score - REVIEW_THRESHOLD) / (TOXIC_THRESHOLD - REVIEW_THRESHOLD), 0.0), 1.0)
+    weight = TOXICITY_WEIGHT * toxicity + LIKES_WEIGHT * math.log10(1 + max(like_count or 0, 0))
+    recency = published_at.timestamp() / (HALF_LIFE_HOURS * 3600) * math.log10(2) if published_at else 0.0
+    return weight + recency
+
+
+def priority_for(comment):
+    return priority(comment.toxicity_score, comment.like_count, comment.published_at)
+
+
+def encode_cursor(comment):
+    return f"{comment.review_priority!r}:{comment.comment_id}"
+
+
+def decode_cursor(cursor):
+    """``(priority, comment_id)`` from ``encode_cursor``; raises ValueError if malformed."""
+    value, sep, comment_id = (cursor or '').partition(':')
+    if not sep or not comment_id:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return float(value), comment_id
+
+
+def queue(video_id=None):
+    """Comments awaiting review, highest priority first."""
+    qs = Comment.objects.filter(moderation_status='review')
+    if video_id:
+        qs = qs.filter(video_id=video_id)
+    return qs.order_by('-review_priority', 'comment_id')
+
+
+def next_page(video_id=None, limit=DEFAULT_PAGE_SIZE, after=None):
+    """``(comments, next_cursor)``: the ``limit`` highest-priority comments after the ``after`` cursor.
+
+    ``next_cursor`` is None when the queue has no more comments.
+    """
+    qs = queue(video_id)
+    if after:
+        value, comment_id = decode_cursor(after)
+        qs = qs.filter(Q(review_priority__lt=value) | Q(review_priority=value, comment_id__gt=comment_id))
+    rows = list(qs[:limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1]) if more else None
@@ -0,0 +1,111 @@
+"""Incrementally maintained per-video, per-day moderation counts.
+
+Stats views read ``VideoDailyStats`` (O(videos x days) rows) instead of
+counting the Comment table. Days are IST publish dates, matching how the
+dashboard and log analytics display comments.
+"""
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+from .models import ArchivedComment, Comment, VideoDailyStats
+
+IST = dt_timezone(timedelta(hours=5, minutes=30))
+STATUSES = ('unclassified', 'neutral', 'toxic', 'review', 'deleted')
+
+
+def ist_day(published_at):
+    return published_at.astimezone(IST).date()
+
+
+def add(deltas, comment, status, amount):
+    key = (comment.video_id, ist_day(comment.published_at), status)
+    deltas[key] = deltas.get(key, 0) + amount
+
+
+def apply(deltas):
+    """Apply ``{(video_id, day, status): amount}`` count changes."""
+    for (video_id, day, status), amount in deltas.items():
+        if not amount:
+            continue
+        rows = VideoDailyStats.objects.filter(video_id=video_id, day=day, status=status)
+        if rows.update(count=F('count') + amount):
+            continue
+        try:
+            with transaction.atomic():
+                VideoDailyStats.objects.create(video_id=video_id, day=day, status=status, count=amount)
+        except IntegrityError:
+            # Created concurrently between our update and insert
+            rows.update(count=F('count') + amount)
+
+
+def _stats_from(counts):
+    stats = {status: counts.get(status, 0) for status in ('review', 'neutral', 'deleted')}
+    stats['total'] = sum(counts.values())
+    stats['toxic'] = stats['deleted']  # All deleted are toxic
+    return stats
+
+
+def video_stats(video_id=None):
+    """Dashboard stat counts for one video, or all videos when ``video_id`` is None."""
+    qs = VideoDailyStats.objects.all()
+    if video_id:
+        qs = qs.filter(video_id=video_id)
+    counts = dict(qs.values_list('status').annotate(n=Sum('count')).values_list('status', 'n'))
+    return _stats_from(counts)
+
+
+def stats_by_video(video_ids):
+    """``{video_id: stats}`` for many videos in one query."""
+    counts = {vid: {} for vid in video_ids}
+    rows = (VideoDailyStats.objects.filter(video_id__in=list(video_ids))
+            .values('video_id', 'status').annotate(n=Sum('count')))
+    for row in rows:
+        counts[row['video_id']][row['status']] = row['n']
+    return {vid: _stats_from(c) for vid, c in counts.items()}
+
+
+def daily_counts(video_id=None, start=None, end=None):
+    """``{iso_date: {status: count, 'total': n}}`` newest first, optionally for days ``start..end`` inclusive."""
+    qs = VideoDailyStats.objects.all()
+    if video_id:
+        qs = qs.filter(video_id=video_id)
+    if start:
+        qs = qs.filter(day__gte=start)
+    if end:
+        qs = qs.filter(day__lte=end)
+    days = {}
+    for row in qs.values('day', 'status').annotate(n=Sum('count')).order_by('-day'):
+        day = days.setdefault(row['day'].isoformat(), {'total': 0})
+        day[row['status']] = day.get(row['status'], 0) + row['n']
+        day['total'] += row['n']
+    return days
+
+
+def rebuild(video_ids=None):
+    """Recompute rollups from the Comment and ArchivedComment tables; returns the number of rows written."""
+    stats = VideoDailyStats.objects.all()
+    if video_ids:
+        stats = stats.filter(video_id__in=video_ids)
+    counts = {}
+    for model in (Comment, ArchivedComment):
+        comments = model.objects.all()
+        if video_ids:
+            comments = comments.filter(video_id__in=video_ids)
+        grouped = (comments.annotate(day=TruncDate('published_at', tzinfo=IST))
+                   .values('video_id', 'day', 'moderation_status').annotate(n=Count('pk')).order_by())
+        for g in grouped:
+            key = (g['video_id'], g['day'], g['moderation_status'])
+            counts[key] = counts.get(key, 0) + g['n']
+    rows = [
+        VideoDailyStats(video_id=video_id, day=day, status=status, count=n)
+        for (video_id, day, status), n in counts.items()
+    ]
+    with transaction.atomic():
+        stats.delete()
+        VideoDailyStats.objects.bulk_create(rows, batch_size=1000)
+    from . import caching
+    caching.touch_comments(video_ids or [])
+    return len(rows)
@@ -0,0 +1,173 @@
+"""Full-text comment search.
+
+SQLite keeps a standalone FTS5 table (``comments_comment_fts``); PostgreSQL a
+table of ``tsvector`` columns with GIN indexes (``comments_comment_search``).
+Both are created by migration 0006 and filled by ``comments.moderation.
+record_ingested`` as comments are stored, so every ingestion path keeps them in
+sync. Results join back to ``Comment`` and ``ArchivedComment`` (comments
+moved by ``comments.archive`` keep their index entries) for the video/status
+filters. Other database backends have no index; there each term is a
+case-insensitive substring filter on both tables, newest first.
+
+Query syntax: bare words must all appear in the text, ``"quoted phrases"``
+must appear as written and ``author:name`` / ``author:"full name"`` match the
+author. Terms are combined with AND.
+"""
+import re
+
+from django.db import connection
+
+from . import archive
+
+FTS_TABLE = 'comments_comment_fts'
+PG_TABLE = 'comments_comment_search'
+INDEXED_VENDORS = ('sqlite', 'postgresql')
+
+# Hot and archived comments, so search covers both tables
+COMMENTS_SQL = ("(SELECT comment_id, video_id, moderation_status, published_at FROM comments_comment "
+                "UNION ALL SELECT comment_id, video_id, moderation_status, published_at FROM comments_archivedcomment)")
+
+_TOKEN = re.compile(r'(author:)?(?:"([^"]*)"?|(\S+))', re.IGNORECASE)
+
+
+def parse_query(query):
+    """Split a search string into ``(field, text, is_phrase)`` terms."""
+    terms = []
+    for m in _TOKEN.finditer(query or ''):
+        field = 'author' if m.group(1) else 'text'
+        is_phrase = m.group(2) is not None
+        text = (m.group(2) if is_phrase else m.group(3) or '').strip()
+        if text:
+            terms.append((field, text, is_phrase))
+    return terms
+
+
+def index(comments):
+    """Add newly stored comments to the search index."""
+    rows = [(c.comment_id, c.video_id, c.text or '', c.author or '') for c in comments]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (comment_id, video_id, text, author) VALUES (%s, %s, %s, %s)", rows
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.executemany(
+                f"INSERT INTO {PG_TABLE} (comment_id, video_id, text_vector, author_vector) "
+                "VALUES (%s, %s, to_tsvector('simple', %s), to_tsvector('simple', %s)) "
+                "ON CONFLICT (comment_id) DO NOTHING",
+                rows,
+            )
+
+
+def _fts5_string(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _sqlite_match(terms):
+    # Bare words are quoted too, so FTS5 operators typed by users are matched literally
+    return ' AND '.join(f'{field} : {_fts5_string(text)}' for field, text, _is_phrase in terms)
+
+
+class SearchResults:
+    """Lazily evaluated, sliceable search results for ``django.core.paginator.Paginator``."""
+
+    def __init__(self, query, video_id=None, status=None):
+        self.terms = parse_query(query)
+        self.video_id = video_id
+        self.status = status
+        self._count = None
+
+    def _from_where(self):
+        filters = []
+        params = []
+        if connection.vendor == 'sqlite':
+            sql = (f"FROM {FTS_TABLE} JOIN {COMMENTS_SQL} c ON c.comment_id = {FTS_TABLE}.comment_id "
+                   f"WHERE {FTS_TABLE} MATCH %s")
+            params.append(_sqlite_match(self.terms))
+        else:
+            sql = f"FROM {PG_TABLE} s JOIN {COMMENTS_SQL} c ON c.comment_id = s.comment_id WHERE TRUE"
+            for field, text, is_phrase in self.terms:
+                func = 'phraseto_tsquery' if is_phrase else 'plainto_tsquery'
+                filters.append(f"s.{field}_vector @@ {func}('simple', %s)")
+                params.append(text)
+        if self.video_id:
+            filters.append("c.video_id = %s")
+            params.append(self.video_id)
+        if self.status:
+            filters.append("c.moderation_status = %s")
+            params.append(self.status)
+        for f in filters:
+            sql += f" AND {f}"
+        return sql, params
+
+    def _unindexed(self):
+        """``(comment_id, published_at)`` rows of both tables matching every term with ``icontains``."""
+        from django.db.models import Q
+        from .models import ArchivedComment, Comment
+        condition = Q()
+        for field, text, _is_phrase in self.terms:
+            condition &= Q(**{f'{field}__icontains': text})
+        if self.video_id:
+            condition &= Q(video_id=self.video_id)
+        if self.status:
+            condition &= Q(moderation_status=self.status)
+        hot = Comment.objects.filter(condition).values_list('comment_id', 'published_at')
+        archived = ArchivedComment.objects.filter(condition).values_list('comment_id', 'published_at')
+        return hot.union(archived, all=True).order_by('-published_at')
+
+    def _rank(self):
+        if connection.vendor == 'sqlite':
+            return f"bm25({FTS_TABLE})", []
+        text_terms = [(text, is_phrase) for field, text, is_phrase in self.terms if field == 'text']
+        if not text_terms:
+            return "0", []
+        query = ' && '.join(
+            ("phraseto_tsquery('simple', %s)" if is_phrase else "plainto_tsquery('simple', %s)") for _t, is_phrase in text_terms
+        )
+        # ts_rank is higher for better matches; negate so both backends sort ascending
+        return f"-ts_rank(s.text_vector, {query})", [t for t, _p in text_terms]
+
+    def count(self):
+        if self._count is None:
+            if not self.terms:
+                self._count = 0
+            elif connection.vendor not in INDEXED_VENDORS:
+                self._count = self._unindexed().count()
+            else:
+                sql, params = self._from_where()
+                with connection.cursor() as cursor:
+                    cursor.execute(f"SELECT COUNT(*) {sql}", params)
+                    self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        if not self.terms:
+            return []
+        start = key.start or 0
+        stop = key.stop if key.stop is not None else self.count()
+        if stop <= start:
+            return []
+        if connection.vendor not in INDEXED_VENDORS:
+            ids = [comment_id for comment_id, _published_at in self._unindexed()[start:stop]]
+        else:
+            sql, params = self._from_where()
+            rank_sql, rank_params = self._rank()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT c.comment_id {sql} ORDER BY {rank_sql}, c.published_at DESC LIMIT %s OFFSET %s",
+                    params + rank_params + [stop - start, start],
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+        found = archive.in_bulk(ids)
+        return [found[i] for i in ids if i in found]
+
+
+def search(query, video_id=None, status=None):
+    return SearchResults(query, video_id=video_id, status=status)
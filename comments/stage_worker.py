@@ -0,0 +1,43 @@
+"""Child-process side of ``pipeline`` process stages.
+
+Kept free of model imports so a spawned interpreter can unpickle these objects
+before Django is configured; ``run_stage`` sets Django up and then resolves the
+stage function by its dotted path.
+"""
+import importlib
+
+
+class End:
+    """End-of-stream marker passed through stage queues."""
+
+
+class Failed:
+    """Carries an upstream stage failure to the consumer."""
+
+    def __init__(self, stage, error):
+        self.stage = stage
+        self.error = error
+
+
+def run_stage(module_name, func_name, kwargs, inq, outq):
+    try:
+        import django
+        django.setup()
+        func = getattr(importlib.import_module(module_name), func_name)
+    except BaseException as e:
+        outq.put(Failed(func_name, repr(e)))
+        return
+
+    def source():
+        while True:
+            item = inq.get()
+            if isinstance(item, End):
+                return
+            yield item
+
+    try:
+        for item in func(source(), **kwargs):
+            outq.put(item)
+        outq.put(End())
+    except BaseException as e:
+        outq.put(Failed(func_name, repr(e)))
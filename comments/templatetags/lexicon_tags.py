@@ -0,0 +1,27 @@
+from django import template
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from comments.lexicon import first_phrase, get_lexicon
+
+register = template.Library()
+
+
+@register.filter
+def highlight_toxic(text):
+    """Escape ``text`` and wrap toxic-lexicon matches in <mark>."""
+    text = text or ''
+    parts = []
+    pos = 0
+    for m in get_lexicon().scan(text):
+        parts.append(escape(text[pos:m.start]))
+        parts.append(f'<mark class="toxic-match" title="{escape(m.category)}">{escape(text[m.start:m.end])}</mark>')
+        pos = m.end
+    parts.append(escape(text[pos:]))
+    return mark_safe(''.join(parts))
+
+
+@register.filter
+def toxic_phrase(text):
+    """First toxic-lexicon phrase in ``text`` as written, or ''."""
+    return first_phrase(text or '')
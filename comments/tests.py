@@ -1,3 +1,480 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone as dj_timezone
+
+from . import archive, dumps, export, leases, pipeline, review_queue, search
+from .bloom import BloomFilter
+from .lexicon import Lexicon
+from .models import ChannelVideo, Comment
+from .moderation import record_ingested
+
+T0 = datetime(2025, 10, 1, 10, 0, tzinfo=timezone.utc)
+
+
+class _Request:
+    def __init__(self, fn):
+        self.fn = fn
+
+    def execute(self):
+        return self.fn()
+
+
+class FakeYouTube:
+    """Records setModerationStatus calls; ``fail`` ids make a call naming them raise."""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.rejected = []
+
+    def comments(self):
+        return self
+
+    def setModerationStatus(self, id, moderationStatus, **kwargs):
+        def run():
+            ids = id.split(',')
+            if self.fail & set(ids):
+                raise RuntimeError(f"processingFailure for {id}")
+            self.rejected.extend(ids)
+            return {}
+        return _Request(run)
+
+
+def thread_item(comment_id, reply_count=0, replies=(), text='hello there', published=T0):
+    return {
+        'id': f't-{comment_id}',
+        'snippet': {
+            'totalReplyCount': reply_count,
+            'topLevelComment': {'id': comment_id, 'snippet': {
+                'textDisplay': text, 'authorDisplayName': 'author', 'likeCount': 0,
+                'publishedAt': published.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            }},
+        },
+        'replies': {'comments': [
+            {'id': reply_id, 'snippet': {'textDisplay': 'a reply', 'authorDisplayName': 'other', 'likeCount': 0,
+                                         'publishedAt': '2025-10-01T11:00:00Z', 'parentId': comment_id}}
+            for reply_id in replies
+        ]},
+    }
+
+
+def row(comment_id, decision='neutral', score=0.1, **fields):
+    values = {'comment_id': comment_id, 'video_id': 'v1', 'author': 'author', 'text': 'hello there',
+              'like_count': 0, 'published_at': T0, 'decision': decision, 'score': score}
+    values.update(fields)
+    return values
+
+
+def stored(comment_id, **fields):
+    values = {'comment_id': comment_id, 'video_id': 'v1', 'author': 'author', 'text': 'hello there',
+              'published_at': T0, 'moderation_status': 'neutral'}
+    values.update(fields)
+    return Comment.objects.create(**values)
+
+
+class IsolatedTestCase(TestCase):
+    """Keeps live events, the view cache and the retrain queues out of the working tree."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        cls._settings = override_settings(
+            LIVE_EVENTS_PATH=os.path.join(cls.tmpdir, 'live_events.jsonl'),
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        )
+        cls._settings.enable()
+        cls._queue = mock.patch.object(pipeline, 'PENDING_REVIEW_QUEUE_PATH',
+                                       os.path.join(cls.tmpdir, 'retrain_queue.csv'))
+        cls._queue.start()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._queue.stop()
+        cls._settings.disable()
+        shutil.rmtree(cls.tmpdir, ignore_errors=True)
+
+
+class IngestPipelineTests(IsolatedTestCase):
+
+    def test_new_replies_on_stored_thread_update_reply_count_after_replies(self):
+        stored('c1', reply_count=0)
+        rows = list(pipeline.dedupe(pipeline.normalize([thread_item('c1', 2, ['r1', 'r2'])], 'v1')))
+        # The stored thread is dropped; its count update follows the replies
+        self.assertEqual([r['comment_id'] for r in rows], ['r1', 'r2', 'c1'])
+        self.assertEqual(rows[-1]['kind'], pipeline.THREAD_UPDATE)
+        for r in rows[:2]:
+            r.update(decision='neutral', score=0.1)
+        objs = pipeline.persist_batch(rows, row_events=False)
+        self.assertEqual(sorted(o.comment_id for o in objs), ['r1', 'r2'])
+        self.assertEqual(Comment.objects.get(comment_id='c1').reply_count, 2)
+        self.assertEqual(set(Comment.objects.filter(parent_id='c1').values_list('comment_id', flat=True)), {'r1', 'r2'})
+
+    def test_new_thread_is_stored_with_its_reply_count(self):
+        rows = list(pipeline.dedupe(pipeline.normalize([thread_item('c2', 1, ['r3'])], 'v1')))
+        for r in rows:
+            if r.get('kind') != pipeline.THREAD_UPDATE:
+                r.update(decision='neutral', score=0.1)
+        pipeline.persist_batch(rows, row_events=False)
+        self.assertEqual(Comment.objects.get(comment_id='c2').reply_count, 1)
+
+    def test_unchanged_stored_thread_yields_nothing_new(self):
+        stored('c1', reply_count=1)
+        rows = list(pipeline.dedupe(pipeline.normalize([thread_item('c1', 1, ['r1'])], 'v1')))
+        self.assertEqual(rows, [])
+
+    def test_dedupe_drops_repeats_within_the_stream(self):
+        rows = [row('a'), row('b'), row('a')]
+        self.assertEqual([r['comment_id'] for r in pipeline.dedupe(rows)], ['a', 'b'])
+
+    def test_reinserting_a_batch_stores_nothing_twice(self):
+        batch = [row('a'), row('b')]
+        self.assertEqual(len(pipeline.persist_batch([dict(r) for r in batch], row_events=False)), 2)
+        self.assertEqual(pipeline.persist_batch([dict(r) for r in batch], row_events=False), [])
+        self.assertEqual(Comment.objects.count(), 2)
+
+    def test_row_stored_concurrently_is_dropped_inside_the_transaction(self):
+        stored('a')
+        real = archive.existing_ids
+        calls = []
+
+        def missed_first_check(ids):
+            calls.append(1)
+            return set() if len(calls) == 1 else real(ids)
+        with mock.patch.object(pipeline.archive, 'existing_ids', missed_first_check):
+            objs = pipeline.persist_batch([row('a'), row('b')], row_events=False)
+        self.assertEqual([o.comment_id for o in objs], ['b'])
+        self.assertEqual(Comment.objects.count(), 2)
+
+    def test_stored_toxic_row_is_not_rejected_on_youtube_again(self):
+        stored('a', moderation_status='deleted')
+        youtube = FakeYouTube()
+        objs = pipeline.persist_batch([row('a', 'toxic', 0.95), row('b', 'toxic', 0.95)], youtube=youtube,
+                                      row_events=False)
+        self.assertEqual(youtube.rejected, ['b'])
+        self.assertEqual([(o.comment_id, o.moderation_status) for o in objs], [('b', 'deleted')])
+
+    def test_failed_youtube_reject_goes_to_review(self):
+        objs = pipeline.persist_batch([row('a', 'toxic', 0.95)], youtube=FakeYouTube(fail={'a'}), row_events=False)
+        self.assertEqual(objs[0].moderation_status, 'review')
+
+
+class DumpImportTests(IsolatedTestCase):
+
+    def write(self, name, lines, opener=open):
+        path = os.path.join(self.tmpdir, name)
+        with opener(path, 'wt', encoding='utf-8') as f:
+            f.write(''.join(lines))
+        return path
+
+    def test_iter_rows_reads_jsonl_pages_and_skips_incomplete_rows(self):
+        page = {'items': [thread_item('c1'), thread_item('c2', 1, ['r1'])]}
+        broken = {'id': 'x', 'snippet': {'textDisplay': 'no date'}}
+        path = self.write('dump.jsonl.gz', [json.dumps(page) + '\n', '\n', json.dumps(broken) + '\n'], gzip.open)
+        stats = {}
+        rows = list(dumps.iter_rows(path, video_id='v1', stats=stats))
+        self.assertEqual([r['comment_id'] for r in rows], ['c1', 'c2', 'r1'])
+        self.assertEqual(rows[2]['parent_id'], 'c2')
+        self.assertEqual(rows[0]['published_at'], T0)
+        self.assertEqual(stats, {'parsed': 3, 'skipped': 1})
+
+    def test_iter_rows_matches_takeout_csv_columns(self):
+        path = self.write('takeout.csv', [
+            'Comment ID,Video ID,Comment text,Comment create timestamp\r\n',
+            'k1,v9,"{""text"": ""hi""}",2025-10-01T10:00:00.123+00:00\r\n',
+        ])
+        [r] = list(dumps.iter_rows(path))
+        self.assertEqual((r['comment_id'], r['video_id'], r['text']), ('k1', 'v9', 'hi'))
+        self.assertEqual(r['published_at'].year, 2025)
+
+    def test_iter_rows_rejects_unknown_file_types(self):
+        with self.assertRaises(ValueError):
+            list(dumps.iter_rows(os.path.join(self.tmpdir, 'dump.xml')))
+
+    def test_dedupe_drops_repeats_in_the_same_chunk(self):
+        stats = {}
+        rows = [row('a'), row('b'), row('a')]
+        batches = list(dumps.dedupe(iter(rows), dumps.existing_filter(expected_new=3), stats=stats))
+        self.assertEqual([[r['comment_id'] for r in b] for b in batches], [['a', 'b']])
+        self.assertEqual(stats['duplicates'], 1)
+
+    def test_dedupe_drops_ids_stored_by_an_earlier_run(self):
+        dumps.store([row('a')])
+        stats = {}
+        bloom = dumps.existing_filter(expected_new=2)
+        batches = list(dumps.dedupe(iter([row('a'), row('b')]), bloom, stats=stats))
+        self.assertEqual([[r['comment_id'] for r in b] for b in batches], [['b']])
+        self.assertEqual(stats['duplicates'], 1)
+        self.assertEqual(Comment.objects.get(comment_id='a').moderation_status, 'unclassified')
+
+    def test_dedupe_keeps_bloom_false_positives(self):
+        bloom = mock.Mock(might_contain=lambda key: True)
+        batches = list(dumps.dedupe(iter([row('a')]), bloom))
+        self.assertEqual([[r['comment_id'] for r in b] for b in batches], [['a']])
+
+    def test_bloom_filter_has_no_false_negatives_and_few_false_positives(self):
+        bloom = BloomFilter(5000, error_rate=0.01)
+        for i in range(5000):
+            bloom.add(f'id{i}')
+        self.assertTrue(all(f'id{i}' in bloom for i in range(5000)))
+        false_positives = sum(f'other{i}' in bloom for i in range(5000))
+        self.assertLess(false_positives, 150)
+        self.assertEqual(bloom.count, 5000)
+
+
+LEXICON_CSV = [
+    ['Toxic_Word_or_Phrase', 'Category_of_Toxicity', 'Language_Type', 'Context_or_Example_Sentence'],
+    ['threat', 'Threat', 'English', 'that is a threat'],
+    ['vedhava', 'Insult', 'Hybrid', 'nuvvu vedhava'],
+    ['sit', 'Insult', 'English', 'sit down'],
+    ['bastard', 'Insult', 'English', 'you bastard'],
+    ['Karen', 'Insult', 'English', 'ok karen'],
+    ['NULL', 'Neutral', 'English', 'my friend karen said hello'],
+]
+
+
+class LexiconTests(IsolatedTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.path = os.path.join(cls.tmpdir, 'lexicon.csv')
+        with open(cls.path, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows(LEXICON_CSV)
+
+    def lexicon(self):
+        from .lexicon import load_entries, load_ordinary_words
+        return Lexicon(load_entries(self.path), load_ordinary_words(self.path))
+
+    def phrases(self, text):
+        return [m.phrase for m in self.lexicon().scan(text)]
+
+    def test_folded_spellings_match_whole_words(self):
+        self.assertEqual(self.phrases('Nuvvu VEDAAVA ra'), ['vedhava'])
+        self.assertEqual(self.phrases('you B4ST4RRD!!'), ['bastard'])
+
+    def test_ordinary_words_short_keys_and_substrings_do_not_match(self):
+        # threat folds to treat, sit is too short, karen is in a Neutral sentence
+        for text in ('please treat me kindly', 'sit here', 'hi karen', 'the threatening sky', 'aravedhavam'):
+            self.assertEqual(self.phrases(text), [], text)
+
+    @override_settings(LEXICON_MATCH_DECISION='toxic')
+    def test_a_match_never_rejects(self):
+        from .lexicon import match_decision
+        self.assertEqual(match_decision(), 'review')
+
+    def test_highlight_escapes_text_and_marks_matches(self):
+        from .templatetags.lexicon_tags import highlight_toxic
+        with override_settings(TOXIC_LEXICON_PATH=self.path):
+            html = highlight_toxic('<b>you</b> vedhava & "co"')
+        self.assertEqual(
+            html,
+            '&lt;b&gt;you&lt;/b&gt; <mark class="toxic-match" title="Insult">vedhava</mark> &amp; &quot;co&quot;',
+        )
+
+    def test_highlight_without_matches_only_escapes(self):
+        from .templatetags.lexicon_tags import highlight_toxic
+        with override_settings(TOXIC_LEXICON_PATH=self.path):
+            self.assertEqual(highlight_toxic('<i>treat</i>'), '&lt;i&gt;treat&lt;/i&gt;')
+
+
+class ReviewQueueTests(IsolatedTestCase):
+
+    def setUp(self):
+        # Equal priorities tie-break on comment_id
+        for i in range(7):
+            stored(f'c{i}', moderation_status='review', review_priority=float(i // 2))
+        stored('n1', moderation_status='neutral', review_priority=99.0)
+        stored('other', video_id='v2', moderation_status='review', review_priority=50.0)
+
+    def test_cursor_round_trip(self):
+        comment = Comment.objects.get(comment_id='c3')
+        self.assertEqual(review_queue.decode_cursor(review_queue.encode_cursor(comment)), (1.0, 'c3'))
+        with self.assertRaises(ValueError):
+            review_queue.decode_cursor('1.0')
+
+    def test_pages_cover_the_queue_once_in_priority_order(self):
+        seen, after = [], None
+        while True:
+            page, after = review_queue.next_page('v1', limit=3, after=after)
+            seen.extend(c.comment_id for c in page)
+            if after is None:
+                break
+        self.assertEqual(seen, ['c6', 'c4', 'c5', 'c2', 'c3', 'c0', 'c1'])
+
+    def test_review_next_endpoint_pages_with_cursor(self):
+        first = self.client.get('/review/next/', {'video_id': 'v1', 'limit': 4}).json()
+        self.assertEqual([r['comment_id'] for r in first['results']], ['c6', 'c4', 'c5', 'c2'])
+        second = self.client.get('/review/next/', {'video_id': 'v1', 'limit': 4, 'after': first['next']}).json()
+        self.assertEqual([r['comment_id'] for r in second['results']], ['c3', 'c0', 'c1'])
+        self.assertIsNone(second['next'])
+        self.assertEqual(self.client.get('/review/next/', {'after': 'bad'}).status_code, 400)
+
+    def test_priority_weighs_score_and_likes_against_recency(self):
+        now = dj_timezone.now()
+        toxic_yesterday = review_queue.priority(pipeline.TOXIC_THRESHOLD, 0, now - timedelta(days=1))
+        borderline_today = review_queue.priority(pipeline.REVIEW_THRESHOLD, 0, now)
+        self.assertGreater(toxic_yesterday, borderline_today)
+        popular = review_queue.priority(pipeline.TOXIC_THRESHOLD, 1000, now - timedelta(days=10))
+        self.assertGreater(popular, review_queue.priority(pipeline.TOXIC_THRESHOLD, 0, now))
+
+
+class BulkModerateTests(IsolatedTestCase):
+
+    def setUp(self):
+        for comment_id in ('a', 'b', 'c'):
+            stored(comment_id, moderation_status='review')
+
+    def post(self, **data):
+        return self.client.post('/bulk_moderate/', data, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+    def statuses(self):
+        return dict(Comment.objects.values_list('comment_id', 'moderation_status'))
+
+    def test_comma_separated_and_repeated_ids(self):
+        response = self.post(action='neutral', comment_ids=['a, b', 'c', 'a', 'missing']).json()
+        self.assertEqual(response['comment_ids'], ['a', 'b', 'c'])
+        self.assertEqual(response['not_found'], ['missing'])
+        self.assertEqual(set(self.statuses().values()), {'neutral'})
+
+    def test_more_than_the_cap_is_refused(self):
+        from .views import BULK_MAX_COMMENTS
+        ids = ','.join(f'x{i}' for i in range(BULK_MAX_COMMENTS + 1))
+        response = self.post(action='neutral', comment_ids=ids)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(self.statuses().values()), {'review'})
+
+    def test_unknown_action_is_refused(self):
+        self.assertEqual(self.post(action='archive', comment_ids='a').status_code, 400)
+
+    def test_partial_youtube_failure_leaves_refused_comments_unchanged(self):
+        youtube = FakeYouTube(fail={'b'})
+
+        def delete_one(comment_id, client):
+            client.comments().setModerationStatus(id=comment_id, moderationStatus='rejected').execute()
+        with mock.patch('comments.views._youtube_service', return_value=youtube), \
+                mock.patch('comments.views.delete_comment_from_youtube', delete_one):
+            response = self.post(action='delete', comment_ids='a,b,c').json()
+        self.assertFalse(response['success'])
+        self.assertEqual(list(response['failed']), ['b'])
+        self.assertEqual(sorted(youtube.rejected), ['a', 'c'])
+        self.assertEqual(self.statuses(), {'a': 'deleted', 'b': 'review', 'c': 'deleted'})
+
+
+class SearchTests(IsolatedTestCase):
+
+    def setUp(self):
+        comments = [
+            stored('s1', text='Great video, loved the music', author='Ravi Kumar', published_at=T0),
+            stored('s2', text='the music was too loud', author='Sam', published_at=T0 + timedelta(hours=1)),
+            stored('s3', text='great great great', author='Ravi Kumar', moderation_status='review',
+                   published_at=T0 + timedelta(hours=2)),
+            stored('s4', text='music', video_id='v2', published_at=T0 + timedelta(hours=3)),
+        ]
+        record_ingested(comments, row_events=False)
+
+    def ids(self, query, **filters):
+        results = search.search(query, **filters)
+        return len(results), sorted(c.comment_id for c in results[0:len(results)])
+
+    def check_queries(self):
+        self.assertEqual(self.ids('music', video_id='v1'), (2, ['s1', 's2']))
+        self.assertEqual(self.ids('great author:"ravi kumar"'), (2, ['s1', 's3']))
+        self.assertEqual(self.ids('"music was"'), (1, ['s2']))
+        self.assertEqual(self.ids('great', status='review'), (1, ['s3']))
+        self.assertEqual(self.ids(''), (0, []))
+
+    def test_full_text_index(self):
+        self.assertIn(connection.vendor, search.INDEXED_VENDORS)
+        self.check_queries()
+        # FTS operators typed by users are matched literally
+        self.assertEqual(self.ids('music OR NEAR'), (0, []))
+
+    def test_icontains_fallback_on_other_backends(self):
+        with mock.patch.object(connection, 'vendor', 'other'):
+            self.check_queries()
+            page = search.search('music')[0:2]
+        # Newest first without a rank
+        self.assertEqual([c.comment_id for c in page], ['s4', 's2'])
+
+    def test_archived_comments_are_searched(self):
+        self.assertEqual(archive.archive(older_than_days=1, video_id='v1'), 2)
+        self.assertEqual(self.ids('music', video_id='v1'), (2, ['s1', 's2']))
+        with mock.patch.object(connection, 'vendor', 'other'):
+            self.assertEqual(self.ids('music', video_id='v1'), (2, ['s1', 's2']))
+
+
+class LeaseTests(TestCase):
+
+    def setUp(self):
+        for video_id in ('a', 'b', 'c'):
+            ChannelVideo.objects.create(video_id=video_id)
+
+    def test_compare_and_set_claims_are_exclusive(self):
+        self.assertFalse(connection.features.has_select_for_update_skip_locked)
+        first = leases.claim('w1', limit=2)
+        second = leases.claim('w2', limit=2)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse(set(first) & set(second))
+        self.assertEqual(leases.claim('w3'), [])
+
+    def test_claim_lost_to_another_worker_moves_on(self):
+        real = leases._claimable
+        calls = []
+
+        def racing(fetched_before, now):
+            calls.append(1)
+            if len(calls) == 2:
+                # Another worker wins 'a' after the candidates were read
+                ChannelVideo.objects.filter(video_id='a').update(lease_owner='w2',
+                                                                 lease_expires_at=now + timedelta(minutes=5))
+            return real(fetched_before, now)
+        with mock.patch.object(leases, '_claimable', racing):
+            self.assertEqual(leases.claim('w1'), ['b'])
+        self.assertEqual(ChannelVideo.objects.get(video_id='a').lease_owner, 'w2')
+
+    def test_expired_lease_is_claimable_and_release_records_the_fetch(self):
+        started = dj_timezone.now()
+        self.assertEqual(leases.claim('w1', limit=3), ['a', 'b', 'c'])
+        ChannelVideo.objects.filter(video_id='a').update(lease_expires_at=started - timedelta(seconds=1))
+        self.assertEqual(leases.claim('w2'), ['a'])
+        self.assertEqual(leases.release('w1', 'a'), 0)
+        self.assertEqual(leases.release('w2', 'a'), 1)
+        self.assertEqual(leases.claim('w3', fetched_before=started), [])
+        self.assertEqual(leases.pending(started), 2)
+
+
+class ExportTests(IsolatedTestCase):
+
+    def test_stream_csv(self):
+        stored('e1', text='line one,\n"quoted"', toxicity_score=0.5, toxicity_category='Insult', language='English')
+        stored('e2', parent_id='e1', video_id='v2', moderation_status='deleted')
+        stored('e3', moderation_status='review')
+        body = b''.join(export.stream('csv', statuses=['neutral', 'deleted'])).decode('utf-8')
+        rows = list(csv.DictReader(body.splitlines(keepends=True)))
+        self.assertEqual([r['comment_id'] for r in rows], ['e1', 'e2'])
+        self.assertEqual(rows[0]['text'], 'line one,\n"quoted"')
+        self.assertEqual((rows[0]['toxicity_category'], rows[0]['language'], rows[0]['archived']),
+                         ('Insult', 'English', 'False'))
+        self.assertEqual((rows[0]['parent_id'], rows[1]['parent_id']), ('', 'e1'))
+
+    def test_stream_csv_header_only_when_empty(self):
+        body = b''.join(export.stream('csv', video_id='none')).decode('utf-8')
+        self.assertEqual(body.strip(), ','.join(export.COLUMNS))
+
+    def test_stream_csv_in_chunks(self):
+        for i in range(5):
+            stored(f'e{i}')
+        chunks = list(export.stream('csv', chunk_size=2))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(b''.join(chunks).decode('utf-8').count('\r\n'), 6)
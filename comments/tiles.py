@@ -0,0 +1,243 @@
+"""Video tile thumbnails: resized, content-hashed and cached by browsers for good.
+
+A video's tile is built from a local source image,
+``TILE_SOURCE_DIR/<video_id>.(png|jpg|jpeg|webp)``. If there is none and
+``TILE_FETCH_THUMBNAILS`` is on, YouTube's public thumbnail for the video is
+downloaded there first. The image is cropped to 16:9 and written at each of
+``TILE_WIDTHS`` as WebP and PNG. File names carry a hash of the bytes written
+(``<video_id>-<width>.<hash>.webp``), so changed content always gets a new
+URL and ``views.tile_file`` can serve every name as ``immutable`` for a year.
+``TILE_ROOT/manifest.json`` maps each video id to its current files;
+``picture`` turns an entry into template-ready URLs.
+
+``schedule`` builds a missing tile on a background thread (``add_video``
+uses it). ``manage.py build_tiles`` builds every video's tile and prunes files
+the manifest no longer names. Building needs Pillow; without it no tiles are
+built and the home page shows none.
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+ASPECT = (16, 9)
+DEFAULT_WIDTHS = (160, 320)
+SOURCE_EXTENSIONS = ('png', 'jpg', 'jpeg', 'webp')
+THUMBNAIL_URL = 'https://i.ytimg.com/vi/{video_id}/hqdefault.jpg'
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+CONTENT_TYPES = {'webp': 'image/webp', 'png': 'image/png'}
+
+VIDEO_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+NAME_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}-\d+\.[0-9a-f]{16}\.(webp|png)$')
+MANIFEST = 'manifest.json'
+
+_lock = threading.Lock()
+_manifest = (None, {})
+_executor = None
+
+
+def root():
+    return str(getattr(settings, 'TILE_ROOT', os.path.join(settings.BASE_DIR, 'media', 'tiles')))
+
+
+def source_dir():
+    return str(getattr(settings, 'TILE_SOURCE_DIR', os.path.join(settings.BASE_DIR, 'static', 'tiles')))
+
+
+def widths():
+    return tuple(getattr(settings, 'TILE_WIDTHS', DEFAULT_WIDTHS))
+
+
+def have_pillow():
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def manifest():
+    """``{video_id: entry}`` as last written, re-read when the file changes."""
+    global _manifest
+    path = os.path.join(root(), MANIFEST)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    if _manifest[0] != mtime:
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        _manifest = (mtime, data)
+    return _manifest[1]
+
+
+def _write_atomic(path, data):
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _save_entry(video_id, entry):
+    with _lock:
+        current = dict(manifest())
+        current[video_id] = entry
+        _write_atomic(os.path.join(root(), MANIFEST), json.dumps(current, indent=2, sort_keys=True).encode('utf-8'))
+
+
+def picture(video_id):
+    """URLs for a ``<picture>`` of the video's tile, or None if it has not been built."""
+    from django.urls import reverse
+    entry = manifest().get(video_id)
+    if not entry:
+        return None
+
+    def srcset(fmt):
+        return ', '.join(
+            f"{reverse('tile_file', args=[name])} {int(width) * 1.0 / entry['width']:g}x"
+            for width, name in sorted(entry.get(fmt, {}).items(), key=lambda item: int(item[0]))
+        )
+    png = entry['png']
+    return {
+        'src': reverse('tile_file', args=[png[str(entry['width'])]]),
+        'png_srcset': srcset('png'),
+        'webp_srcset': srcset('webp'),
+        'width': entry['width'],
+        'height': entry['height'],
+    }
+
+
+def find_source(video_id):
+    for ext in SOURCE_EXTENSIONS:
+        path = os.path.join(source_dir(), f'{video_id}.{ext}')
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def fetch_source(video_id, timeout=10):
+    """Download the video's YouTube thumbnail into the source directory; returns its path."""
+    with urllib.request.urlopen(THUMBNAIL_URL.format(video_id=video_id), timeout=timeout) as response:
+        data = response.read()
+    os.makedirs(source_dir(), exist_ok=True)
+    path = os.path.join(source_dir(), f'{video_id}.jpg')
+    _write_atomic(path, data)
+    return path
+
+
+def _render(image, width, fmt):
+    from PIL import Image, ImageOps
+    height = round(width * ASPECT[1] / ASPECT[0])
+    resized = ImageOps.fit(image, (width, height), Image.LANCZOS)
+    buf = io.BytesIO()
+    if fmt == 'webp':
+        resized.save(buf, 'WEBP', quality=80, method=6)
+    else:
+        resized.save(buf, 'PNG', optimize=True)
+    return buf.getvalue()
+
+
+def build(video_id, force=False, fetch=None):
+    """Build the video's tile files if its source changed; returns the manifest entry or None.
+
+    Returns None when there is no source image (and none could be fetched).
+    """
+    if not VIDEO_ID_RE.match(video_id or ''):
+        raise ValueError(f"Invalid video id {video_id!r}")
+    fetch = getattr(settings, 'TILE_FETCH_THUMBNAILS', True) if fetch is None else fetch
+    source = find_source(video_id)
+    if source is None and fetch:
+        source = fetch_source(video_id)
+    if source is None:
+        return None
+    with open(source, 'rb') as f:
+        data = f.read()
+    source_hash = _digest(data)
+    entry = manifest().get(video_id)
+    if (entry and not force and entry.get('source') == source_hash
+            and entry.get('widths') == list(widths())
+            and all(os.path.exists(os.path.join(root(), name))
+                    for fmt in CONTENT_TYPES for name in entry.get(fmt, {}).values())):
+        return entry
+
+    from PIL import Image, features
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    if image.mode in ('RGBA', 'LA', 'P'):
+        # Flatten transparency onto white, like the page background
+        image = image.convert('RGBA')
+        flat = Image.new('RGB', image.size, (255, 255, 255))
+        flat.paste(image, mask=image.getchannel('A'))
+        image = flat
+    else:
+        image = image.convert('RGB')
+    formats = [fmt for fmt in CONTENT_TYPES if fmt != 'webp' or features.check('webp')]
+    os.makedirs(root(), exist_ok=True)
+    entry = {'source': source_hash, 'widths': list(widths()), 'width': widths()[0],
+             'height': round(widths()[0] * ASPECT[1] / ASPECT[0])}
+    for fmt in formats:
+        entry[fmt] = {}
+        for width in widths():
+            body = _render(image, width, fmt)
+            name = f'{video_id}-{width}.{_digest(body)}.{fmt}'
+            path = os.path.join(root(), name)
+            if not os.path.exists(path):
+                _write_atomic(path, body)
+            entry[fmt][str(width)] = name
+    _save_entry(video_id, entry)
+    return entry
+
+
+def _build_in_background(video_id):
+    from . import caching
+    try:
+        if build(video_id):
+            # Home page ETags follow the video list version
+            caching.touch_videos()
+    except Exception:
+        logger.exception("Failed to build the tile for %s", video_id)
+
+
+def schedule(video_id):
+    """Build the video's tile on the background thread unless it is already built."""
+    global _executor
+    if not have_pillow() or not VIDEO_ID_RE.match(video_id or '') or video_id in manifest():
+        return None
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tiles')
+    return _executor.submit(_build_in_background, video_id)
+
+
+def prune():
+    """Delete tile files no manifest entry names; returns how many were removed."""
+    keep = {MANIFEST}
+    for entry in manifest().values():
+        for fmt in CONTENT_TYPES:
+            keep.update(entry.get(fmt, {}).values())
+    removed = 0
+    try:
+        names = os.listdir(root())
+    except OSError:
+        return 0
+    for name in names:
+        if name not in keep and NAME_RE.match(name):
+            os.remove(os.path.join(root(), name))
+            removed += 1
+    return removed
@@ -12,7 +12,14 @@ urlpatterns = [
     path('fetch_all_comments/', views.fetch_all_comments, name='fetch_all_comments'),
     path('reclassify_and_delete/', views.reclassify_and_delete, name='reclassify_and_delete'),
     path('neutral_and_queue/', views.neutral_and_queue, name='neutral_and_queue'),
+    path('bulk_moderate/', views.bulk_moderate, name='bulk_moderate'),
+    path('review/next/', views.review_next, name='review_next'),
     path('log_analytics/', views.log_analytics, name='log_analytics'),
+    path('offenders/', views.top_offenders, name='top_offenders'),
     path('add_video/', views.add_video, name='add_video'),
+    path('tiles/<str:name>', views.tile_file, name='tile_file'),
+    path('live/events/', views.live_events, name='live_events'),
+    path('search/', views.search_comments, name='search_comments'),
+    path('export/', views.export_comments, name='export_comments'),
     # path('model_performance/', views.model_performance, name='model_performance'),
 ]
@@ -1,43 +1,82 @@
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, Http404, JsonResponse, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+from django.conf import settings
 from .models import Comment, ChannelVideo
 from .video_config import CHANNEL_VIDEOS, CHANNEL_VIDEO_LINKS
+from . import archive, caching, live, review_queue, rollups, search, tiles, youtube_pool
+from .moderation import change_status
 import os
 import csv
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _is_ajax(request):
+	return request.headers.get('x-requested-with') == 'XMLHttpRequest'
+
+
+LOG_ANALYTICS_DEFAULT_DAYS = 7
+LOG_ANALYTICS_MAX_EVENTS = 5000
 
 
 def log_analytics(request):
-	from datetime import timedelta
+	from datetime import date, datetime, time as dt_time, timedelta
+	from .moderation import events_between
 	# Accept optional video_id to scope analytics to a single video
 	video_id = request.GET.get('video_id') or request.POST.get('video_id')
-	base_qs = Comment.objects.all()
-	if video_id:
-		base_qs = base_qs.filter(video_id=video_id)
 
-	# Build logs and group by date (YYYY-MM-DD)
+	# Inclusive IST date range; only events inside it are read
+	def parse_day(value):
+		try:
+			return date.fromisoformat(value) if value else None
+		except ValueError:
+			return None
+	end_day = parse_day(request.GET.get('end')) or datetime.now(rollups.IST).date()
+	start_day = parse_day(request.GET.get('start')) or end_day - timedelta(days=LOG_ANALYTICS_DEFAULT_DAYS - 1)
+	if start_day > end_day:
+		start_day, end_day = end_day, start_day
+	range_start = datetime.combine(start_day, dt_time.min, tzinfo=rollups.IST)
+	range_end = datetime.combine(end_day + timedelta(days=1), dt_time.min, tzinfo=rollups.IST)
+
+	events = list(events_between(range_start, range_end, video_id)[:LOG_ANALYTICS_MAX_EVENTS + 1])
+	truncated = len(events) > LOG_ANALYTICS_MAX_EVENTS
+	events = events[:LOG_ANALYTICS_MAX_EVENTS]
+	comments = {}
+	for i in range(0, len(events), 500):
+		ids = {e.comment_id for e in events[i:i + 500]}
+		comments.update(archive.in_bulk(ids, fields=('comment_id', 'author', 'text')))
+
+	# Group moderation actions by the IST date they happened on
 	logs_by_date = {}
-	for c in base_qs.order_by('-published_at'):
-		if c.published_at:
-			published_at_ist = c.published_at + timedelta(hours=5, minutes=30)
-			date_key = published_at_ist.date().isoformat()
-			published_str = published_at_ist.strftime('%Y-%m-%d %H:%M:%S')
+	for e in events:
+		acted_at = e.created_at.astimezone(rollups.IST)
+		comment = comments.get(e.comment_id)
+		if e.old_status:
+			operation = f"{e.old_status.capitalize()} → {e.new_status.capitalize()}"
 		else:
-			published_at_ist = None
-			date_key = 'unknown'
-			published_str = ''
-
-		entry = {
-			'comment_id': c.comment_id,
-			'author': c.author,
-			'published_at_ist': published_str,
-			'operation': c.moderation_status.capitalize(),
-			'text': c.text,
-		}
-		logs_by_date.setdefault(date_key, []).append(entry)
+			operation = e.new_status.capitalize()
+		logs_by_date.setdefault(acted_at.date().isoformat(), []).append({
+			'comment_id': e.comment_id,
+			'author': comment.author if comment else '',
+			'acted_at_ist': acted_at.strftime('%Y-%m-%d %H:%M:%S'),
+			'operation': operation,
+			'actor': e.get_actor_display(),
+			'score': round(e.score, 3) if e.score is not None else None,
+			'text': comment.text if comment else '',
+		})
+
+	# Per-day status summaries (by publish date) from the rollups
+	daily_summary = rollups.daily_counts(video_id, start_day, end_day)
 
 	# Sort dates descending
-	sorted_dates = sorted(logs_by_date.keys(), reverse=True)
+	sorted_dates = sorted(set(logs_by_date.keys()) | set(daily_summary.keys()), reverse=True)
 
 	# Determine video display name
 	if video_id:
@@ -46,16 +85,67 @@ def log_analytics(request):
 		# don't show 'All Videos' label when not scoped to a specific video
 		video_name = ''
 
-	import json
 	return render(request, 'comments/log_analytics.html', {
-		'timeline_logs_by_date': logs_by_date,
 		'timeline_logs_by_date_json': json.dumps(logs_by_date),
-		'sorted_dates': sorted_dates,
+		'dates_with_summary': [(d, daily_summary.get(d), len(logs_by_date.get(d, []))) for d in sorted_dates],
+		'range_start': start_day.isoformat(),
+		'range_end': end_day.isoformat(),
+		'events_truncated': truncated,
+		'max_events': LOG_ANALYTICS_MAX_EVENTS,
 		'current_video_id': video_id,
 		'current_video_name': video_name,
 	})
 
 
+OFFENDERS_DEFAULT_LIMIT = 50
+OFFENDERS_MAX_LIMIT = 500
+
+
+def top_offenders(request):
+	"""Authors ranked by deleted comments, from the incrementally maintained AuthorStats."""
+	from . import authors
+
+	def int_param(name, default, low, high):
+		try:
+			return max(low, min(int(request.GET.get(name, default)), high))
+		except ValueError:
+			return default
+	limit = int_param('limit', OFFENDERS_DEFAULT_LIMIT, 1, OFFENDERS_MAX_LIMIT)
+	min_deleted = int_param('min_deleted', 1, 1, 1000000)
+	rows = list(authors.top_offenders(limit, min_deleted))
+	flagged = authors.offenders(r.author for r in rows)
+	offenders = [{
+		'author': r.author,
+		'comment_count': r.comment_count,
+		'review_count': r.review_count,
+		'deleted_count': r.deleted_count,
+		'deleted_rate': round(r.deleted_rate * 100, 1),
+		'first_seen_at': r.first_seen_at,
+		'last_seen_at': r.last_seen_at,
+		'is_offender': r.author in flagged,
+	} for r in rows]
+	if request.GET.get('format') == 'json':
+		for o in offenders:
+			for key in ('first_seen_at', 'last_seen_at'):
+				o[key] = o[key].isoformat() if o[key] else None
+		return JsonResponse({'offenders': offenders, 'policy': authors.policy()})
+	return render(request, 'comments/offenders.html', {
+		'offenders': offenders,
+		'policy': authors.policy(),
+		'min_deleted': getattr(settings, 'REPEAT_OFFENDER_MIN_DELETED', 3),
+		'min_rate_pct': round(getattr(settings, 'REPEAT_OFFENDER_MIN_RATE', 0.5) * 100),
+		'shown_min_deleted': min_deleted,
+		'limit': limit,
+	})
+
+
+def _queue_for_retraining(rows):
+	"""Append ``[comment_id, language_type, toxic_word, context, toxicity_category]`` rows in one write."""
+	queue_path = os.path.join(os.path.dirname(__file__), 'retrain_queue.csv')
+	with open(queue_path, 'a', newline='', encoding='utf-8') as csvfile:
+		csv.writer(csvfile).writerows(rows)
+
+
 @csrf_exempt
 def neutral_and_queue(request):
 	if request.method == 'POST':
@@ -65,24 +155,12 @@ def neutral_and_queue(request):
 		context = request.POST.get('context')
 		toxicity_category = request.POST.get('toxicity_category')  # Should be 'Neutral'
 		# Queue for retraining: append to CSV file
-		queue_path = os.path.join(os.path.dirname(__file__), 'retrain_queue.csv')
-		with open(queue_path, 'a', newline='', encoding='utf-8') as csvfile:
-			writer = csv.writer(csvfile)
-			writer.writerow([
-				comment_id,
-				language_type,
-				toxic_word,
-				context,
-				toxicity_category
-			])
+		_queue_for_retraining([[comment_id, language_type, toxic_word, context, toxicity_category]])
 		# Mark comment as neutral and update status
-		try:
-			comment = Comment.objects.get(comment_id=comment_id)
-			comment.moderation_status = 'neutral'
-			comment.save()
-			return JsonResponse({'success': True})
-		except Comment.DoesNotExist:
+		if not Comment.objects.filter(comment_id=comment_id).exists():
 			return JsonResponse({'error': 'Comment not found'}, status=404)
+		change_status([comment_id], 'neutral')
+		return JsonResponse({'success': True})
 	return HttpResponse(status=405)
 
 
@@ -101,30 +179,12 @@ def fetch_comments(request):
 			except Exception:
 				video_id = CHANNEL_VIDEOS[0] if CHANNEL_VIDEOS else None
 		from django.core.management import call_command
-		import subprocess
-		flag_path = os.path.join(os.path.dirname(__file__), 'retrain_flag.txt')
-		queue_path = os.path.join(os.path.dirname(__file__), 'retrain_queue.csv')
-		# Get current queue length
-		try:
-			with open(queue_path, 'r', encoding='utf-8') as f:
-				queue_len = sum(1 for _ in f)
-		except FileNotFoundError:
-			queue_len = 0
-		# Get last flag value
-		try:
-			with open(flag_path, 'r') as f:
-				last_flag = int(f.read().strip())
-		except (FileNotFoundError, ValueError):
-			# If no flag exists, assume 0 processed items
-			last_flag = 0
-
-		# Retrain only after 20 or more new queued comments
-		new_items = queue_len - last_flag
-		if new_items >= 20 or (last_flag == 0 and queue_len >= 20):
-			retrain_script = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'toxicity_models', 'retrain_model.py')
-			subprocess.run(['python', retrain_script])  # Wait for retraining to finish
-		# Now fetch and classify comments using updated model
+		# Retraining runs in the background; this fetch uses the current model
+		_start_retrain()
 		call_command('fetch_comments', video_id)
+		if _is_ajax(request):
+			# New comments reach open dashboards through the live event feed
+			return JsonResponse({'success': True, 'video_id': video_id})
 		# Redirect to the per-video dashboard where possible
 		if video_id:
 			return redirect('dashboard_video', video_id=video_id)
@@ -132,33 +192,87 @@ def fetch_comments(request):
 	return HttpResponse(status=405)
 
 
+RETRAIN_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'toxicity_models', 'retrain_model.py')
+RETRAIN_N_JOBS = 2
+
+_retrain_lock = threading.Lock()
+_fetch_lock = threading.Lock()
+_fetch_job = None
+
+
+def _retrain_due():
+	"""True once 20 or more comments were queued since the last retrain."""
+	flag_path = os.path.join(os.path.dirname(__file__), 'retrain_flag.txt')
+	queue_path = os.path.join(os.path.dirname(__file__), 'retrain_queue.csv')
+	try:
+		with open(queue_path, 'r', encoding='utf-8') as f:
+			queue_len = sum(1 for _ in f)
+	except FileNotFoundError:
+		queue_len = 0
+	try:
+		with open(flag_path, 'r') as f:
+			last_flag = int(f.read().strip())
+	except (FileNotFoundError, ValueError):
+		# If no flag exists, assume 0 processed items
+		last_flag = 0
+	return queue_len - last_flag >= 20
+
+
+def _retrain():
+	"""Run retrain_model.py if it is due and not already running; blocks until it finishes."""
+	import subprocess
+	if not _retrain_lock.acquire(blocking=False):
+		return
+	try:
+		if _retrain_due():
+			# Leave cores for the web server; the grid search uses all of them by default
+			n_jobs = getattr(settings, 'RETRAIN_N_JOBS', RETRAIN_N_JOBS)
+			subprocess.run(['python', RETRAIN_SCRIPT, '--n-jobs', str(n_jobs)])
+	except Exception:
+		logger.exception("Background retrain failed")
+	finally:
+		_retrain_lock.release()
+
+
+def _start_retrain():
+	"""Run ``_retrain`` on a background thread if it is due and not already running."""
+	if _retrain_lock.locked() or not _retrain_due():
+		return False
+	threading.Thread(target=_retrain, name='retrain-model', daemon=True).start()
+	return True
+
+
+def _run_fetch():
+	from django.core.management import call_command
+	from django.db import connection
+	try:
+		# Retrain first so the fetch classifies with the updated model
+		_retrain()
+		# Don't sit in the lease loop waiting on other workers' videos
+		call_command('fetch_all_comments', no_wait=True)
+	except Exception:
+		logger.exception("Background fetch_all_comments failed")
+	finally:
+		connection.close()
+
+
+def _start_fetch():
+	"""Run fetch_all_comments on a background thread; False if one is still running."""
+	global _fetch_job
+	with _fetch_lock:
+		if _fetch_job is not None and _fetch_job.is_alive():
+			return False
+		_fetch_job = threading.Thread(target=_run_fetch, name='fetch-all-comments', daemon=True)
+		_fetch_job.start()
+	return True
+
+
 @csrf_exempt
 def fetch_all_comments(request):
 	"""
 	Trigger fetching comments for all videos in CHANNEL_VIDEOS.
 	"""
 	if request.method == 'POST':
-		from django.core.management import call_command
-		import subprocess
-		flag_path = os.path.join(os.path.dirname(__file__), 'retrain_flag.txt')
-		queue_path = os.path.join(os.path.dirname(__file__), 'retrain_queue.csv')
-
-		# Determine whether to retrain first (same logic as single fetch)
-		try:
-			with open(queue_path, 'r', encoding='utf-8') as f:
-				queue_len = sum(1 for _ in f)
-		except FileNotFoundError:
-			queue_len = 0
-		try:
-			with open(flag_path, 'r') as f:
-				last_flag = int(f.read().strip())
-		except (FileNotFoundError, ValueError):
-			last_flag = 0
-		new_items = queue_len - last_flag
-		if new_items >= 20 or (last_flag == 0 and queue_len >= 20):
-			retrain_script = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'toxicity_models', 'retrain_model.py')
-			subprocess.run(['python', retrain_script])
-
 		# Prefer DB-backed ChannelVideo entries; fall back to constants
 		try:
 			db_vids = list(ChannelVideo.objects.order_by('-created_at').values_list('video_id', flat=True))
@@ -169,8 +283,12 @@ def fetch_all_comments(request):
 		except Exception:
 			video_list = CHANNEL_VIDEOS
 
-		# Call centralized command that loads models once and processes all videos
-		call_command('fetch_all_comments')
+		# Retraining (when due) and the command, which loads models once and processes all
+		# videos, run in the background so the request doesn't hold a server worker
+		started = _start_fetch()
+		if _is_ajax(request):
+			# New comments reach open dashboards through the live event feed
+			return JsonResponse({'success': True, 'started': started})
 
 		# If the dashboard requested the fetch for a specific video, redirect back to that video's dashboard
 		current_video_id = request.POST.get('current_video_id')
@@ -183,97 +301,164 @@ def fetch_all_comments(request):
 @csrf_exempt
 def move_to_neutral(request, comment_id):
 	if request.method == 'POST':
-		try:
-			comment = Comment.objects.get(comment_id=comment_id)
-			comment.moderation_status = 'neutral'
-			comment.save()
-		except Comment.DoesNotExist:
-			pass
+		change_status([comment_id], 'neutral')
+		if _is_ajax(request):
+			return JsonResponse({'success': True})
 	return redirect('dashboard')
 
 
+SEARCH_PAGE_SIZE = 25
+SEARCH_STATUSES = ('review', 'neutral', 'deleted', 'toxic', 'unclassified')
+
+
+def _search_page(request, video_id=None, per_page=SEARCH_PAGE_SIZE):
+	"""Paginated search results for ?q=&status=&page=, or None without a query."""
+	from django.core.paginator import Paginator
+	query = request.GET.get('q', '').strip()
+	if not query:
+		return None
+	status = request.GET.get('status')
+	if status not in SEARCH_STATUSES:
+		status = None
+	paginator = Paginator(search.search(query, video_id=video_id, status=status), per_page)
+	return paginator.get_page(request.GET.get('page'))
+
+
+def search_comments(request):
+	"""JSON comment search: ?q=&video_id=&status=&page=&per_page= (max 100)."""
+	try:
+		per_page = max(1, min(100, int(request.GET.get('per_page', SEARCH_PAGE_SIZE))))
+	except ValueError:
+		per_page = SEARCH_PAGE_SIZE
+	page = _search_page(request, request.GET.get('video_id') or None, per_page)
+	if page is None:
+		return JsonResponse({'error': 'Missing search query (q)'}, status=400)
+	return JsonResponse({
+		'query': request.GET.get('q', '').strip(),
+		'total': page.paginator.count,
+		'page': page.number,
+		'num_pages': page.paginator.num_pages,
+		'results': [{
+			'comment_id': c.comment_id,
+			'video_id': c.video_id,
+			'author': c.author,
+			'text': c.text,
+			'like_count': c.like_count,
+			'published_at': c.published_at,
+			'moderation_status': c.moderation_status,
+			'archived': getattr(c, 'archived', False),
+		} for c in page],
+	})
+
+
+def review_next(request):
+	"""Next comments to review, highest priority first: ?video_id=&limit=&after=<cursor>&html=1.
+
+	Keyset-paginated: pass the returned ``next`` cursor as ``after`` to continue.
+	"""
+	from .moderation import render_row
+	try:
+		limit = max(1, min(review_queue.MAX_PAGE_SIZE, int(request.GET.get('limit', review_queue.DEFAULT_PAGE_SIZE))))
+	except ValueError:
+		limit = review_queue.DEFAULT_PAGE_SIZE
+	video_id = request.GET.get('video_id') or None
+	try:
+		comments, next_cursor = review_queue.next_page(video_id, limit, request.GET.get('after') or None)
+	except ValueError as e:
+		return JsonResponse({'error': str(e)}, status=400)
+	with_html = request.GET.get('html') == '1'
+	results = []
+	for c in comments:
+		row = {
+			'comment_id': c.comment_id,
+			'video_id': c.video_id,
+			'author': c.author,
+			'text': c.text,
+			'like_count': c.like_count,
+			'published_at': c.published_at,
+			'toxicity_score': c.toxicity_score,
+			'toxicity_category': c.toxicity_category,
+			'review_priority': c.review_priority,
+		}
+		if with_html:
+			row['html'] = render_row(c)
+		results.append(row)
+	return JsonResponse({'results': results, 'next': next_cursor})
+
+
+def _revalidate(response):
+	# Browsers keep the page but must check its ETag before reusing it
+	patch_cache_control(response, private=True, no_cache=True)
+	return response
+
+
+def _dashboard_etag(request, video_id=None):
+	return caching.page_etag(request, caching.VIDEOS, caching.video_scope(video_id))
+
+
+def _dashboard_last_modified(request, video_id=None):
+	return caching.page_last_modified(caching.VIDEOS, caching.video_scope(video_id))
+
+
+@condition(etag_func=_dashboard_etag, last_modified_func=_dashboard_last_modified)
 def dashboard(request, video_id=None):
 	"""
 	Dashboard view. If video_id is provided, show stats and comments for that video only.
 	"""
-	from datetime import timedelta, datetime
-	from django.utils import timezone
-
 	base_qs = Comment.objects.all()
 	if video_id:
 		base_qs = base_qs.filter(video_id=video_id)
 
-	stats = {
-		'total': base_qs.count(),
-		'review': base_qs.filter(moderation_status__in=['review']).count(),
-		'neutral': base_qs.filter(moderation_status='neutral').count(),
-		'deleted': base_qs.filter(moderation_status='deleted').count(),
-		'toxic': base_qs.filter(moderation_status='deleted').count(),  # All deleted are toxic
-	}
-
-	def convert_and_sort(queryset):
-		comments = list(queryset)
-		for c in comments:
-			if c.published_at:
-				# Add 5 hours 30 minutes to UTC to get IST
-				c.published_at_ist = c.published_at + timedelta(hours=5, minutes=30)
-			else:
-				c.published_at_ist = None
-		# Sort by IST datetime, newest first
-		return sorted(comments, key=lambda x: x.published_at_ist or timezone.now(), reverse=True)
-
-	review_comments = convert_and_sort(base_qs.filter(moderation_status__in=['review']))
-	neutral_comments = convert_and_sort(base_qs.filter(moderation_status='neutral'))
-	deleted_comments = convert_and_sort(base_qs.filter(moderation_status='deleted'))
+	# Counts come from the daily rollups rather than scanning comments
+	stats = caching.video_stats(video_id)
 
+	# Lazy: only evaluated when the cached comment tabs fragment is stale. The review
+	# tab shows the first page of the priority queue; later pages come from review_next.
+	review_comments = review_queue.queue(video_id)[:review_queue.DEFAULT_PAGE_SIZE]
+	neutral_comments = base_qs.filter(moderation_status='neutral').order_by('-published_at')
+	deleted_comments = base_qs.filter(moderation_status='deleted').order_by('-published_at')
 
-	# Prepare paired video info for templates
-	try:
-		vids = list(ChannelVideo.objects.order_by('-created_at').values_list('video_id', 'link'))
-		if vids:
-			channel_videos_info = [(v[0], v[1]) for v in vids]
-		else:
-			channel_videos_info = list(zip(CHANNEL_VIDEOS, CHANNEL_VIDEO_LINKS))
-	except Exception:
-		channel_videos_info = list(zip(CHANNEL_VIDEOS, CHANNEL_VIDEO_LINKS))
+	videos = caching.video_list()
+	names = {vid: name for vid, _link, name in videos}
+	search_page = _search_page(request, video_id)
 
-	return render(request, 'comments/dashboard.html', {
+	return _revalidate(render(request, 'comments/dashboard.html', {
 		'stats': stats,
 		'review_comments': review_comments,
+		'review_page_size': review_queue.DEFAULT_PAGE_SIZE,
 		'neutral_comments': neutral_comments,
 		'deleted_comments': deleted_comments,
-		'channel_videos_info': channel_videos_info,
+		'search_page': search_page,
+		'search_query': request.GET.get('q', '').strip(),
+		'search_status': request.GET.get('status', ''),
+		'channel_videos_info': [(vid, link) for vid, link, _name in videos],
 		'current_video_id': video_id,
-		'current_video_name': (ChannelVideo.objects.filter(video_id=video_id).values_list('name', flat=True).first() if video_id else None) or video_id,
-	})
+		'current_video_name': (names.get(video_id) if video_id else None) or video_id,
+		'comments_version': caching.version(caching.video_scope(video_id)),
+		'fragment_cache_seconds': caching.timeout(),
+		'search_active': search_page is not None,
+	}))
 
 
+def _home_etag(request):
+	return caching.page_etag(request, caching.VIDEOS, caching.video_scope())
+
+
+def _home_last_modified(request):
+	return caching.page_last_modified(caching.VIDEOS, caching.video_scope())
+
+
+@condition(etag_func=_home_etag, last_modified_func=_home_last_modified)
 def home(request):
 	"""Home page showing channel videos as muted tiles."""
 	# Prefer DB-backed ChannelVideo entries, fall back to config list
-	try:
-		videos = list(ChannelVideo.objects.order_by('-created_at').values_list('video_id', 'link', 'name'))
-		if videos:
-			channel_videos = [(v[0], v[1]) for v in videos]
-		else:
-			channel_videos = list(zip(CHANNEL_VIDEOS, CHANNEL_VIDEO_LINKS))
-	except Exception:
-		channel_videos = list(zip(CHANNEL_VIDEOS, CHANNEL_VIDEO_LINKS))
-
-	# Build per-video stats synchronously from DB
-	channel_videos_info = []
-	for vid, link in channel_videos:
-		qs = Comment.objects.filter(video_id=vid)
-		stats = {
-			'total': qs.count(),
-			'review': qs.filter(moderation_status__in=['review']).count(),
-			'neutral': qs.filter(moderation_status='neutral').count(),
-			'deleted': qs.filter(moderation_status='deleted').count(),
-			'toxic': qs.filter(moderation_status='deleted').count(),
-		}
-		channel_videos_info.append((vid, link, stats))
+	channel_videos = [(vid, link) for vid, link, _name in caching.video_list()]
+
+	# Per-video stats for every tile; only videos changed since they were cached are recounted
+	stats_by_video = caching.stats_by_video([vid for vid, _ in channel_videos])
+	channel_videos_info = [(vid, link, stats_by_video[vid], tiles.picture(vid)) for vid, link in channel_videos]
 
-	return render(request, 'comments/home.html', {'channel_videos_info': channel_videos_info})
+	return _revalidate(render(request, 'comments/home.html', {'channel_videos_info': channel_videos_info}))
 
 
 @csrf_exempt
@@ -295,30 +480,54 @@ def add_video(request):
 				obj.link = link or obj.link
 				obj.name = name or obj.name
 				obj.save()
+			caching.touch_videos()
+			# The tile appears on the home page once the background build finishes
+			tiles.schedule(obj.video_id)
 			return JsonResponse({'success': True, 'video_id': obj.video_id})
 		except Exception as e:
 			return JsonResponse({'error': str(e)}, status=500)
 	return JsonResponse({'error': 'Invalid method'}, status=405)
 
 
-def delete_comment(request, comment_id):
-	comment = Comment.objects.get(comment_id=comment_id)
+def tile_file(request, name):
+	"""Serve a built tile. Names change with content, so browsers may keep them indefinitely."""
+	if not tiles.NAME_RE.match(name):
+		raise Http404('Unknown tile')
+	path = os.path.join(tiles.root(), name)
+	if not os.path.exists(path):
+		raise Http404('Unknown tile')
+	response = FileResponse(open(path, 'rb'), content_type=tiles.CONTENT_TYPES[name.rsplit('.', 1)[1]])
+	response['Cache-Control'] = tiles.CACHE_CONTROL
+	return response
+
+
+async def delete_comment(request, comment_id):
+	from asgiref.sync import sync_to_async
+	if not await Comment.objects.filter(comment_id=comment_id).aexists():
+		return JsonResponse({'error': 'Comment not found'}, status=404)
 	# Call YouTube API to delete comment
-	delete_comment_from_youtube(comment.comment_id)
-	comment.moderation_status = 'deleted'
-	comment.save()
+	error = await _reject_in_pool(comment_id)
+	if error:
+		return error
+	await sync_to_async(change_status)([comment_id], 'deleted')
+	if _is_ajax(request):
+		return JsonResponse({'success': True})
 	return redirect('dashboard')
 
 
-def delete_comment_from_youtube(comment_id):
+def _youtube_service():
 	try:
 		# Import locally so Django management commands that don't need
 		# YouTube API won't fail if google-auth-oauthlib isn't installed.
 		from comments.youtube_service import get_youtube_service
 	except Exception as e:
 		raise RuntimeError(f"YouTube service unavailable: {e}")
+	return get_youtube_service()
 
-	youtube = get_youtube_service()
+
+def delete_comment_from_youtube(comment_id, youtube=None):
+	if youtube is None:
+		youtube = _youtube_service()
 	try:
 		youtube.comments().setModerationStatus(id=comment_id, moderationStatus="rejected").execute()
 	except Exception as e:
@@ -349,8 +558,29 @@ def delete_comment_from_youtube(comment_id):
 			raise
 
 
+def _reject_pooled(comment_id):
+	# Runs on a youtube_pool thread, reusing that thread's client
+	delete_comment_from_youtube(comment_id, youtube_pool.thread_client(_youtube_service))
+
+
+async def _reject_in_pool(comment_id):
+	"""Reject a comment on YouTube without blocking the server; returns an error response or None."""
+	try:
+		await youtube_pool.run(_reject_pooled, comment_id)
+	except youtube_pool.Busy:
+		response = JsonResponse({'error': 'Too many YouTube requests in progress; try again shortly'}, status=503)
+		response['Retry-After'] = '5'
+		return response
+	except TimeoutError:
+		return JsonResponse({'error': 'YouTube did not respond in time; the comment was not deleted'}, status=504)
+	except Exception as e:
+		return JsonResponse({'error': f'YouTube API error: {e}'}, status=502)
+	return None
+
+
 @csrf_exempt
-def reclassify_and_delete(request):
+async def reclassify_and_delete(request):
+	from asgiref.sync import sync_to_async
 	if request.method == 'POST':
 		comment_id = request.POST.get('comment_id')
 		language_type = request.POST.get('language_type')
@@ -358,23 +588,205 @@ def reclassify_and_delete(request):
 		context = request.POST.get('context')
 		toxicity_category = request.POST.get('toxicity_category')
 		# Queue for retraining: append to CSV file
-		queue_path = os.path.join(os.path.dirname(__file__), 'retrain_queue.csv')
-		with open(queue_path, 'a', newline='', encoding='utf-8') as csvfile:
-			writer = csv.writer(csvfile)
-			writer.writerow([
-				comment_id,
-				language_type,
-				toxic_word,
-				context,
-				toxicity_category
-			])
+		await sync_to_async(_queue_for_retraining)([[comment_id, language_type, toxic_word, context, toxicity_category]])
 		# Mark comment as deleted and update status
-		try:
-			comment = Comment.objects.get(comment_id=comment_id)
-			delete_comment_from_youtube(comment_id)
-			comment.moderation_status = 'deleted'
-			comment.save()
-			return JsonResponse({'success': True})
-		except Comment.DoesNotExist:
+		if not await Comment.objects.filter(comment_id=comment_id).aexists():
 			return JsonResponse({'error': 'Comment not found'}, status=404)
+		error = await _reject_in_pool(comment_id)
+		if error:
+			return error
+		await sync_to_async(change_status)([comment_id], 'deleted')
+		return JsonResponse({'success': True})
 	return HttpResponse(status=405)
+
+
+# comments.setModerationStatus takes a comma-separated id list
+YOUTUBE_REJECT_BATCH = 50
+
+
+def reject_on_youtube(comment_ids):
+	"""Reject comments on YouTube with one multi-id call per batch.
+
+	A batch the API refuses is retried one id at a time, so a single stale id
+	does not block the rest. Returns ``(rejected_ids, {comment_id: error})``.
+	"""
+	youtube = _youtube_service()
+	rejected, failed = set(), {}
+	for start in range(0, len(comment_ids), YOUTUBE_REJECT_BATCH):
+		batch = comment_ids[start:start + YOUTUBE_REJECT_BATCH]
+		try:
+			youtube.comments().setModerationStatus(id=','.join(batch), moderationStatus='rejected').execute()
+			rejected.update(batch)
+			continue
+		except Exception:
+			pass
+		for comment_id in batch:
+			try:
+				delete_comment_from_youtube(comment_id, youtube)
+				rejected.add(comment_id)
+			except Exception as e:
+				failed[comment_id] = str(e)
+	return rejected, failed
+
+
+BULK_ACTIONS = ('neutral', 'delete')
+BULK_MAX_COMMENTS = 1000
+
+
+@csrf_exempt
+def bulk_moderate(request):
+	"""Apply one moderation action to many comments.
+
+	POST ``action`` (neutral or delete) and ``comment_ids`` (repeated or comma-separated).
+	With ``queue=1`` the comments are also queued for retraining using ``language_type``
+	and, for deletes, ``toxicity_category``. Comments YouTube refuses to reject keep their status.
+	"""
+	if request.method != 'POST':
+		return HttpResponse(status=405)
+	action = request.POST.get('action')
+	if action not in BULK_ACTIONS:
+		return JsonResponse({'error': f"action must be one of {', '.join(BULK_ACTIONS)}"}, status=400)
+	comment_ids = []
+	for value in request.POST.getlist('comment_ids'):
+		comment_ids.extend(v.strip() for v in value.split(',') if v.strip())
+	comment_ids = list(dict.fromkeys(comment_ids))
+	if not comment_ids:
+		return JsonResponse({'error': 'No comments selected'}, status=400)
+	if len(comment_ids) > BULK_MAX_COMMENTS:
+		return JsonResponse({'error': f'At most {BULK_MAX_COMMENTS} comments per request'}, status=400)
+
+	texts = dict(Comment.objects.filter(comment_id__in=comment_ids).values_list('comment_id', 'text'))
+	not_found = [c for c in comment_ids if c not in texts]
+	selected = [c for c in comment_ids if c in texts]
+	failed = {}
+	if action == 'delete' and selected:
+		try:
+			rejected, failed = reject_on_youtube(selected)
+		except RuntimeError as e:
+			return JsonResponse({'error': str(e)}, status=503)
+		selected = [c for c in selected if c in rejected]
+
+	if request.POST.get('queue') and selected:
+		language_type = request.POST.get('language_type', '')
+		if action == 'neutral':
+			rows = [[c, language_type, 'NULL', texts[c], 'Neutral'] for c in selected]
+		else:
+			from .lexicon import first_phrase
+			toxic_word = request.POST.get('toxic_word', '')
+			category = request.POST.get('toxicity_category', '')
+			rows = [[c, language_type, first_phrase(texts[c]) or toxic_word, texts[c], category] for c in selected]
+		_queue_for_retraining(rows)
+	changed = change_status(selected, 'deleted' if action == 'delete' else 'neutral') if selected else []
+
+	if not _is_ajax(request):
+		current_video_id = request.POST.get('current_video_id')
+		if current_video_id:
+			return redirect('dashboard_video', video_id=current_video_id)
+		return redirect('dashboard')
+	return JsonResponse({
+		'success': not failed,
+		'action': action,
+		'updated': len(changed),
+		'comment_ids': selected,
+		'not_found': not_found,
+		'failed': failed,
+	})
+
+
+EXPORT_FILENAME = 'comments-export'
+
+
+def export_comments(request):
+	"""Stream comments as ?format=parquet|arrow|csv with optional video_id, status (repeatable), start and end (IST days)."""
+	from datetime import date
+	from . import export
+	fmt = request.GET.get('format') or export.default_format()
+	if fmt not in export.FORMATS:
+		return JsonResponse({'error': f"format must be one of {', '.join(export.FORMATS)}"}, status=400)
+	if fmt != 'csv' and not export.have_pyarrow():
+		return JsonResponse({'error': f'{fmt} export needs pyarrow on the server; use format=csv'}, status=501)
+	try:
+		start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else None
+		end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else None
+	except ValueError:
+		return JsonResponse({'error': 'start and end must be YYYY-MM-DD'}, status=400)
+	video_id = request.GET.get('video_id') or None
+	chunks = export.stream(
+		fmt, video_id=video_id, statuses=request.GET.getlist('status') or None, start=start, end=end,
+		include_archived=request.GET.get('include_archived') == '1',
+	)
+	response = StreamingHttpResponse(chunks, content_type=export.CONTENT_TYPES[fmt])
+	import re
+	suffix = re.sub(r'[^\w-]', '', video_id or '')
+	filename = f"{EXPORT_FILENAME}{'-' + suffix if suffix else ''}.{fmt}"
+	response['Content-Disposition'] = f'attachment; filename="{filename}"'
+	return response
+
+
+def _sse_frame(next_offset, event):
+	return f"id: {next_offset}\nevent: {event.get('type', 'message')}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+def live_events(request):
+	"""Server-sent event stream of classification, status and count events.
+
+	Scoped to one video with ?video_id=. Resumes from Last-Event-ID (a byte offset
+	into the event log); new connections start at the current end. The stream
+	closes after LIVE_EVENTS_STREAM_SECONDS and EventSource reconnects, so a
+	WSGI worker is never held indefinitely.
+	"""
+	video_id = request.GET.get('video_id')
+	try:
+		offset = int(request.headers.get('Last-Event-ID') or request.GET.get('since'))
+	except (TypeError, ValueError):
+		offset = live.current_offset()
+	poll_seconds = getattr(settings, 'LIVE_EVENTS_POLL_SECONDS', 0.5)
+	lifetime = getattr(settings, 'LIVE_EVENTS_STREAM_SECONDS', 300)
+	heartbeat = 15.0
+
+	def poll(state):
+		events, state['offset'] = live.read_events(state['offset'])
+		return [
+			_sse_frame(next_offset, event) for next_offset, event in events
+			if not video_id or event.get('video_id') in (None, video_id)
+		]
+
+	def sync_stream():
+		state = {'offset': offset}
+		yield 'retry: 3000\n\n'
+		deadline = time.monotonic() + lifetime
+		last_sent = time.monotonic()
+		while time.monotonic() < deadline:
+			frames = poll(state)
+			if frames:
+				yield ''.join(frames)
+				last_sent = time.monotonic()
+			elif time.monotonic() - last_sent > heartbeat:
+				yield ': ping\n\n'
+				last_sent = time.monotonic()
+			time.sleep(poll_seconds)
+
+	async def async_stream():
+		import asyncio
+		state = {'offset': offset}
+		yield 'retry: 3000\n\n'
+		loop = asyncio.get_running_loop()
+		deadline = loop.time() + lifetime
+		last_sent = loop.time()
+		while loop.time() < deadline:
+			frames = await asyncio.to_thread(poll, state)
+			if frames:
+				yield ''.join(frames)
+				last_sent = loop.time()
+			elif loop.time() - last_sent > heartbeat:
+				yield ': ping\n\n'
+				last_sent = loop.time()
+			await asyncio.sleep(poll_seconds)
+
+	from django.core.handlers.asgi import ASGIRequest
+	# Each server type needs its own iterator kind to stream without buffering
+	stream = async_stream() if isinstance(request, ASGIRequest) else sync_stream()
+	response = StreamingHttpResponse(stream, content_type='text/event-stream')
+	response['Cache-Control'] = 'no-cache'
+	response['X-Accel-Buffering'] = 'no'
+	return response
@@ -0,0 +1,70 @@
+"""Bounded thread pool for blocking YouTube API calls made from async views.
+
+The google client is synchronous, so async views hand each call to a small
+pool of threads and await it with a timeout instead of holding a server worker
+while YouTube responds. At most ``YOUTUBE_API_WORKERS`` calls run at once and
+as many again may wait; past that ``run`` raises ``Busy`` straight away rather
+than queueing without bound. A call that times out keeps its thread until the
+API returns, and only then frees its slot, so slow responses cannot pile up
+threads either. Each pool thread builds its YouTube client once
+(``thread_client``); clients are not thread-safe, so threads never share one.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+DEFAULT_WORKERS = 8
+DEFAULT_TIMEOUT = 15
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+_local = threading.local()
+
+
+class Busy(RuntimeError):
+    """Every worker is busy and the wait queue is full."""
+
+
+def timeout():
+    return getattr(settings, 'YOUTUBE_API_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def _pool():
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            workers = getattr(settings, 'YOUTUBE_API_WORKERS', DEFAULT_WORKERS)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='youtube-api')
+            # Running plus waiting calls
+            _slots = threading.BoundedSemaphore(workers * 2)
+    return _executor, _slots
+
+
+def thread_client(factory):
+    """The current pool thread's client, built with ``factory()`` on first use."""
+    client = getattr(_local, 'client', None)
+    if client is None:
+        client = _local.client = factory()
+    return client
+
+
+async def run(func, *args, timeout_seconds=None):
+    """Await ``func(*args)`` on the pool; raises Busy, TimeoutError or whatever ``func`` raised."""
+    executor, slots = _pool()
+    if not slots.acquire(blocking=False):
+        raise Busy("Too many YouTube API calls in flight")
+    try:
+        future = executor.submit(func, *args)
+    except BaseException:
+        slots.release()
+        raise
+    # Released when the call actually finishes (or is cancelled before starting), not on timeout
+    future.add_done_callback(lambda _f: slots.release())
+    limit = timeout_seconds or timeout()
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), limit)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"YouTube API call did not finish within {limit}s") from None
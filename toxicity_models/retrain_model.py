@@ -1,12 +1,74 @@
 import pandas as pd
+import numpy as np
+from sklearn.base import clone
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import GridSearchCV, KFold, StratifiedKFold, cross_validate, train_test_split
+from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import accuracy_score, precision_recall_fscore_support, confusion_matrix, roc_auc_score
+import argparse
 import joblib
 import os
 import json
+import shutil
 import sys
+import tempfile
+import time
+
+# Evaluation: a stratified held-out split for the reported metrics and k-fold
+# cross-validation on the rest for a grid search over vectorizer and
+# regularization settings, run across cores (`--n-jobs`). The best settings are
+# then refit on every queued row for the saved model.
+#   python retrain_model.py [--folds 5] [--test-size 0.2] [--n-jobs -1] [--seed 42]
+parser = argparse.ArgumentParser(description='Retrain the TF-IDF + logistic regression toxicity classifier.')
+parser.add_argument('--folds', type=int, default=5, help='Cross-validation folds (fewer if a class is smaller)')
+parser.add_argument('--test-size', type=float, default=0.2, help='Fraction of rows held out for the reported metrics')
+parser.add_argument('--n-jobs', type=int, default=-1, help='Parallel search workers (-1: all cores)')
+parser.add_argument('--seed', type=int, default=42)
+parser.add_argument('--profile', action='store_true', help='Write cProfile stats under profiles/')
+args = parser.parse_args()
+run_start = time.perf_counter()
+
+PARAM_GRID = {
+	'tfidf__max_features': [1000, 5000],
+	'tfidf__ngram_range': [(1, 1), (1, 2)],
+	'tfidf__sublinear_tf': [False, True],
+	'clf__C': [0.1, 1.0, 10.0],
+	'clf__class_weight': [None, 'balanced'],
+}
+SCORING = 'f1_weighted'
+MIN_ROWS = 10
+
+# Optional profiling: `python retrain_model.py --profile` writes cProfile stats and
+# wall-clock time to profiles/<timestamp>-retrain_model/ at the repository root.
+if args.profile:
+	import atexit
+	import cProfile
+	import io
+	import pstats
+	from datetime import datetime
+
+	_profiler = cProfile.Profile()
+	_profile_start = time.perf_counter()
+
+	def _write_profile():
+		_profiler.disable()
+		stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+		out_dir = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'profiles', f'{stamp}-retrain_model'))
+		os.makedirs(out_dir, exist_ok=True)
+		_profiler.dump_stats(os.path.join(out_dir, 'profile.prof'))
+		buf = io.StringIO()
+		pstats.Stats(_profiler, stream=buf).sort_stats('cumulative').print_stats(60)
+		with open(os.path.join(out_dir, 'profile.txt'), 'w', encoding='utf-8') as f:
+			f.write(buf.getvalue())
+		with open(os.path.join(out_dir, 'timing.json'), 'w') as f:
+			json.dump({'label': 'retrain_model', 'wall_seconds': round(time.perf_counter() - _profile_start, 4)}, f, indent=2)
+		print('Profile written to', out_dir)
+
+	# atexit also covers the early sys.exit(0) paths below
+	atexit.register(_write_profile)
+	_profiler.enable()
 
 # Load retrain queue CSV, skip comment_id column
 queue_path = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'comments', 'retrain_queue.csv'))
@@ -29,31 +91,93 @@ X.columns = ['language_type', 'toxic_word', 'context']
 y = df[4]  # toxicity_category
 
 # Combine context and other features for vectorization
-X_text = X['context']
-
-# Vectorize context
-vectorizer = TfidfVectorizer(max_features=1000)
-X_vec = vectorizer.fit_transform(X_text)
+X_text = X['context'].fillna('').astype(str)
 
 # Encode label
 label_encoder = LabelEncoder()
 y_enc = label_encoder.fit_transform(y)
+labels = list(range(len(label_encoder.classes_)))
+
+if len(y_enc) < MIN_ROWS:
+	print(f'Only {len(y_enc)} queued rows; need at least {MIN_ROWS} for a held-out evaluation — nothing to retrain.')
+	sys.exit(0)
+
+
+def _smallest_class(y_values):
+	counts = np.bincount(y_values)
+	return counts[counts > 0].min()
+
+
+def _stratify(y_values, min_per_class):
+	# Stratified splits need every class represented min_per_class times
+	return y_values if _smallest_class(y_values) >= min_per_class else None
 
-model = LogisticRegression(max_iter=1000)
-model.fit(X_vec, y_enc)
 
-# Compute metrics
-y_pred = model.predict(X_vec)
-accuracy = accuracy_score(y_enc, y_pred)
-precision, recall, f1, _ = precision_recall_fscore_support(y_enc, y_pred, average='weighted')
-cm = confusion_matrix(y_enc, y_pred)
+def _folds(y_values):
+	smallest = _smallest_class(y_values)
+	if smallest >= 2:
+		return StratifiedKFold(n_splits=min(args.folds, smallest), shuffle=True, random_state=args.seed)
+	return KFold(n_splits=min(args.folds, len(y_values)), shuffle=True, random_state=args.seed)
+
+
+timing = {}
+phase_start = time.perf_counter()
+
+# Held-out split: the test rows are never seen by the search or the CV folds
+try:
+	X_train, X_test, y_train, y_test = train_test_split(
+		X_text, y_enc, test_size=args.test_size, random_state=args.seed, stratify=_stratify(y_enc, 2))
+except ValueError:
+	# Too few rows per class for a stratified split of this size
+	X_train, X_test, y_train, y_test = train_test_split(
+		X_text, y_enc, test_size=args.test_size, random_state=args.seed)
+cv = _folds(y_train)
+timing['split_seconds'] = time.perf_counter() - phase_start
+
+# Each fold's fitted TF-IDF matrix is cached on disk, so regularization settings
+# sharing a vectorizer configuration reuse it instead of re-vectorizing the fold
+cache_dir = tempfile.mkdtemp(prefix='retrain-tfidf-')
+pipeline = Pipeline([
+	('tfidf', TfidfVectorizer()),
+	('clf', LogisticRegression(max_iter=1000)),
+], memory=joblib.Memory(cache_dir, verbose=0))
+
 try:
-	roc_auc = roc_auc_score(y_enc, model.predict_proba(X_vec), multi_class='ovr')
-except Exception:
-	roc_auc = None
+	phase_start = time.perf_counter()
+	search = GridSearchCV(pipeline, PARAM_GRID, scoring=SCORING, cv=cv, n_jobs=args.n_jobs, refit=True, error_score=np.nan)
+	search.fit(X_train, y_train)
+	timing['search_seconds'] = time.perf_counter() - phase_start
+
+	# Per-fold scores and timings for the chosen configuration
+	phase_start = time.perf_counter()
+	fold_report = cross_validate(search.best_estimator_, X_train, y_train, scoring=SCORING, cv=cv, n_jobs=args.n_jobs)
+	timing['cv_seconds'] = time.perf_counter() - phase_start
+
+	# Honest metrics: the best configuration, trained on the training split, scored on the held-out rows
+	phase_start = time.perf_counter()
+	y_pred = search.best_estimator_.predict(X_test)
+	accuracy = accuracy_score(y_test, y_pred)
+	precision, recall, f1, _ = precision_recall_fscore_support(y_test, y_pred, average='weighted', zero_division=0)
+	cm = confusion_matrix(y_test, y_pred, labels=labels)
+	try:
+		roc_auc = roc_auc_score(y_test, search.best_estimator_.predict_proba(X_test), multi_class='ovr',
+			labels=search.best_estimator_.classes_)
+	except Exception:
+		roc_auc = None
+	timing['holdout_seconds'] = time.perf_counter() - phase_start
+
+	# Deployed model: the best configuration refit on every queued row
+	phase_start = time.perf_counter()
+	final = clone(pipeline).set_params(memory=None, **search.best_params_)
+	final.fit(X_text, y_enc)
+	vectorizer = final.named_steps['tfidf']
+	model = final.named_steps['clf']
+	timing['refit_seconds'] = time.perf_counter() - phase_start
+finally:
+	shutil.rmtree(cache_dir, ignore_errors=True)
+timing['total_seconds'] = time.perf_counter() - run_start
 
 # Class distribution
-import numpy as np
 class_counts = np.bincount(y_enc)
 class_labels = label_encoder.inverse_transform(range(len(class_counts)))
 class_dist = dict(zip(class_labels, class_counts.tolist()))
@@ -61,13 +185,27 @@ class_dist = dict(zip(class_labels, class_counts.tolist()))
 # Top features (by coef)
 feature_names = vectorizer.get_feature_names_out()
 top_features = {}
-for i, class_label in enumerate(label_encoder.classes_):
-	coefs = model.coef_[i]
+# A binary model has one coefficient row, for its second class
+coef_classes = model.classes_ if len(model.classes_) > 2 else model.classes_[1:]
+for coefs, class_index in zip(model.coef_, coef_classes):
 	top_idx = coefs.argsort()[-5:][::-1]
-	top_features[class_label] = [feature_names[j] for j in top_idx]
+	top_features[label_encoder.classes_[class_index]] = [feature_names[j] for j in top_idx]
+
+results = search.cv_results_
+ranked = sorted(range(len(results['params'])), key=lambda i: results['rank_test_score'][i])
+
+
+def _number(value):
+	value = float(value)
+	return None if np.isnan(value) else value
+
 
 # Save metrics
 metrics = {
+	# Scores below are on held-out rows the model was not trained on
+	'evaluation': 'holdout',
+	'train_rows': int(len(y_train)),
+	'test_rows': int(len(y_test)),
 	'accuracy': accuracy,
 	'precision': precision,
 	'recall': recall,
@@ -75,9 +213,39 @@ metrics = {
 	'confusion_matrix': cm.tolist(),
 	'roc_auc': roc_auc,
 	'class_distribution': class_dist,
-	'top_features': top_features
+	'top_features': top_features,
+	'cross_validation': {
+		'folds': cv.get_n_splits(),
+		'splitter': type(cv).__name__,
+		'scoring': SCORING,
+		'best_params': {k: list(v) if isinstance(v, tuple) else v for k, v in search.best_params_.items()},
+		'best_score': _number(search.best_score_),
+		'fold_scores': [_number(v) for v in fold_report['test_score']],
+		'fold_fit_seconds': [round(float(v), 4) for v in fold_report['fit_time']],
+		'fold_score_seconds': [round(float(v), 4) for v in fold_report['score_time']],
+	},
+	'search': {
+		'candidates': len(results['params']),
+		'n_jobs': args.n_jobs,
+		'top': [{
+			'params': {k: list(v) if isinstance(v, tuple) else v for k, v in results['params'][i].items()},
+			'mean_score': _number(results['mean_test_score'][i]),
+			'std_score': _number(results['std_test_score'][i]),
+			'mean_fit_seconds': round(float(results['mean_fit_time'][i]), 4),
+		} for i in ranked[:5]],
+	},
+	'timing': {k: round(v, 4) for k, v in timing.items()},
 }
 
+# Timing report
+print(f"Searched {len(results['params'])} configurations x {cv.get_n_splits()} folds "
+	f"on {len(y_train)} rows (n_jobs={args.n_jobs}) in {timing['search_seconds']:.2f}s")
+print('Best params:', search.best_params_, f'CV {SCORING}: {search.best_score_:.3f}')
+for k, (score, fit_s, score_s) in enumerate(zip(fold_report['test_score'], fold_report['fit_time'], fold_report['score_time']), 1):
+	print(f'  fold {k}: {SCORING}={score:.3f} fit={fit_s:.3f}s score={score_s:.3f}s')
+print(f'Held-out ({len(y_test)} rows): accuracy={accuracy:.3f} f1={f1:.3f}')
+print('Timing:', ', '.join(f"{k.replace('_seconds', '')}={v:.2f}s" for k, v in timing.items()))
+
 # Ensure models directory exists
 models_dir = os.path.join(os.path.dirname(__file__), 'models')
 os.makedirs(models_dir, exist_ok=True)
@@ -0,0 +1,94 @@
+"""Inference autotuning: sweep batch size, intra-op threads and model replicas.
+
+For each (threads, replicas) pair, ``replicas`` spawned processes each load the
+model once with ``torch.set_num_threads(threads)`` and then, for every batch
+size, score their share of the sample in lockstep (a barrier separates batch
+sizes). Throughput is total comments over the wall time of the slowest
+replica; latency is the time to score one batch. ``manage.py
+autotune_inference`` drives this and writes the profile that bert_infer loads.
+"""
+import math
+import multiprocessing
+import time
+from typing import Dict, List
+
+from toxicity_models.transformers import bert_infer
+
+PROFILE_PATH = bert_infer.PROFILE_PATH
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[k]
+
+
+def _replica(texts, batch_sizes, threads, backend, barrier, results):
+    """Child process: load the model once, then time every batch size."""
+    import torch
+    bert_infer.set_backend(backend)
+    bert_infer.predict_label1_prob(texts[:max(batch_sizes)], batch_size=max(batch_sizes))  # load and warm up
+    # After loading, so a saved profile does not override the setting under test
+    torch.set_num_threads(threads)
+    for batch_size in batch_sizes:
+        bert_infer.predict_label1_prob(texts[:batch_size], batch_size=batch_size)
+        barrier.wait()
+        latencies = []
+        started = time.time()
+        for i in range(0, len(texts), batch_size):
+            t0 = time.perf_counter()
+            bert_infer.predict_label1_prob(texts[i:i + batch_size], batch_size=batch_size)
+            latencies.append(time.perf_counter() - t0)
+        results.put((batch_size, started, time.time(), latencies, len(texts)))
+
+
+def measure(texts: List[str], batch_sizes: List[int], threads: int, replicas: int, backend: str = 'bert',
+            timeout: float = 1800) -> List[Dict]:
+    """Measure every batch size for one (threads, replicas) configuration."""
+    ctx = multiprocessing.get_context('spawn')
+    barrier = ctx.Barrier(replicas)
+    results = ctx.Queue()
+    share = math.ceil(len(texts) / replicas)
+    procs = [
+        ctx.Process(target=_replica, args=(texts[i * share:(i + 1) * share] or texts[:share], batch_sizes, threads,
+                                           backend, barrier, results), daemon=True)
+        for i in range(replicas)
+    ]
+    for p in procs:
+        p.start()
+    by_batch = {b: [] for b in batch_sizes}
+    try:
+        for _ in range(replicas * len(batch_sizes)):
+            batch_size, started, ended, latencies, count = results.get(timeout=timeout)
+            by_batch[batch_size].append((started, ended, latencies, count))
+    finally:
+        for p in procs:
+            p.join(timeout=10)
+            if p.is_alive():
+                p.terminate()
+
+    rows = []
+    for batch_size, runs in by_batch.items():
+        wall = max(r[1] for r in runs) - min(r[0] for r in runs)
+        latencies = [lat for r in runs for lat in r[2]]
+        total = sum(r[3] for r in runs)
+        rows.append({
+            'batch_size': batch_size,
+            'intra_op_threads': threads,
+            'replicas': replicas,
+            'throughput_per_second': round(total / wall, 2) if wall > 0 else None,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        })
+    return rows
+
+
+def choose(rows: List[Dict], max_p95_ms: float = None) -> Dict:
+    """Highest-throughput configuration, optionally within a p95 batch latency bound."""
+    candidates = [r for r in rows if r['throughput_per_second']]
+    if max_p95_ms is not None:
+        within = [r for r in candidates if r['p95_ms'] <= max_p95_ms]
+        candidates = within or candidates
+    return max(candidates, key=lambda r: r['throughput_per_second']) if candidates else None
@@ -1,60 +1,170 @@
 """Adapter to run the `textdetox/bert-multilingual-toxicity-classifier` HF model.
-Provides a predict_label1_prob(texts) function that returns LABEL_1 probability for each input.
+Provides a predict_label1_prob(texts) function that returns LABEL_1 probability for each input,
+and predict_with_category(texts) which also returns a toxicity category distribution from the same
+forward pass (a linear head over the encoder's [CLS] embedding, see train_category_head.py).
+Batch size and torch intra-op threads come from models/inference_profile.json when
+`manage.py autotune_inference` has written one. Set AIGUARDIAN_INFERENCE_BACKEND=student (or call set_backend('student')) to score with the distilled
+CPU student from student.py instead; it returns LABEL_1 probabilities only.
 If `transformers` isn't installed, importing this module will raise ImportError at runtime and callers should fall back to older models.
 """
-from typing import List
+import json
+import os
+from typing import Dict, List, Optional, Tuple
 
-_pipeline = None
+MODEL_NAME = "textdetox/bert-multilingual-toxicity-classifier"
+MAX_LENGTH = 256
+BACKEND_ENV = "AIGUARDIAN_INFERENCE_BACKEND"
+BACKENDS = ("bert", "student")
+DEFAULT_BATCH_SIZE = 8
+PROFILE_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'models', 'inference_profile.json'))
+CATEGORY_HEAD_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'models', 'category_head.pt'))
 
+_model = None
+_tokenizer = None
+_device = None
+_label1_index = 1
+_head = None
+_head_labels = None
+_head_loaded = False
+_profile = None
 
-def _ensure_pipeline(device: int = -1, batch_size: int = 8):
-    global _pipeline
-    if _pipeline is not None:
-        return _pipeline
+
+def load_profile() -> Dict:
+    """The tuned inference profile ({} if autotune_inference has not been run)."""
+    global _profile
+    if _profile is None:
+        try:
+            with open(PROFILE_PATH) as f:
+                _profile = json.load(f)
+        except (OSError, ValueError):
+            _profile = {}
+    return _profile
+
+
+def _batch_size(batch_size: Optional[int]) -> int:
+    return batch_size or load_profile().get('batch_size') or DEFAULT_BATCH_SIZE
+
+
+def get_backend() -> str:
+    return os.environ.get(BACKEND_ENV, "bert")
+
+
+def set_backend(name: str):
+    """Select the scoring backend; stored in the environment so worker processes inherit it."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {name!r}; expected one of {BACKENDS}")
+    os.environ[BACKEND_ENV] = name
+
+
+def _student_predict(texts: List[str]) -> List[float]:
+    from toxicity_models.transformers import student
+    return student.predict([t or "" for t in texts])
+
+
+def _ensure_model(device: int = -1):
+    global _model, _tokenizer, _device, _label1_index
+    if _model is not None:
+        return _model, _tokenizer
     try:
-        from transformers import pipeline
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
     except Exception as e:
         raise ImportError("transformers is required for bert_infer: " + str(e))
 
-    model_name = "textdetox/bert-multilingual-toxicity-classifier"
+    threads = load_profile().get('intra_op_threads')
+    if threads and device < 0:
+        torch.set_num_threads(int(threads))
     # device: 0 for GPU, -1 for CPU
-    _pipeline = pipeline(
-        "text-classification",
-        model=model_name,
-        tokenizer=model_name,
-        device=device,
-        batch_size=batch_size,
-        return_all_scores=True,
-    )
-    return _pipeline
-
-
-def predict_label1_prob(texts: List[str], device: int = -1, batch_size: int = 8) -> List[float]:
+    _device = torch.device(f"cuda:{device}" if device >= 0 else "cpu")
+    _tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    _model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME).to(_device).eval()
+    _label1_index = _model.config.label2id.get('LABEL_1', 1)
+    return _model, _tokenizer
+
+
+def _ensure_head():
+    """Load the category head if it has been trained; returns (linear layer, labels) or (None, None)."""
+    global _head, _head_labels, _head_loaded
+    if _head_loaded:
+        return _head, _head_labels
+    _head_loaded = True
+    if not os.path.exists(CATEGORY_HEAD_PATH):
+        return None, None
+    import torch
+    saved = torch.load(CATEGORY_HEAD_PATH, map_location=_device or "cpu")
+    head = torch.nn.Linear(saved['hidden_size'], len(saved['labels']))
+    head.load_state_dict(saved['state_dict'])
+    _head = head.to(_device or "cpu").eval()
+    _head_labels = list(saved['labels'])
+    return _head, _head_labels
+
+
+def _forward(texts: List[str], device: int, batch_size: Optional[int], with_embeddings: bool):
+    """Yield (LABEL_1 probabilities, [CLS] embeddings or None) per batch."""
+    import torch
+    model, tokenizer = _ensure_model(device)
+    batch_size = _batch_size(batch_size)
+    for start in range(0, len(texts), batch_size):
+        batch = [t or "" for t in texts[start:start + batch_size]]
+        enc = tokenizer(batch, padding=True, truncation=True, max_length=MAX_LENGTH, return_tensors="pt").to(_device)
+        with torch.inference_mode():
+            out = model(**enc, output_hidden_states=with_embeddings)
+            probs = torch.softmax(out.logits, dim=-1)[:, _label1_index]
+            cls = out.hidden_states[-1][:, 0] if with_embeddings else None
+        yield probs.tolist(), cls
+
+
+def embed(texts: List[str], device: int = -1, batch_size: Optional[int] = None):
+    """[CLS] embeddings of the classifier's encoder (tensor of shape [n, hidden_size])."""
+    import torch
+    return torch.cat([cls for _probs, cls in _forward(list(texts), device, batch_size, True)])
+
+
+def predict_with_category(
+    texts: List[str], device: int = -1, batch_size: Optional[int] = None
+) -> List[Tuple[float, Optional[Dict[str, float]]]]:
+    """Return (LABEL_1 probability, {category: probability}) for each input text.
+
+    Both come from one encoder pass. The category distribution is None until
+    train_category_head.py has written models/category_head.pt.
+    """
+    import torch
+    if not isinstance(texts, list):
+        texts = [texts]
+    if get_backend() == "student":
+        return [(p, None) for p in _student_predict(texts)]
+    _ensure_model(device)
+    head, labels = _ensure_head()
+    results = []
+    for probs, cls in _forward(texts, device, batch_size, head is not None):
+        if head is None:
+            results.extend((float(p), None) for p in probs)
+            continue
+        with torch.inference_mode():
+            dists = torch.softmax(head(cls), dim=-1).tolist()
+        results.extend(
+            (float(p), {label: round(float(q), 4) for label, q in zip(labels, dist)})
+            for p, dist in zip(probs, dists)
+        )
+    return results
+
+
+def predict_label1_prob(texts: List[str], device: int = -1, batch_size: Optional[int] = None) -> List[float]:
     """Return LABEL_1 probability for each input text.
 
     Args:
         texts: list of input strings
         device: -1 for CPU or integer GPU device id
-        batch_size: pipeline batch size
+        batch_size: inference batch size (default: tuned profile, else 8)
 
     Returns:
         list of floats (LABEL_1 scores)
     """
     if not isinstance(texts, list):
         texts = [texts]
-    pipe = _ensure_pipeline(device=device, batch_size=batch_size)
-    results = pipe(texts)
+    if get_backend() == "student":
+        return _student_predict(texts)
     probs = []
-    for res in results:
-        # res is a list of dicts like [{'label':'LABEL_0','score':...}, {'label':'LABEL_1','score':...}]
-        # find entry with label 'LABEL_1'
-        score = None
-        for d in res:
-            if d.get('label') == 'LABEL_1':
-                score = d.get('score')
-                break
-        # fallback: if LABEL_1 not present, try index 1
-        if score is None and len(res) > 1:
-            score = res[1].get('score')
-        probs.append(float(score) if score is not None else 0.0)
+    for batch_probs, _cls in _forward(texts, device, batch_size, False):
+        probs.extend(float(p) for p in batch_probs)
     return probs
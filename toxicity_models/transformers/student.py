@@ -0,0 +1,123 @@
+"""Distilled CPU student for the BERT toxicity classifier.
+
+A fastText-style model: each comment is a bag of hashed word and character
+n-gram ids (so transliteration variants and misspellings share subwords),
+averaged by an EmbeddingBag and mapped to a LABEL_1 logit by a linear layer.
+It is trained on the teacher's LABEL_1 probabilities (soft targets) by
+``manage.py distill_student`` and served through bert_infer when the
+``student`` backend is selected.
+"""
+import os
+import zlib
+from typing import List
+
+STUDENT_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'models', 'student.pt'))
+
+DEFAULT_BUCKETS = 2 ** 18
+DEFAULT_DIM = 64
+DEFAULT_CHAR_NGRAMS = (3, 5)
+
+_student = None
+
+
+def features(text, buckets=DEFAULT_BUCKETS, char_ngrams=DEFAULT_CHAR_NGRAMS):
+    """Hashed ids of the words, word bigrams and boundary-marked character n-grams of ``text``."""
+    words = (text or '').lower().split()
+    grams = list(words)
+    grams.extend(f'{a} {b}' for a, b in zip(words, words[1:]))
+    lo, hi = char_ngrams
+    for word in words:
+        marked = f'<{word}>'
+        for n in range(lo, hi + 1):
+            grams.extend(marked[i:i + n] for i in range(len(marked) - n + 1))
+    # crc32 is stable across processes, unlike hash()
+    return [zlib.crc32(g.encode('utf-8')) % buckets for g in grams] or [0]
+
+
+def build_model(buckets=DEFAULT_BUCKETS, dim=DEFAULT_DIM):
+    import torch
+
+    class Student(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.embedding = torch.nn.EmbeddingBag(buckets, dim, mode='mean')
+            self.out = torch.nn.Linear(dim, 1)
+
+        def forward(self, ids, offsets):
+            return self.out(self.embedding(ids, offsets)).squeeze(-1)
+
+    return Student()
+
+
+def pack(texts, buckets=DEFAULT_BUCKETS, char_ngrams=DEFAULT_CHAR_NGRAMS):
+    """Flatten texts into EmbeddingBag ``(ids, offsets)`` tensors."""
+    import torch
+    ids, offsets = [], []
+    for text in texts:
+        offsets.append(len(ids))
+        ids.extend(features(text, buckets, char_ngrams))
+    return torch.tensor(ids, dtype=torch.long), torch.tensor(offsets, dtype=torch.long)
+
+
+def train(texts, targets, epochs=10, batch_size=256, lr=0.05, buckets=DEFAULT_BUCKETS, dim=DEFAULT_DIM,
+          char_ngrams=DEFAULT_CHAR_NGRAMS, seed=13, log=print):
+    """Fit a student on soft LABEL_1 targets; returns the model (in eval mode)."""
+    import random
+    import torch
+    torch.manual_seed(seed)
+    model = build_model(buckets, dim)
+    optimizer = torch.optim.Adagrad(model.parameters(), lr=lr)
+    loss_fn = torch.nn.BCEWithLogitsLoss()
+    order = list(range(len(texts)))
+    rng = random.Random(seed)
+    for epoch in range(epochs):
+        rng.shuffle(order)
+        total = 0.0
+        model.train()
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            ids, offsets = pack([texts[i] for i in idx], buckets, char_ngrams)
+            target = torch.tensor([targets[i] for i in idx], dtype=torch.float)
+            optimizer.zero_grad()
+            loss = loss_fn(model(ids, offsets), target)
+            loss.backward()
+            optimizer.step()
+            total += loss.item() * len(idx)
+        if log:
+            log(f'epoch {epoch + 1}/{epochs}: loss {total / max(len(order), 1):.4f}')
+    return model.eval()
+
+
+def save(model, path=STUDENT_PATH, buckets=DEFAULT_BUCKETS, dim=DEFAULT_DIM, char_ngrams=DEFAULT_CHAR_NGRAMS):
+    import torch
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    torch.save({'buckets': buckets, 'dim': dim, 'char_ngrams': list(char_ngrams), 'state_dict': model.state_dict()}, path)
+
+
+def load(path=STUDENT_PATH):
+    """Load the saved student; returns ``(model, buckets, char_ngrams)``."""
+    global _student
+    if _student is not None and _student[0] == path:
+        return _student[1]
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No student model at {path}; run `python manage.py distill_student` first")
+    import torch
+    saved = torch.load(path, map_location='cpu')
+    model = build_model(saved['buckets'], saved['dim'])
+    model.load_state_dict(saved['state_dict'])
+    loaded = (model.eval(), saved['buckets'], tuple(saved['char_ngrams']))
+    _student = (path, loaded)
+    return loaded
+
+
+def predict(texts: List[str], batch_size: int = 256, model=None, buckets=None, char_ngrams=None) -> List[float]:
+    """LABEL_1 probability estimates from the student."""
+    import torch
+    if model is None:
+        model, buckets, char_ngrams = load()
+    probs = []
+    for start in range(0, len(texts), batch_size):
+        ids, offsets = pack(texts[start:start + batch_size], buckets, char_ngrams)
+        with torch.inference_mode():
+            probs.extend(torch.sigmoid(model(ids, offsets)).tolist())
+    return [float(p) for p in probs]
@@ -0,0 +1,104 @@
+"""Train the toxicity-category head used by bert_infer.predict_with_category.
+
+The head is a single linear layer over the frozen classifier's [CLS] embedding,
+fit with softmax cross-entropy on the curated dataset
+(Context_or_Example_Sentence -> Category_of_Toxicity), so category labels come
+from the same forward pass as the LABEL_1 score.
+
+Usage (from the repository root):
+    python -m toxicity_models.transformers.train_category_head [--epochs 300] [--holdout 0.2]
+
+Writes models/category_head.pt and models/category_head_metrics.json.
+"""
+import argparse
+import csv
+import json
+import os
+import random
+
+DATASET_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'cleaned_shuffled_dataset.csv'))
+METRICS_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'models', 'category_head_metrics.json'))
+
+
+def load_examples(path=DATASET_PATH):
+    examples = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            text = (row.get('Context_or_Example_Sentence') or '').strip()
+            label = (row.get('Category_of_Toxicity') or '').strip()
+            if text and label:
+                examples.append((text, label))
+    return examples
+
+
+def per_class_f1(labels, y_true, y_pred):
+    report = {}
+    for i, label in enumerate(labels):
+        tp = sum(1 for t, p in zip(y_true, y_pred) if t == i and p == i)
+        fp = sum(1 for t, p in zip(y_true, y_pred) if t != i and p == i)
+        fn = sum(1 for t, p in zip(y_true, y_pred) if t == i and p != i)
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        report[label] = {'precision': round(precision, 4), 'recall': round(recall, 4), 'f1': round(f1, 4),
+                         'support': sum(1 for t in y_true if t == i)}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--epochs', type=int, default=300)
+    parser.add_argument('--lr', type=float, default=0.01)
+    parser.add_argument('--weight-decay', type=float, default=1e-4)
+    parser.add_argument('--holdout', type=float, default=0.2, help='Fraction held out for the metrics report')
+    parser.add_argument('--batch-size', type=int, default=16, help='Encoder batch size while embedding')
+    parser.add_argument('--seed', type=int, default=13)
+    args = parser.parse_args()
+
+    import torch
+    from toxicity_models.transformers import bert_infer
+
+    examples = load_examples()
+    labels = sorted({label for _text, label in examples})
+    random.Random(args.seed).shuffle(examples)
+    n_holdout = int(len(examples) * args.holdout)
+    test, train = examples[:n_holdout], examples[n_holdout:]
+    print(f'{len(train)} training / {len(test)} held-out examples, {len(labels)} categories')
+
+    x_train = bert_infer.embed([t for t, _l in train], batch_size=args.batch_size).float().cpu()
+    y_train = torch.tensor([labels.index(l) for _t, l in train])
+
+    torch.manual_seed(args.seed)
+    head = torch.nn.Linear(x_train.shape[1], len(labels))
+    # Class weights offset the smaller Neutral class
+    counts = torch.bincount(y_train, minlength=len(labels)).float()
+    loss_fn = torch.nn.CrossEntropyLoss(weight=counts.sum() / (len(labels) * counts.clamp(min=1)))
+    optimizer = torch.optim.AdamW(head.parameters(), lr=args.lr, weight_decay=args.weight_decay)
+    for epoch in range(args.epochs):
+        optimizer.zero_grad()
+        loss = loss_fn(head(x_train), y_train)
+        loss.backward()
+        optimizer.step()
+        if (epoch + 1) % 50 == 0:
+            print(f'epoch {epoch + 1}: loss {loss.item():.4f}')
+
+    metrics = {'labels': labels, 'train_size': len(train), 'holdout_size': len(test)}
+    if test:
+        x_test = bert_infer.embed([t for t, _l in test], batch_size=args.batch_size).float().cpu()
+        y_true = [labels.index(l) for _t, l in test]
+        with torch.inference_mode():
+            y_pred = head(x_test).argmax(dim=-1).tolist()
+        metrics['accuracy'] = round(sum(1 for t, p in zip(y_true, y_pred) if t == p) / len(y_true), 4)
+        metrics['per_class'] = per_class_f1(labels, y_true, y_pred)
+        print(f"held-out accuracy: {metrics['accuracy']}")
+
+    os.makedirs(os.path.dirname(bert_infer.CATEGORY_HEAD_PATH), exist_ok=True)
+    torch.save({'hidden_size': x_train.shape[1], 'labels': labels, 'state_dict': head.state_dict()},
+               bert_infer.CATEGORY_HEAD_PATH)
+    with open(METRICS_PATH, 'w') as f:
+        json.dump(metrics, f, indent=2)
+    print('Category head saved to', bert_infer.CATEGORY_HEAD_PATH)
+
+
+if __name__ == '__main__':
+    main()